@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+'''
+Measures the throughput of loading places: one create and one update per
+attribute in the console ("before"), and storage.import_file() of the same
+records as NDJSON and CSV ("after")
+
+Usage: ./benchmarks/bench_bulk.py [number of places]
+'''
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from console import HBNBCommand  # noqa: E402
+from models import storage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+RECORD = {'name': 'Flat', 'city_id': 'c1', 'max_guest': 4,
+          'price_by_night': 80, 'latitude': 48.8, 'longitude': 2.3}
+
+
+def reset(directory):
+    '''Starts over with an empty storage in directory'''
+
+    storage.wait()
+    FileStorage._FileStorage__file_path = os.path.join(directory, 'b.json')
+    FileStorage._FileStorage__objects = {}
+    storage.save()
+
+
+def console(count):
+    '''Loads count places with create and update commands'''
+
+    hbnb = HBNBCommand()
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        for i in range(count):
+            hbnb.onecmd('create Place')
+            inst_id = out.getvalue().rsplit('\n', 2)[-2]
+            for attr, value in RECORD.items():
+                hbnb.onecmd(f'update Place {inst_id} {attr} {value}')
+
+
+def write(path, fmt, count):
+    '''Writes count records of places to path'''
+
+    with open(path, 'w', newline='') as f:
+        if fmt == 'ndjson':
+            f.writelines(json.dumps(RECORD) + '\n' for i in range(count))
+        else:
+            rows = csv.DictWriter(f, list(RECORD))
+            rows.writeheader()
+            rows.writerows(RECORD for i in range(count))
+
+
+def main():
+    '''Runs the benchmark'''
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        reset(directory)
+        start = time.perf_counter()
+        console(count)
+        results = [('before (create + updates)',
+                    count / (time.perf_counter() - start))]
+
+        for fmt in ('ndjson', 'csv'):
+            reset(directory)
+            path = os.path.join(directory, 'places.' + fmt)
+            write(path, fmt, count)
+            start = time.perf_counter()
+            imported, errors = storage.import_file(Place, path)
+            results.append((f'after (import {fmt})',
+                            imported / (time.perf_counter() - start)))
+        storage.wait()
+        FileStorage._FileStorage__file_path = 'file.json'
+        FileStorage._FileStorage__objects = {}
+
+    print(f'loading {count} places')
+    for label, rate in results:
+        print(f'  {label + ":":28} {rate:12.0f} places/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+'''
+Measures the encoding and decoding of the records of places: the json
+module with its default separators on to_dict() ("before"), and the
+codecs of models/engine/codec.py on the state of the instances ("after")
+
+Usage: ./benchmarks/bench_codec.py [number of places]
+'''
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.engine import codec  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def places(count):
+    '''Returns count places, not added to the storage'''
+
+    objs = []
+    for i in range(count):
+        place = Place(id=str(i), created_at='2024-01-01T10:00:00.123456',
+                      updated_at='2024-01-02T10:00:00.654321')
+        place.__setstate__({'name': f'Flat {i}', 'city_id': 'c1',
+                            'user_id': 'u1', 'max_guest': 4,
+                            'price_by_night': 80, 'latitude': 48.85,
+                            'longitude': 2.35, 'amenity_ids': ['a', 'b'],
+                            'description': 'A quiet flat ' * 4})
+        objs.append(place)
+    return objs
+
+
+def bench(dumps, loads, to_record, objs):
+    '''Returns the (encoded, decoded) records/s of dumps and loads'''
+
+    start = time.perf_counter()
+    texts = [dumps(to_record(obj)) for obj in objs]
+    encoded = len(objs) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for text in texts:
+        loads(text)
+    decoded = len(objs) / (time.perf_counter() - start)
+    return encoded, decoded, sum(map(len, texts))
+
+
+def main():
+    '''Runs the benchmark'''
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    objs = places(count)
+
+    codecs = [('before (json, to_dict)', json.dumps, json.loads,
+               Place.to_dict),
+              ('after (json)', codec.json_dumps, codec.json_loads,
+               codec.record)]
+    if codec.orjson is not None:
+        codecs.append(('after (orjson)', codec.orjson_dumps,
+                       codec.orjson_loads, codec.record))
+
+    print(f'records of {count} places (default codec: {codec.CODEC})')
+    print(f'  {"":24} {"encode/s":>12} {"decode/s":>12} {"bytes":>10}')
+    for label, dumps, loads, to_record in codecs:
+        encoded, decoded, size = bench(dumps, loads, to_record, objs)
+        print(f'  {label:24} {encoded:12.0f} {decoded:12.0f} {size:10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+'''
+Measures HBNBCommand.precmd() throughput on a script of console lines,
+with the old parsing (patterns rebuilt and searched one after the other
+on every line, "before") and the compiled dispatch ("after").
+
+Usage: ./benchmarks/bench_console.py [number of lines]
+'''
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from console import HBNBCommand  # noqa: E402
+from models import storage  # noqa: E402
+
+LINES = [
+        'create Place',
+        'show User 49faff9a-6318-451f-87b6-9105',
+        'update User 49faff9a-6318-451f-87b6-9105 first_name "Betty"',
+        'User.all()',
+        'Review.count()',
+        'User.show("49faff9a-6318-451f-87b6-9105")',
+        'User.destroy("49faff9a-6318-451f-87b6-9105")',
+        'User.update("49faff9a-6318-451f-87b6-9105", "name", "Robert Jr")',
+        'User.update("49faff9a-6318-451f-87b6-9105", {"age": 89})',
+        ]
+
+
+def old_precmd(self, line):
+    '''The parsing HBNBCommand.precmd used to do'''
+
+    if not sys.stdin.isatty():
+        print()
+
+    storage.refresh()
+
+    update_p = r'^ *(?P<cls>\w+)?.update\('
+    update_p += r'(?P<id>[\w\'"][^,]*)?'
+    update_p += r'(, *(?P<name>[\w\'"]*[^,]*))?'
+    update_p += r'(, *(?P<value>[\w\'"]*))?'
+    update_p += r'(, *.+)*\) *$'
+
+    update_p2 = r'^ *(?P<cls>\w+)?.update\('
+    update_p2 += r'(?P<id>[\w\'"][^,]*)'
+    update_p2 += r'(, *(?P<dict>{.*}))'
+    update_p2 += r'(, *.+)*\) *$'
+
+    cmds_formers = {r'^ *\w*.all\(\) *$': self.parse_all,
+                    r'^ *\w*.count\(\) *$': self.parse_count,
+                    r'^ *\w*.show\(.*\) *$': self.parse_show_destroy,
+                    r'^ *\w*.destroy\(.*\) *$': self.parse_show_destroy,
+                    update_p2: self.parse_update_2,
+                    update_p: self.parse_update}
+
+    for pattern in cmds_formers:
+        if re.search(pattern, line):
+            return cmds_formers[pattern](line)
+    else:
+        return line
+
+
+def bench(precmd, count):
+    '''Returns the throughput (lines/s) of precmd over count lines'''
+
+    console = HBNBCommand()
+    lines = (LINES * (count // len(LINES) + 1))[:count]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for line in lines:
+            precmd(console, line)
+        elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def main():
+    '''Runs the benchmark'''
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    before = bench(old_precmd, count)
+    after = bench(HBNBCommand.precmd, count)
+
+    print(f'precmd() of {count} lines')
+    print(f'  before (re.search chain):  {before:12.0f} lines/s')
+    print(f'  after (compiled dispatch): {after:12.0f} lines/s')
+    print(f'  speedup:                   {after / before:12.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+'''
+Measures FileStorage.reload() throughput, parsing the datetimes of the
+records with the old strptime() call ("before") and with
+models.base_model.parse_datetime ("after").
+
+Usage: ./benchmarks/bench_reload.py [number of objects]
+'''
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models  # noqa: E402
+import models.base_model  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def strptime(val):
+    '''The parsing BaseModel.__init__ used to do'''
+
+    return datetime.datetime.strptime(val, "%Y-%m-%dT%H:%M:%S.%f")
+
+
+def bench(count):
+    '''Returns the reload throughput (objects/s) of count objects'''
+
+    FileStorage._FileStorage__objects = {}
+    models.storage.reload()
+    if hasattr(models.base_model.parse_datetime, 'cache_clear'):
+        models.base_model.parse_datetime.cache_clear()
+    start = time.perf_counter()
+    models.storage.reload()
+    elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def main():
+    '''Runs the benchmark'''
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        FileStorage._FileStorage__file_path = os.path.join(tmp, 'file.json')
+        FileStorage._FileStorage__objects = {}
+        for i in range(count):
+            place = Place()
+            place.name = f'Place {i}'
+        models.storage.save()
+
+        fast = models.base_model.parse_datetime
+        models.base_model.parse_datetime = strptime
+        before = bench(count)
+        models.base_model.parse_datetime = fast
+        after = bench(count)
+
+    print(f'reload of {count} objects')
+    print(f'  before (strptime):       {before:12.0f} objects/s')
+    print(f'  after (parse_datetime):  {after:12.0f} objects/s')
+    print(f'  speedup:                 {after / before:12.2f}x')
+
+
+if __name__ == '__main__':
+    main()
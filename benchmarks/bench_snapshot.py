@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+'''
+Measures the size, save() and reload() times of FileStorage with a JSON
+file ("json") and with a binary snapshot ("binary"), for the same places:
+a save() encoding every object, a reload(), then the first save() after
+it (as a console session makes)
+
+Usage: ./benchmarks/bench_snapshot.py [number of places]
+'''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def bench(storage_format, path):
+    '''
+    Returns the (bytes, save s, reload s, save after reload s) of the
+    places in path
+    '''
+
+    FileStorage._FileStorage__format = storage_format
+    FileStorage._FileStorage__file_path = path
+    # Every object is re-encoded: the caches would hide the encoding
+    FileStorage._FileStorage__cache.clear()
+    FileStorage._FileStorage__blobs.clear()
+    start = time.perf_counter()
+    models.storage.save()
+    saved = time.perf_counter() - start
+
+    objs = FileStorage._FileStorage__objects
+    FileStorage._FileStorage__objects = {}
+    start = time.perf_counter()
+    models.storage.reload()
+    reloaded = time.perf_counter() - start
+    start = time.perf_counter()
+    models.storage.save()
+    resaved = time.perf_counter() - start
+    FileStorage._FileStorage__objects = objs
+    return os.path.getsize(path), saved, reloaded, resaved
+
+
+def main():
+    '''Runs the benchmark'''
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        FileStorage._FileStorage__objects = {}
+        for i in range(count):
+            place = Place()
+            place.name = f'Place {i}'
+            place.city_id = 'c1'
+            place.max_guest = 4
+            place.price_by_night = 80
+        results = [(fmt, bench(fmt, os.path.join(tmp, name)))
+                   for fmt, name in (('json', 'file.json'),
+                                     ('binary', 'file.hbnb'))]
+
+    print(f'{count} places')
+    print(f'  {"":8} {"bytes":>12} {"save s":>10} {"reload s":>10} '
+          f'{"save s after reload":>20}')
+    for fmt, (size, saved, reloaded, resaved) in results:
+        print(f'  {fmt:8} {size:12} {saved:10.3f} {reloaded:10.3f} '
+              f'{resaved:20.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+'''
+Measures the startup of FileStorage in lazy mode (reload(), then a get()
+as the show command does) as the number of objects grows: streaming a
+JSON file ("json") and mapping a snapshot with an index ("mapped").
+Each startup runs in a new process.
+
+Usage: ./benchmarks/bench_startup.py [largest number of objects]
+'''
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import models  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+STARTUP = '''
+import sys
+import time
+import models
+from models.engine.file_storage import FileStorage
+from models.place import Place
+FileStorage._FileStorage__format = sys.argv[1]
+FileStorage._FileStorage__file_path = sys.argv[2]
+FileStorage._FileStorage__objects = {}
+FileStorage._FileStorage__lazy = True
+start = time.perf_counter()
+models.storage.reload()
+reloaded = time.perf_counter() - start
+start = time.perf_counter()
+assert models.storage.get(Place, sys.argv[3]) is not None
+print(reloaded, time.perf_counter() - start)
+'''
+
+
+def startup(storage_format, path, inst_id, cwd):
+    '''
+    Returns the seconds of reload() and of get(Place, inst_id), in a
+    process started in cwd (without a file.json, which importing models
+    would load)
+    '''
+
+    output = subprocess.run(
+            [sys.executable, '-c', STARTUP, storage_format, path, inst_id],
+            cwd=cwd, check=True, capture_output=True,
+            env=dict(os.environ, PYTHONPATH=ROOT), text=True).stdout
+    return tuple(map(float, output.split()))
+
+
+def main():
+    '''Runs the benchmark'''
+
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print('lazy startup: reload() + get() (ms)')
+    print(f'  {"objects":>8} {"json":>16} {"mapped":>16}')
+    count = 1000
+    with tempfile.TemporaryDirectory() as tmp, \
+            tempfile.TemporaryDirectory() as cwd:
+        while count <= largest:
+            FileStorage._FileStorage__objects = {}
+            for i in range(count):
+                place = Place()
+                place.name = f'Place {i}'
+            results = []
+            for fmt, name in (('json', 'file.json'), ('binary', 'file.hbnb')):
+                path = os.path.join(tmp, name)
+                FileStorage._FileStorage__format = fmt
+                FileStorage._FileStorage__file_path = path
+                models.storage.save()
+                results.append(startup(fmt, path, place.id, cwd))
+            print(f'  {count:8}', *(f'{reloaded * 1000:8.1f} +'
+                                    f'{found * 1000:6.2f}'
+                                    for reloaded, found in results))
+            count *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,41 @@
 #!/usr/bin/python3
 '''The implementation of the console (CLI) for the AirBnB project'''
+import argparse
 import cmd
+import contextlib
+import io
+import itertools
 import re
 import sys
 from models import storage
-from models.base_model import BaseModel
-from models.user import User
-from models.state import State
-from models.city import City
-from models.place import Place
-from models.amenity import Amenity
-from models.review import Review
+from models.engine import query, snapshot
+
+# Number of commands of a batch run between two saves
+BATCH_SIZE = 1000
+
+# <class>.<command>(<arguments>), ex: User.show("1234")
+DOT_COMMAND = re.compile(r'^ *\w*\.(?P<command>\w+)\((?P<args>.*)\) *$')
+
+# User.update(1723-5609, "name", "Robert Jr")
+UPDATE = re.compile(r'^ *(?P<cls>\w+)?.update\('
+                    r'(?P<id>[\w\'"][^,]*)?'
+                    r'(, *(?P<name>[\w\'"]*[^,]*))?'
+                    r'(, *(?P<value>[\w\'"]*[^,]*))?'
+                    r'(, *.+)*\) *$')
+
+# User.update("6693-5721", {"first_name":  "John", "age": 89})
+UPDATE_DICT = re.compile(r'^ *(?P<cls>\w+)?.update\('
+                         r'(?P<id>[\w\'"][^,]*)'
+                         r'(, *(?P<dict>{.*}))'
+                         r'(, *.+)*\) *$')
 
 
 class HBNBCommand(cmd.Cmd):
     '''Command Line Interpreter for the AirBnB project'''
 
     prompt = '(hbnb) '
-    classes = {
-            'BaseModel': BaseModel,
-            'User': User,
-            'State': State,
-            'City': City,
-            'Place': Place,
-            'Amenity': Amenity,
-            'Review': Review
-            }
+    classes = storage.classes()
+    batch_mode = False
 
     @staticmethod
     def splitter(str_args):
@@ -96,17 +106,29 @@ class HBNBCommand(cmd.Cmd):
 
         return new_line
 
+    @staticmethod
+    def parse_near(line):
+        '''Parse commands like: Place.near(48.85, 2.35, 10)'''
+
+        cls, args = line.strip()[:-1].split('.', 1)
+        args = args.split('(', 1)[1].replace(',', ' ')
+
+        return f'near {cls.strip()} {args}'
+
+    @staticmethod
+    def parse_where(line):
+        '''Parse commands like: Place.where(max_guest >= 4, limit=5)'''
+
+        cls, args = line.strip()[:-1].split('.', 1)
+        args = args.split('(', 1)[1]
+
+        return f'where {cls.strip()} {args}'
+
     @staticmethod
     def parse_update(line):
         """Parse commands like: User.update(1723-5609, "name", "Robert Jr")"""
 
-        update_p = r'^ *(?P<cls>\w+)?.update\('
-        update_p += r'(?P<id>[\w\'"][^,]*)?'
-        update_p += r'(, *(?P<name>[\w\'"]*[^,]*))?'
-        update_p += r'(, *(?P<value>[\w\'"]*[^,]*))?'
-        update_p += r'(, *.+)*\) *$'
-
-        match = re.search(update_p, line)
+        match = UPDATE.search(line)
 
         if match:
             class_name = match.group('cls')
@@ -132,12 +154,7 @@ class HBNBCommand(cmd.Cmd):
         (hbnb) User.update("6693-5721", {"first_name":  "John", "age": 89})
         """
 
-        update_p2 = r'^ *(?P<cls>\w+)?.update\('
-        update_p2 += r'(?P<id>[\w\'"][^,]*)'
-        update_p2 += r'(, *(?P<dict>{.*}))'
-        update_p2 += r'(, *.+)*\) *$'
-
-        match = re.search(update_p2, line)
+        match = UPDATE_DICT.search(line)
 
         if match:
             class_name = match.group('cls')
@@ -156,33 +173,33 @@ class HBNBCommand(cmd.Cmd):
     def precmd(self, line):
         '''Preprocess the command line'''
 
-        if not sys.stdin.isatty():
+        if not self.batch_mode and not sys.stdin.isatty():
             print()
 
-        update_p = r'^ *(?P<cls>\w+)?.update\('
-        update_p += r'(?P<id>[\w\'"][^,]*)?'
-        update_p += r'(, *(?P<name>[\w\'"]*[^,]*))?'
-        update_p += r'(, *(?P<value>[\w\'"]*))?'
-        update_p += r'(, *.+)*\) *$'
-
-        update_p2 = r'^ *(?P<cls>\w+)?.update\('
-        update_p2 += r'(?P<id>[\w\'"][^,]*)'
-        update_p2 += r'(, *(?P<dict>{.*}))'
-        update_p2 += r'(, *.+)*\) *$'
-
-        cmds_formers = {r'^ *\w*.all\(\) *$': self.parse_all,
-                        r'^ *\w*.count\(\) *$': self.parse_count,
-                        r'^ *\w*.show\(.*\) *$': self.parse_show_destroy,
-                        r'^ *\w*.destroy\(.*\) *$': self.parse_show_destroy,
-                        update_p2: self.parse_update_2,
-                        update_p: self.parse_update}
-
-        for pattern in cmds_formers:
-            if re.search(pattern, line):
-                return cmds_formers[pattern](line)
-        else:
+        storage.refresh()
+
+        # A single match tells the command; the rest is left to cmd
+        match = DOT_COMMAND.match(line) if '(' in line else None
+        if match is None:
             return line
 
+        command = match.group('command')
+        if command in ('all', 'count'):
+            if match.group('args'):
+                return line
+            return self.parse_all(line) if command == 'all' \
+                else self.parse_count(line)
+        if command in ('show', 'destroy'):
+            return self.parse_show_destroy(line)
+        if command == 'near':
+            return self.parse_near(line)
+        if command == 'where':
+            return self.parse_where(line)
+        if command == 'update':
+            return self.parse_update_2(line) or self.parse_update(line) \
+                or line
+        return line
+
     def do_create(self, str_args):
         '''
         Creates a new instance of a class, saves it (to the JSON file)
@@ -230,15 +247,12 @@ class HBNBCommand(cmd.Cmd):
             print('** instance id missing **')
             return
 
-        cls, inst_id = args[0], args[1]
-        inst_key = f'{cls}.{inst_id}'
+        obj = storage.get(args[0], args[1])
 
-        for key, obj in storage.all().items():
-            if key == inst_key:
-                print(obj)
-                return
-        else:
+        if obj is None:
             print('** no instance found **')
+        else:
+            print(obj)
 
     def complete_show(self, text, line, begidx, endix):
         '''Provides Tab-completion for show command'''
@@ -265,17 +279,10 @@ class HBNBCommand(cmd.Cmd):
             print('** instance id missing **')
             return
 
-        cls, inst_id = args[0], args[1]
-        inst_key = f'{cls}.{inst_id}'
-        objs_dict = storage.all()
-
-        for key, obj in objs_dict.items():
-            if key == inst_key:
-                del objs_dict[key]
-                storage.save()
-                return
-        else:
+        if storage.delete(f'{args[0]}.{args[1]}') is None:
             print('** no instance found **')
+        else:
+            storage.save()
 
     def complete_destroy(self, text, line, begidx, endix):
         '''Provides Tab-completion for destroy command'''
@@ -287,27 +294,245 @@ class HBNBCommand(cmd.Cmd):
         Display string representations of all instances of a given class.
         If no class is specified, displays all instantiated objects.
 
+        Options:
+            --limit N - display the first N instances only, by id
+            --after ID - display those after the id ID (the last one
+                         of the previous page; <class>.<id> without class)
+            --stream - display one instance per line, as they are read
+
         Ex: (hbnb) all Amenity
+            (hbnb) all Place --limit 100 --after 49faff9a-6318-451f-87b6
         """
 
         args = self.splitter(str_args)
+        cls = args.pop(0) if args and not args[0].startswith('--') else None
 
-        if len(args) > 0 and args[0] not in self.classes:
+        if cls is not None and cls not in self.classes:
             print("** class doesn't exist **")
+            return
+
+        options = {}
+        while args:
+            option = args.pop(0)
+            if option == '--stream':
+                options['stream'] = True
+            elif option in ('--limit', '--after') and args:
+                options[option[2:]] = args.pop(0)
+            else:
+                print(f'** invalid option {option} **')
+                return
+        limit = options.get('limit')
+        if limit is not None:
+            if not limit.isdigit():
+                print('** limit must be a number **')
+                return
+            limit = int(limit)
+
+        if options.get('stream'):
+            for obj in storage.stream(cls, limit, options.get('after')):
+                print(obj)
         else:
-            objects = []
-            for obj in storage.all().values():
-                if len(args) != 0 and args[0] == obj.__class__.__name__:
-                    objects.append(obj.__str__())
-                elif len(args) == 0:
-                    objects.append(obj.__str__())
-            print(objects)
+            if limit is None and 'after' not in options:
+                objs_dict = storage.all(cls)
+            else:
+                objs_dict = storage.page(cls, limit, options.get('after'))
+            print([obj.__str__() for obj in objs_dict.values()])
 
     def complete_all(self, text, line, begidx, endix):
         '''Provides Tab-completion for all command'''
 
         return [cls for cls in self.classes if cls.startswith(text)]
 
+    def do_near(self, str_args):
+        '''
+        Display string representations of the instances of a class
+        within a distance (in km) of a point, from the nearest
+
+        Ex: (hbnb) near Place 48.8566 2.3522 10
+        '''
+
+        args = self.splitter(str_args)
+
+        if len(args) == 0:
+            print('** class name missing **')
+            return
+        elif args[0] not in self.classes:
+            print('** class doesn\'t exist **')
+            return
+        elif len(args) < 4:
+            print('** latitude, longitude or distance missing **')
+            return
+
+        try:
+            lat, lon, km = (float(arg) for arg in args[1:4])
+        except ValueError:
+            print('** latitude, longitude and distance must be numbers **')
+            return
+
+        objs_dict = storage.near(args[0], lat, lon, km)
+        print([obj.__str__() for obj in objs_dict.values()])
+
+    def complete_near(self, text, line, begidx, endix):
+        '''Provides Tab-completion for near command'''
+
+        return [cls + ' ' for cls in self.classes if cls.startswith(text)]
+
+    def do_search(self, str_args):
+        '''
+        Display string representations of the instances of a class
+        whose text matches the words of a query, from the best match
+
+        Ex: (hbnb) search Review "quiet clean room"
+        '''
+
+        args = self.splitter(str_args)
+
+        if len(args) == 0:
+            print('** class name missing **')
+            return
+        elif args[0] not in self.classes:
+            print('** class doesn\'t exist **')
+            return
+        elif len(args) < 2:
+            print('** query missing **')
+            return
+
+        objs_dict = storage.search(args[0], ' '.join(args[1:]))
+        print([obj.__str__() for obj in objs_dict.values()])
+
+    def complete_search(self, text, line, begidx, endix):
+        '''Provides Tab-completion for search command'''
+
+        return [cls + ' ' for cls in self.classes if cls.startswith(text)]
+
+    def do_where(self, str_args):
+        '''
+        Display string representations of the instances of a class
+        meeting conditions, with the options limit, order_by (-<attribute>:
+        descending) and fields (to display only those attributes)
+
+        Ex: (hbnb) where Place price_by_night < 100, max_guest >= 4, limit=5
+            (hbnb) Place.where(max_guest >= 4, order_by=-price_by_night)
+        '''
+
+        args = str_args.split(maxsplit=1)
+
+        if len(args) == 0:
+            print('** class name missing **')
+            return
+        elif args[0] not in self.classes:
+            print('** class doesn\'t exist **')
+            return
+
+        try:
+            conditions, options = query.parse(args[1] if len(args) > 1
+                                              else '')
+            objs_dict = storage.where(args[0], conditions,
+                                      options.get('order_by'),
+                                      options.get('limit'))
+        except ValueError as error:
+            print(f'** {error} **')
+            return
+
+        if 'fields' in options:
+            print([query.project(obj, options['fields'])
+                   for obj in objs_dict.values()])
+        else:
+            print([obj.__str__() for obj in objs_dict.values()])
+
+    def complete_where(self, text, line, begidx, endix):
+        '''Provides Tab-completion for where command'''
+
+        return [cls + ' ' for cls in self.classes if cls.startswith(text)]
+
+    def do_import(self, str_args):
+        '''
+        Create the instances of a class from the records of a file
+        (NDJSON, or CSV when it ends with .csv), then display their number
+        and the records that could not be imported
+
+        Ex: (hbnb) import Place places.ndjson
+        '''
+
+        args = self.splitter(str_args)
+        if not self.__check_file(args):
+            return
+
+        try:
+            count, errors = storage.import_file(args[0], args[1])
+        except OSError as error:
+            print(f'** {error.strerror}: {args[1]} **')
+            return
+        print(count)
+        for line, message in errors:
+            print(f'** line {line}: {message} **')
+
+    def complete_import(self, text, line, begidx, endix):
+        '''Provides Tab-completion for import command'''
+
+        return [cls + ' ' for cls in self.classes if cls.startswith(text)]
+
+    def do_export(self, str_args):
+        '''
+        Write the instances of a class to a file (NDJSON, or CSV when
+        it ends with .csv), then display their number
+
+        Ex: (hbnb) export Place places.csv
+        '''
+
+        args = self.splitter(str_args)
+        if not self.__check_file(args):
+            return
+
+        try:
+            print(storage.export_file(args[0], args[1]))
+        except OSError as error:
+            print(f'** {error.strerror}: {args[1]} **')
+
+    def complete_export(self, text, line, begidx, endix):
+        '''Provides Tab-completion for export command'''
+
+        return [cls + ' ' for cls in self.classes if cls.startswith(text)]
+
+    def do_convert(self, str_args):
+        '''
+        Convert a JSON storage file to a binary snapshot, or a snapshot
+        to a JSON file, then display the number of records
+
+        Ex: (hbnb) convert file.json file.hbnb
+        '''
+
+        args = self.splitter(str_args)
+        if len(args) == 0:
+            print('** source file missing **')
+            return
+        if len(args) < 2:
+            print('** target file missing **')
+            return
+
+        try:
+            print(snapshot.convert(args[0], args[1]))
+        except OSError as error:
+            print(f'** {error.strerror}: {error.filename} **')
+        except ValueError as error:
+            print(f'** {error} **')
+
+    def __check_file(self, args):
+        '''
+        Returns whether args are a class name and a file path,
+        else prints what is wrong
+        '''
+
+        if len(args) == 0:
+            print('** class name missing **')
+        elif args[0] not in self.classes:
+            print('** class doesn\'t exist **')
+        elif len(args) < 2:
+            print('** file missing **')
+        else:
+            return True
+        return False
+
     def do_update(self, str_args):
         """
         Update a class instance of a given id by adding or updating
@@ -316,7 +541,6 @@ class HBNBCommand(cmd.Cmd):
         Ex: (hbnb) update User 49faff9a-6318-451f-87b6-9105 first_name "Betty"
         """
         args = self.splitter(str_args)
-        objects = storage.all()
 
         if len(args) == 0:
             print("** class name missing **")
@@ -330,7 +554,9 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        if f"{args[0]}.{args[1]}" not in objects.keys():
+        obj = storage.get(args[0], args[1])
+
+        if obj is None:
             print("** no instance found **")
             return
 
@@ -345,20 +571,21 @@ class HBNBCommand(cmd.Cmd):
                 print("** value missing **")
                 return
 
-            obj = objects[f"{args[0]}.{args[1]}"]
             dict_attrs = eval(args[2])
 
-            for key, val in dict_attrs.items():
-                setattr(obj, key, val)
+            with storage.transaction():
+                for key, val in dict_attrs.items():
+                    setattr(obj, key, val)
 
         if len(args) == 4:
-            obj = objects[f"{args[0]}.{args[1]}"]
-
-            if args[2] in obj.__class__.__dict__.keys():
-                value_type = type(obj.__class__.__dict__[args[2]])
-                obj.__dict__[args[2]] = value_type(args[3])
+            # Compact classes keep the class attributes aside
+            cls_attrs = getattr(obj.__class__, 'defaults',
+                                obj.__class__.__dict__)
+            if args[2] in cls_attrs:
+                value_type = type(cls_attrs[args[2]])
+                setattr(obj, args[2], value_type(args[3]))
             else:
-                obj.__dict__[args[2]] = eval(args[3])
+                setattr(obj, args[2], eval(args[3]))
 
         storage.save()
 
@@ -374,20 +601,61 @@ class HBNBCommand(cmd.Cmd):
         Executed by typing: (hbnb) <class name>.count()
         """
         args = self.splitter(str_args)
-        objects_dict = storage.all()
-        counting = 0
 
         if len(args) == 0:
             print("** class name missing **")
             return
 
-        cls_name = args[0]
+        print(storage.count(args[0]))
 
-        for key, obj in objects_dict.items():
-            if cls_name == key.split('.')[0]:
-                counting += 1
+    def run_batch(self, lines, save_every=BATCH_SIZE):
+        '''
+        Runs the commands of lines (ex: an open file) until the end or
+        quit, saving once per save_every commands instead of after each.
+        The output is written by blocks. Returns the list of the errors:
+        (line number, command, error message).
+
+        Ex: ./console.py --batch commands.txt
+        '''
 
-        print(counting)
+        self.batch_mode = True
+        errors = []
+        numbered = enumerate(lines, 1)
+        stop = False
+        while not stop:
+            chunk = list(itertools.islice(numbered, save_every))
+            if not chunk:
+                break
+            out = io.StringIO()
+            with storage.batch():
+                for number, line in chunk:
+                    line = line.rstrip('\n')
+                    stop, output = self.__run(line)
+                    out.write(output)
+                    for message in output.splitlines():
+                        if message.startswith('*'):
+                            errors.append((number, line, message))
+                    if stop:
+                        break
+            sys.stdout.write(out.getvalue())
+        sys.stdout.flush()
+        return errors
+
+    def __run(self, line):
+        '''Runs the command line, returns (whether to stop, its output)'''
+
+        # cmd writes some messages (ex: Unknown syntax) to self.stdout
+        out = io.StringIO()
+        stdout, self.stdout = self.stdout, out
+        with contextlib.redirect_stdout(out):
+            try:
+                stop = self.onecmd(self.precmd(line))
+            except Exception as error:
+                stop = False
+                print(f'** {type(error).__name__}: {error} **')
+            finally:
+                self.stdout = stdout
+        return stop, out.getvalue()
 
     def emptyline(self):
         '''Pass when an empty line is entered'''
@@ -397,13 +665,59 @@ class HBNBCommand(cmd.Cmd):
     def do_quit(self, str_args):
         '''This command exits the program, same as `EOF`'''
 
+        storage.flush()
         return True
 
     def do_EOF(self, str_args):
         '''This command exits the program, same as `quit`'''
 
+        storage.flush()
         return True
 
 
+def positive(text):
+    '''Returns the integer of text, an argparse type rejecting N < 1'''
+
+    try:
+        number = int(text)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+                f'expecting a positive integer, not {text!r}')
+    return number
+
+
+def main():
+    '''Runs the console, interactively or as a batch'''
+
+    parser = argparse.ArgumentParser(
+            description='Command Line Interpreter for the AirBnB project')
+    parser.add_argument(
+            '--batch', nargs='?', const='-', metavar='FILE',
+            help='run the commands of FILE (- or none: stdin) as a batch')
+    parser.add_argument(
+            '--save-every', type=positive, default=BATCH_SIZE, metavar='N',
+            help=f'save once per N commands of the batch '
+                 f'(default: {BATCH_SIZE})')
+    args = parser.parse_args()
+
+    if args.batch is None:
+        HBNBCommand().cmdloop()
+        return
+
+    if args.batch == '-':
+        errors = HBNBCommand().run_batch(sys.stdin, args.save_every)
+    else:
+        with open(args.batch, 'r', encoding='utf-8') as f:
+            errors = HBNBCommand().run_batch(f, args.save_every)
+    storage.flush()
+
+    for number, line, message in errors:
+        print(f'line {number}: {line}: {message}', file=sys.stderr)
+    print(f'{len(errors)} error(s)', file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
 if __name__ == '__main__':
-    HBNBCommand().cmdloop()
+    main()
@@ -1,6 +1,10 @@
 #!/usr/bin/python3
+import os
 
-from models.engine.file_storage import FileStorage
-
-storage = FileStorage()
+if os.getenv('HBNB_TYPE_STORAGE') == 'sqlite':
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
 storage.reload()
@@ -2,23 +2,53 @@
 """This module implements the BaseModel class"""
 import models
 import datetime
+import functools
 import uuid
 
+LEGACY_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%d %H:%M:%S.%f")
 
-class BaseModel:
+
+@functools.lru_cache(maxsize=65536)
+def parse_datetime(val):
+    """Parse an ISO 8601 datetime string (as made by isoformat()).
+
+    Records loaded together often share their timestamps (ex: an object's
+    created_at and updated_at), so results are memoized: repeated strings
+    are parsed once and map to the same datetime object.
+
+    Args:
+        val (str): the string to parse.
     """
-    The BaseModel class
 
-    Public instance attributes:
-        id (uuid4)
-        created_at (datetime)
-        updated_at (datetime)
+    try:
+        return datetime.datetime.fromisoformat(val)
+    except ValueError:
+        for frmt in LEGACY_FORMATS:
+            try:
+                return datetime.datetime.strptime(val, frmt)
+            except ValueError:
+                pass
+        raise
+
+
+class Model:
+    """
+    The methods of every model class, without any instance storage:
+    BaseModel adds the __dict__, the compact classes (models/compact.py)
+    their slots.
 
     Public instance methods:
         save(self)
         to_dict(self)
+        __getstate__(self)
+        __setstate__(self, state)
+
+    Public class methods:
+        where(cls, *conditions, order_by=None, limit=None)
     """
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         """Initialize a new BaseModel object.
 
@@ -28,18 +58,57 @@ class BaseModel:
         """
 
         if len(kwargs) != 0:
-            frmt = "%Y-%m-%dT%H:%M:%S.%f"
-            for key, val in kwargs.items():
-                if key in ["created_at", "updated_at"]:
-                    self.__dict__[key] = datetime.datetime.strptime(val, frmt)
-                elif key != "__class__":
-                    self.__dict__[key] = val
+            # kwargs is a new dict, the state of the instance as it is
+            kwargs.pop("__class__", None)
+            for key in ("created_at", "updated_at"):
+                val = kwargs.get(key, kwargs)
+                if val is not kwargs and \
+                        not isinstance(val, datetime.datetime):
+                    # Snapshots store datetimes, JSON files their text
+                    kwargs[key] = parse_datetime(val)
+            self.__setstate__(kwargs)
         else:
             self.id = str(uuid.uuid4())
             self.created_at = datetime.datetime.now()
             self.updated_at = datetime.datetime.now()
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """Sets an attribute and flags the instance as dirty in storage"""
+
+        models.storage.remember(self)
+        super().__setattr__(name, value)
+        models.storage.touch(self)
+
+    def __getstate__(self):
+        """Returns the instance attributes as a new dict"""
+
+        return self.__dict__.copy()
+
+    def __setstate__(self, state):
+        """Sets the attributes of state, without flagging a change"""
+
+        # Unlike self.__dict__[key] = val, this lets Python keep the
+        # values inline instead of allocating a dict per instance
+        for key, val in state.items():
+            object.__setattr__(self, key, val)
+
+    @classmethod
+    def where(cls, *conditions, order_by=None, limit=None):
+        """Returns the dict of the stored instances meeting the conditions.
+
+        Ex: Place.where("price_by_night < 100", "max_guest >= 4", limit=5)
+
+        Args:
+            *conditions (str or tuple): "<attribute> <operator> <value>"
+                texts or (attribute, operator, value) tuples.
+            order_by (str): the attribute to sort by (-<attribute>:
+                descending).
+            limit (int): the maximum number of instances.
+        """
+
+        return models.storage.where(cls, conditions, order_by, limit)
+
     def save(self):
         """Updates `updated_at` with the current datetime"""
 
@@ -53,7 +122,7 @@ class BaseModel:
             - The key __class__ with the class name of the object
         """
 
-        obj_dict = self.__dict__.copy()
+        obj_dict = self.__getstate__()
         obj_dict["__class__"] = self.__class__.__name__
         obj_dict["created_at"] = self.created_at.isoformat()
         obj_dict["updated_at"] = self.updated_at.isoformat()
@@ -63,4 +132,24 @@ class BaseModel:
     def __str__(self):
         """Return a human readable representation of the instance"""
 
-        return f"[{self.__class__.__name__}] ({self.id}) {self.__dict__}"
+        return f"[{self.__class__.__name__}] ({self.id}) {self.__getstate__()}"
+
+
+class BaseModel(Model):
+    """
+    The BaseModel class
+
+    Public instance attributes:
+        id (uuid4)
+        created_at (datetime)
+        updated_at (datetime)
+
+    Public instance methods (from Model):
+        save(self)
+        to_dict(self)
+        __getstate__(self)
+        __setstate__(self, state)
+
+    Public class methods (from Model):
+        where(cls, *conditions, order_by=None, limit=None)
+    """
@@ -0,0 +1,417 @@
+#!/usr/bin/python3
+'''This module implements the BaseStorage class'''
+import abc
+import bisect
+import contextlib
+import heapq
+import itertools
+import os
+from models.engine import bulk, columns, geo, query
+from models.engine.text_index import TextIndex
+
+# The number of objects stream() reads at a time
+PAGE_SIZE = 1000
+
+# The attributes every storage engine indexes: class name -> attributes
+INDEXES = {
+        'City': ('state_id',),
+        'Place': ('city_id', 'user_id'),
+        'Review': ('place_id', 'user_id')
+        }
+
+# The numeric attributes every storage engine can filter and aggregate
+# without reading the objects: class name -> attributes
+COLUMNS = {
+        'Place': ('number_rooms', 'number_bathrooms', 'max_guest',
+                  'price_by_night', 'latitude', 'longitude')
+        }
+
+# The classes whose points (latitude, longitude) every storage engine can
+# search by place on the map
+GEO = ('Place',)
+
+# The free text attributes every storage engine can search: class name ->
+# attributes
+TEXT = {
+        'Place': ('name', 'description'),
+        'Review': ('text',)
+        }
+
+# Whether classes() returns the compact variants (see models/compact.py)
+COMPACT = os.getenv('HBNB_COMPACT_MODELS', '') not in ('', '0')
+
+
+def restore(obj, state):
+    '''Puts back the attributes of obj to state (from obj.__getstate__())'''
+
+    for name in obj.__getstate__().keys() - state.keys():
+        delattr(obj, name)
+    obj.__setstate__(state)
+
+
+def document(obj, attrs):
+    '''Returns the text of obj to search: its attrs that are strings'''
+
+    values = (getattr(obj, attr, None) for attr in attrs)
+    return '\n'.join(value for value in values if isinstance(value, str))
+
+
+class BaseStorage(abc.ABC):
+    '''
+    The interface every storage engine (models.storage) implements
+
+    Abstract instance methods:
+        all(self, cls=None)
+        count(self, cls=None)
+        new(self, obj)
+        get(self, cls, inst_id)
+        delete(self, obj)
+        save(self)
+        reload(self)
+
+    Public instance methods (with a default implementation):
+        remember(self, obj)
+        touch(self, obj)
+        find_by(self, cls, attr, value)
+        between(self, cls, attr, low=None, high=None)
+        aggregate(self, cls, attr, func='avg', by=None)
+        within(self, cls, south, west, north, east)
+        near(self, cls, lat, lon, km)
+        nearest(self, cls, lat, lon, k=1)
+        search(self, cls, query, limit=None)
+        where(self, cls, conditions, order_by=None, limit=None)
+        page(self, cls=None, limit=None, after=None)
+        stream(self, cls=None, limit=None, after=None, page_size=PAGE_SIZE)
+        import_file(self, cls, path, fmt=None, chunk_size=CHUNK_SIZE)
+        export_file(self, cls, path, fmt=None)
+        transaction(self) (alias: batch)
+        flush(self)
+        refresh(self)
+        wait(self)
+
+    Public static methods:
+        classes()
+    '''
+
+    @abc.abstractmethod
+    def all(self, cls=None):
+        '''
+        Returns the dict of all objects by <class name>.id, or only
+        the objects of class cls (a class or its name) when given
+        '''
+
+    @abc.abstractmethod
+    def count(self, cls=None):
+        '''Returns the number of objects, or of objects of class cls'''
+
+    @abc.abstractmethod
+    def new(self, obj):
+        '''Adds obj to the storage'''
+
+    @abc.abstractmethod
+    def get(self, cls, inst_id):
+        '''
+        Returns the object of class cls (a class or its name)
+        with the given id, or None
+        '''
+
+    @abc.abstractmethod
+    def delete(self, obj):
+        '''
+        Removes obj (an object or its <class name>.id key).
+        Returns the removed object, or None when there was none.
+        '''
+
+    @abc.abstractmethod
+    def save(self):
+        '''Persists the changes'''
+
+    @abc.abstractmethod
+    def reload(self):
+        '''(Re)loads the persisted objects'''
+
+    def remember(self, obj):
+        '''Called by BaseModel.__setattr__ before obj changes'''
+
+    def touch(self, obj):
+        '''Called by BaseModel.__setattr__ after obj changed'''
+
+    def find_by(self, cls, attr, value):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose attribute attr equals value, by <class name>.id
+        '''
+
+        return {key: obj for key, obj in self.all(cls).items()
+                if getattr(obj, attr, None) == value}
+
+    def between(self, cls, attr, low=None, high=None):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose attribute attr is a number from low to high (both included,
+        None: no bound), by <class name>.id
+        '''
+
+        objs_dict = {}
+        for key, obj in self.all(cls).items():
+            value = columns.number(getattr(obj, attr, None))
+            if (low is None or low <= value) and \
+                    (high is None or value <= high) and value == value:
+                objs_dict[key] = obj
+        return objs_dict
+
+    def aggregate(self, cls, attr, func='avg', by=None):
+        '''
+        Returns func ('count', 'sum', 'min', 'max' or 'avg') of the
+        numbers of attribute attr of the objects of class cls, as a float
+        (None when there are none, except for count and sum), or a dict
+        of them by value of the attribute by (ex: 'city_id')
+        '''
+
+        groups = {}
+        for obj in self.all(cls).values():
+            group = getattr(obj, by, None) if by is not None else None
+            groups.setdefault(group, []).append(
+                    columns.number(getattr(obj, attr, None)))
+        if by is None:
+            return columns.aggregate(groups.get(None, []), func)
+        return {group: columns.aggregate(values, func)
+                for group, values in groups.items()}
+
+    def within(self, cls, south, west, north, east):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose point (latitude, longitude) is in the box, by <class name>.id.
+        The box crosses the 180th meridian when west > east.
+        '''
+
+        objs_dict = {}
+        for key, obj in self.all(cls).items():
+            xy = geo.point(*geo.coordinates(obj))
+            if xy is not None and geo.inside(*xy, south, west, north, east):
+                objs_dict[key] = obj
+        return objs_dict
+
+    def near(self, cls, lat, lon, km):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        within km of (lat, lon), by <class name>.id, from the nearest
+        '''
+
+        found = []
+        for key, obj in self.within(cls, *geo.box(lat, lon, km)).items():
+            dist = geo.distance(lat, lon, obj.latitude, obj.longitude)
+            if dist <= km:
+                found.append((dist, key, obj))
+        found.sort(key=lambda item: item[:2])
+        return {key: obj for dist, key, obj in found}
+
+    def nearest(self, cls, lat, lon, k=1):
+        '''
+        Returns the dict of the k objects of class cls (a class or its
+        name) nearest (lat, lon), by <class name>.id, from the nearest
+        '''
+
+        found = []
+        for key, obj in self.all(cls).items():
+            xy = geo.point(*geo.coordinates(obj))
+            if xy is not None:
+                found.append((geo.distance(lat, lon, *xy), key, obj))
+        return {key: obj for dist, key, obj in
+                heapq.nsmallest(k, found, key=lambda item: item[:2])}
+
+    def search(self, cls, query, limit=None):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose TEXT attributes match words of query, by <class name>.id,
+        from the best BM25 score (the first limit ones only)
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        objs_dict = self.all(name)
+        index = TextIndex()
+        for key, obj in objs_dict.items():
+            index.set(key, document(obj, TEXT.get(name, ())))
+        return {key: objs_dict[key]
+                for score, key in index.search(query, limit)}
+
+    def where(self, cls, conditions, order_by=None, limit=None):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        meeting every condition, by <class name>.id: conditions is a list
+        of (attribute, operator, value) or of their texts (ex:
+        "max_guest >= 4", see models/engine/query.py).
+        Sorted by the attribute order_by (-<attribute>: descending) and
+        cut to the first limit objects when given.
+        The conditions on INDEXES and COLUMNS attributes pick the
+        candidates through find_by() and between().
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        conditions = query.conditions_of(conditions)
+        candidates = None
+        for attr, op, value in conditions:
+            if op == '==' and attr in INDEXES.get(name, ()):
+                found = self.find_by(name, attr, value)
+            elif attr in COLUMNS.get(name, ()) and op in query.RANGES \
+                    and type(value) in (int, float):
+                low = value if op in ('==', '>', '>=') else None
+                high = value if op in ('==', '<', '<=') else None
+                found = self.between(name, attr, low, high)
+            else:
+                continue
+            candidates = found if candidates is None else \
+                {key: obj for key, obj in candidates.items() if key in found}
+        if candidates is None:
+            candidates = self.all(name)
+
+        match = query.predicate(conditions)
+        found = ((key, obj) for key, obj in candidates.items() if match(obj))
+        if order_by:
+            key = query.sort_key(order_by.lstrip('-'))
+            descending = order_by.startswith('-')
+            if limit is not None:
+                pick = heapq.nlargest if descending else heapq.nsmallest
+                found = pick(limit, found, key=lambda item: key(item[1]))
+            else:
+                found = sorted(found, key=lambda item: key(item[1]),
+                               reverse=descending)
+        elif limit is not None:
+            found = itertools.islice(found, limit)
+        return dict(found)
+
+    def page(self, cls=None, limit=None, after=None):
+        '''
+        Returns the dict of the first limit objects (all when None) of
+        class cls (a class or its name, or every class when None) by
+        <class name>.id, in the order of their ids (of their keys for
+        every class), from the one after the cursor after: an id (a key
+        for every class) such as the last one of the previous page
+        '''
+
+        objs_dict = self.all(cls)
+        keys = sorted(objs_dict)
+        if after is not None and cls is not None:
+            name = cls if isinstance(cls, str) else cls.__name__
+            after = f'{name}.{after}'
+        start = 0 if after is None else bisect.bisect_right(keys, after)
+        stop = None if limit is None else start + limit
+        return {key: objs_dict[key] for key in keys[start:stop]}
+
+    def stream(self, cls=None, limit=None, after=None, page_size=PAGE_SIZE):
+        '''
+        Yields the objects page() would return, reading them page_size
+        at a time, so only one page is held at once
+        '''
+
+        while limit is None or limit > 0:
+            size = page_size if limit is None else min(page_size, limit)
+            objs_dict = self.page(cls, size, after)
+            if not objs_dict:
+                return
+            yield from objs_dict.values()
+            if limit is not None:
+                limit -= len(objs_dict)
+            after = next(reversed(objs_dict))
+            if cls is not None:
+                after = after.split('.', 1)[1]
+
+    def import_file(self, cls, path, fmt=None, chunk_size=bulk.CHUNK_SIZE):
+        '''
+        Adds the objects of class cls (a class or its name) of the records
+        of the file path (fmt: 'ndjson' or 'csv', default: by extension),
+        read one by one and saved once every chunk_size records.
+        A record with the id of an object replaces it.
+        Returns (the number of objects added, [(line, error message)]).
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        model = self.classes()[name]
+        defaults = bulk.fields(model)
+        fmt = bulk.format_of(path, fmt)
+        count, errors = 0, []
+        with open(path, newline='', encoding='utf-8') as f:
+            records = bulk.read(f, fmt)
+            while True:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                with self.batch():
+                    for line, record, extra in chunk:
+                        try:
+                            if isinstance(record, ValueError):
+                                raise record
+                            obj = model(**bulk.coerce(record, defaults,
+                                                      extra))
+                        except (ValueError, TypeError) as error:
+                            errors.append((line, str(error)))
+                            continue
+                        self.new(obj)
+                        count += 1
+                    self.save()
+        return count, errors
+
+    def export_file(self, cls, path, fmt=None):
+        '''
+        Writes the objects of class cls (a class or its name) to the file
+        path (fmt: 'ndjson' or 'csv', default: by extension), one record
+        at a time, streaming the objects a page at a time.
+        Returns the number of objects written.
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        count = 0
+        fmt = bulk.format_of(path, fmt)
+        with open(path, 'w', newline='', encoding='utf-8',
+                  buffering=bulk.BUFFER_SIZE) as f:
+            write = bulk.writer(f, fmt, self.classes()[name])
+            for obj in self.stream(name):
+                write(obj)
+                count += 1
+        return count
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''Groups changes (see the engine for what it guarantees)'''
+
+        yield self
+
+    batch = transaction
+
+    def flush(self):
+        '''Blocks until every save() so far is written'''
+
+    def refresh(self):
+        '''Picks up the changes other processes saved'''
+
+    def wait(self):
+        '''Blocks until the background work of the engine is done'''
+
+    @staticmethod
+    def classes():
+        '''
+        Returns the model classes by name, or their compact variants
+        when $HBNB_COMPACT_MODELS is set
+        '''
+
+        from models.base_model import BaseModel
+        from models.user import User
+        from models.state import State
+        from models.city import City
+        from models.place import Place
+        from models.amenity import Amenity
+        from models.review import Review
+
+        classes = {
+                'BaseModel': BaseModel,
+                'User': User,
+                'State': State,
+                'City': City,
+                'Place': Place,
+                'Amenity': Amenity,
+                'Review': Review
+                }
+        if COMPACT:
+            from models.compact import compact
+            classes = {name: compact(cls) for name, cls in classes.items()}
+        return classes
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+'''
+This module reads and writes the records of bulk imports and exports
+
+Two formats are supported, both streamed record by record:
+    ndjson - one JSON object (the to_dict() of an instance) per line
+    csv - a header row, then one row per instance: id, created_at,
+          updated_at, one column per class attribute of the model (lists
+          are JSON) and `extra`, a JSON object of the other attributes
+          and of the values not of the type of their class attribute
+
+The values read for class attributes are converted to the type of the
+class attribute (ex: "3" for Place.max_guest becomes 3): a record with a
+value that cannot be converted is rejected.
+'''
+import csv
+import datetime
+import uuid
+from models.engine import codec
+
+FORMATS = ('ndjson', 'csv')
+# The number of records imported between two saves
+CHUNK_SIZE = 1000
+# The size of the write buffer of exports
+BUFFER_SIZE = 1024 * 1024
+# The attributes every instance has
+BASE_FIELDS = ('id', 'created_at', 'updated_at')
+# The types of class attribute a value is coerced to
+TYPES = (str, int, float, list)
+
+
+def format_of(path, fmt=None):
+    '''
+    Returns fmt, or the format of the file path by its extension
+    ('.csv': csv, else ndjson). Raises ValueError for an unknown fmt.
+    '''
+
+    if fmt is None:
+        return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format {fmt!r}, expecting one of '
+                         f'{", ".join(FORMATS)}')
+    return fmt
+
+
+def fields(cls):
+    '''Returns the {attribute: default} of the class attributes of cls'''
+
+    defaults = {}
+    for klass in reversed(cls.__mro__):
+        for attr, default in vars(klass).items():
+            if not attr.startswith('_') and type(default) in TYPES:
+                defaults[attr] = default
+    return defaults
+
+
+def convert(value, default):
+    '''
+    Returns value converted to the type of default, when it is a string
+    (or an int for a float). Raises ValueError when it cannot be.
+    '''
+
+    if type(value) is type(default):
+        return value
+    if isinstance(default, float) and type(value) is int:
+        return float(value)
+    if not isinstance(value, str):
+        raise ValueError(f'expecting {type(default).__name__}, '
+                         f'got {value!r}')
+    if isinstance(default, list):
+        value = codec.loads(value)
+        if not isinstance(value, list):
+            raise ValueError('expecting a JSON list')
+        return value
+    return type(default)(value)
+
+
+def coerce(record, defaults, extra=None):
+    '''
+    Returns the kwargs of an instance from record, whose values of class
+    attributes (defaults) are converted, and extra, taken as it is.
+    Creates the missing id and dates.
+    Raises ValueError when a value cannot be converted.
+    '''
+
+    kwargs = {}
+    for attr, value in record.items():
+        if attr == '__class__':
+            continue
+        if attr in defaults and attr not in BASE_FIELDS:
+            try:
+                value = convert(value, defaults[attr])
+            except ValueError as error:
+                raise ValueError(f'{attr}: {error}')
+        kwargs[attr] = value
+    kwargs.update(extra or {})
+
+    if not kwargs.get('id'):
+        kwargs['id'] = str(uuid.uuid4())
+    for attr in ('created_at', 'updated_at'):
+        if not kwargs.get(attr):
+            kwargs[attr] = datetime.datetime.now().isoformat()
+    return kwargs
+
+
+def read(f, fmt):
+    '''
+    Yields the (line number, record dict, extra dict) read from the
+    file f (extra: the `extra` column of csv, taken as it is).
+    A line that is not a record yields (line number, ValueError, None).
+    '''
+
+    if fmt == 'ndjson':
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = codec.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('expecting a JSON object')
+            except ValueError as error:
+                yield number, ValueError(str(error)), None
+                continue
+            yield number, record, None
+        return
+
+    reader = csv.DictReader(f)
+    for row in reader:
+        extra = row.pop('extra', None)
+        record = {attr: value for attr, value in row.items()
+                  if attr is not None and value not in ('', None)}
+        try:
+            extra = codec.loads(extra) if extra else {}
+            if not isinstance(extra, dict):
+                raise ValueError('expecting a JSON object')
+        except ValueError as error:
+            yield reader.line_num, ValueError(f'extra: {error}'), None
+            continue
+        yield reader.line_num, record, extra
+
+
+def writer(f, fmt, cls):
+    '''Returns a function writing an instance of cls to f as a record'''
+
+    if fmt == 'ndjson':
+        return lambda obj: f.write(codec.dumps(codec.record(obj)) + '\n')
+
+    defaults = fields(cls)
+    columns = list(BASE_FIELDS) + \
+        [attr for attr in defaults if attr not in BASE_FIELDS]
+    rows = csv.writer(f)
+    rows.writerow(columns + ['extra'])
+
+    def write(obj):
+        '''Writes the row of obj'''
+
+        extra = obj.to_dict()
+        del extra['__class__']
+        row = []
+        for attr in columns:
+            value = extra.get(attr, '')
+            if attr in defaults and \
+                    type(value) is not type(defaults[attr]):
+                # Kept as it is in extra
+                row.append('')
+                continue
+            extra.pop(attr, None)
+            row.append(codec.dumps(value) if isinstance(value, list)
+                       else value)
+        row.append(codec.dumps(extra) if extra else '')
+        rows.writerow(row)
+
+    return write
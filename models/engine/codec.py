@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+'''
+This module implements the JSON codec of the storage engines
+
+dumps() writes compact JSON (no spaces after separators) and encodes
+datetimes natively, as their isoformat() text, so the records of
+instances are encoded from their state (record()) without building
+to_dict() first. loads() reads JSON.
+
+The codec uses orjson when it is installed, else the json module of the
+standard library. $HBNB_JSON_CODEC ('orjson' or 'json') forces one.
+Values orjson rejects (ex: integers past 64 bits, lone surrogates) or
+writes as null (NaN and infinities) fall back to the json module, so
+both codecs accept and read back the same values.
+'''
+import datetime
+import json
+import math
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CODECS = ('orjson', 'json')
+CODEC = os.getenv('HBNB_JSON_CODEC', 'orjson' if orjson else 'json')
+if CODEC not in CODECS or (CODEC == 'orjson' and orjson is None):
+    raise ValueError(f'Unavailable JSON codec {CODEC!r}, expecting one '
+                     f'of {", ".join(CODECS)} (orjson when installed)')
+
+
+def default(obj):
+    '''Returns the JSON value of obj, for the types JSON lacks'''
+
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} '
+                    f'is not JSON serializable')
+
+
+# Built once: json.dumps() builds an encoder per call given options
+ENCODER = json.JSONEncoder(separators=(',', ':'), default=default)
+
+
+def json_dumps(obj):
+    '''Returns the compact JSON text of obj, with the json module'''
+
+    return ENCODER.encode(obj)
+
+
+def json_loads(text):
+    '''
+    Returns the value of the JSON text (str or bytes-like), with the
+    json module
+    '''
+
+    if isinstance(text, memoryview):
+        text = bytes(text)
+    return json.loads(text)
+
+
+def finite(obj):
+    '''Returns False if obj holds a NaN or infinite float, else True'''
+
+    if isinstance(obj, float):
+        return math.isfinite(obj)
+    if isinstance(obj, dict):
+        return all(finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return all(finite(value) for value in obj)
+    return True
+
+
+def orjson_dumps(obj):
+    '''Returns the compact JSON text of obj, with orjson'''
+
+    try:
+        text = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return json_dumps(obj)
+    # orjson writes NaN and infinities as null: only a text holding a
+    # null is checked for them
+    if b'null' in text and not finite(obj):
+        return json_dumps(obj)
+    return text.decode()
+
+
+def orjson_loads(text):
+    '''Returns the value of the JSON text, with orjson'''
+
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json_loads(text)
+
+
+if CODEC == 'orjson':
+    dumps, loads = orjson_dumps, orjson_loads
+else:
+    dumps, loads = json_dumps, json_loads
+
+
+def record(obj):
+    '''
+    Returns the record of the instance obj: the dict to_dict() returns,
+    with datetimes left to dumps()
+    '''
+
+    obj_dict = obj.__getstate__()
+    obj_dict['__class__'] = obj.__class__.__name__
+    return obj_dict
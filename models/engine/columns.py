@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+'''
+This module implements the ColumnStore class, a columnar copy of the
+numeric attributes of the objects of a class (ex: Place.price_by_night)
+
+Each attribute is mirrored in an array('d'), one row per object, so the
+filters and aggregates of the search pages run over flat arrays with
+builtins (map, compress, fsum) instead of reading the attributes of every
+object. A value that is not a number (unset attributes read as their
+class default, which is a number) is stored as NaN and never matches.
+'''
+import array
+import itertools
+import math
+import operator
+
+NAN = float('nan')
+
+# The functions of aggregate(), over a list of floats
+AGGREGATES = {
+        'count': len,
+        'sum': math.fsum,
+        'min': lambda values: min(values) if values else None,
+        'max': lambda values: max(values) if values else None,
+        'avg': lambda values: math.fsum(values) / len(values)
+        if values else None
+        }
+
+
+def number(value):
+    '''Returns value as a float, or NaN when it is not a number'''
+
+    if type(value) in (int, float):
+        return float(value)
+    return NAN
+
+
+def aggregate(values, func):
+    '''Returns func ('count', 'sum', 'min', 'max' or 'avg') of values'''
+
+    if func not in AGGREGATES:
+        raise ValueError(f'Unknown aggregate {func!r}, expecting one of '
+                         f'{", ".join(AGGREGATES)}')
+    return AGGREGATES[func](list(itertools.filterfalse(math.isnan, values)))
+
+
+class ColumnStore():
+    '''
+    Typed arrays mirroring the numeric attributes of a set of objects
+
+    Private instance attributes:
+        __columns (dict) - attribute -> array('d'), a value per row
+        __keys (list) - the <class name>.id of every row
+        __rows (dict) - <class name>.id -> row
+
+    Public instance methods:
+        set(self, key, obj)
+        remove(self, key)
+        between(self, attr, low=None, high=None)
+        aggregate(self, attr, func, keys=None)
+    '''
+
+    def __init__(self, attrs):
+        '''Initialize an empty store of the numeric attributes attrs'''
+
+        self.__columns = {attr: array.array('d') for attr in attrs}
+        self.__keys = []
+        self.__rows = {}
+
+    def __len__(self):
+        '''Returns the number of rows'''
+
+        return len(self.__keys)
+
+    def set(self, key, obj):
+        '''Adds the row of obj at key, or updates it'''
+
+        row = self.__rows.get(key)
+        if row is None:
+            self.__rows[key] = len(self.__keys)
+            self.__keys.append(key)
+            for attr, column in self.__columns.items():
+                column.append(number(getattr(obj, attr, None)))
+        else:
+            for attr, column in self.__columns.items():
+                column[row] = number(getattr(obj, attr, None))
+
+    def remove(self, key):
+        '''Removes the row at key (the last row takes its place)'''
+
+        row = self.__rows.pop(key, None)
+        if row is None:
+            return
+        last = self.__keys.pop()
+        for column in self.__columns.values():
+            value = column.pop()
+            if row < len(column):
+                column[row] = value
+        if row < len(self.__keys):
+            self.__keys[row] = last
+            self.__rows[last] = row
+
+    def between(self, attr, low=None, high=None):
+        '''
+        Returns the keys of the rows whose attr is a number
+        from low to high (both included, None: no bound)
+        '''
+
+        column = self.__columns[attr]
+        if low is None and high is None:
+            # NaN is the only value not equal to itself
+            mask = map(operator.eq, column, column)
+        elif high is None:
+            mask = map(operator.le, itertools.repeat(low), column)
+        elif low is None:
+            mask = map(operator.ge, itertools.repeat(high), column)
+        else:
+            mask = map(operator.and_,
+                       map(operator.le, itertools.repeat(low), column),
+                       map(operator.ge, itertools.repeat(high), column))
+        return list(itertools.compress(self.__keys, mask))
+
+    def aggregate(self, attr, func, keys=None):
+        '''
+        Returns func ('count', 'sum', 'min', 'max' or 'avg') of the
+        numbers of attr, over every row or only those of keys
+        (None when there are no numbers, except for count and sum)
+        '''
+
+        column = self.__columns[attr]
+        if keys is not None:
+            column = map(column.__getitem__,
+                         map(self.__rows.__getitem__, keys))
+        return aggregate(column, func)
@@ -1,76 +1,1277 @@
 #!/usr/bin/python3
 '''This module implements the FileStorage class'''
-import json
+import atexit
+import bisect
+import contextlib
+import os
+import threading
+import weakref
+from models.engine.base_storage import BaseStorage, COLUMNS, GEO, \
+    INDEXES, TEXT, document, restore
+from models.engine import codec, snapshot
+from models.engine.columns import ColumnStore
+from models.engine.geo import GridIndex, coordinates
+from models.engine.text_index import TextIndex
 
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on this platform: shared mode cannot lock
+    fcntl = None
 
-class FileStorage():
+DURABILITY_LEVELS = ('none', 'flush', 'fsync', 'fsync-dir')
+STORAGE_FORMATS = ('json', 'binary')
+
+
+class FileStorage(BaseStorage):
     '''
-    A FileStorage class that serializes instances to a JSON file
+    A FileStorage class that serializes instances to a JSON file
     and deserializes JSON file to instances
 
     Private class attributes:
-        __file_path (str) - path to the JSON file (ex: file.json)
+        __format (str) - the format save() writes: 'json' (a JSON file)
+                         or 'binary' (a snapshot, see snapshot.py).
+                         reload() reads both.
+        __file_path (str) - path to the JSON file (ex: file.json, or
+                            file.hbnb for snapshots)
         __objects (dict) - empty but will store all objects by <class name>.id
+        __journal (bool) - when True, save() appends the changed records
+                           to a write-ahead log (<file path>.log) instead
+                           of rewriting the whole JSON file
+        __journal_limit (int) - size in bytes past which the log is
+                                compacted into the JSON file in background
+        __changes (dict) - keys changed since the last save, mapped to
+                           their object (or None when deleted)
+        __classes (dict) - per-class index: class name -> the dict of
+                           that class's objects by <class name>.id
+        __attr_indexes (dict) - declares the indexed attributes:
+                                class name -> tuple of attribute names
+        __values (dict) - attribute indexes: (class name, attribute) ->
+                          value -> the dict of matching objects by key
+        __entries (dict) - the indexed values of each object by key, to
+                           move it between buckets when they change
+        __valued (set) - the classes whose attribute indexes are built:
+                         by the first find_by() or aggregate() that reads
+                         them, not by reload(), then kept in sync
+        __columns (dict) - class name -> ColumnStore of its COLUMNS
+        __grids (dict) - class name of GEO -> GridIndex of the points
+                         (latitude, longitude) of its objects
+        __texts (dict) - class name of TEXT -> TextIndex of the text of
+                         its objects, saved to <file path>.search
+        (the three are built by the first query that reads them, not by
+        reload(), then kept in sync)
+        __saved_texts (dict) - class name -> TextIndex read from
+                               <file path>.search, which the first
+                               search() updates instead of tokenizing
+                               the unchanged texts again. None until
+                               that first search() reads the file
+        __sorted (dict) - class name (None: every class) -> the sorted
+                          list of the keys, for page(). Built on demand,
+                          dropped when a key is added; deleted keys are
+                          skipped as they are met
+        __cache (WeakKeyDictionary) - JSON text of every clean object.
+                                      touch() evicts an object, so a save
+                                      only re-encodes the dirty ones
+        __blobs (WeakKeyDictionary) - the same, for the snapshot bodies
+                                      (reload() keeps those it read)
+        __encoding (object) - the object being encoded for the caches
+        __stale (bool) - whether __encoding was touched while encoded:
+                         its text is then not cached (it may be old)
+        __durability (str) - how hard save() makes sure data hit the disk:
+            'none'      - rewrite the JSON file in place (no crash safety)
+            'flush'     - write a temporary file and rename it over the
+                          JSON file, so a reader never sees half of it
+            'fsync'     - also fsync() the file (and each journal append)
+            'fsync-dir' - also fsync() the directory after the rename
+        __lazy (bool) - when True, reload() keeps the records as dicts
+                        and only builds the instances that get asked for.
+                        A snapshot with an index is mapped instead of
+                        read: only the records asked for are decoded
+        __raw (dict) - the records not built yet: class name -> the dict
+                       of their dictionaries by <class name>.id (or the
+                       snapshot.Records of the mapped snapshot)
+        __write_behind (float) - when above 0, save() returns at once and
+                                 a flusher thread writes the file at most
+                                 every __write_behind seconds
+        __write_behind_max (int) - number of changed objects past which
+                                   the flusher writes without waiting
+        __pending (bool) - whether a save is waiting for the flusher
+        __shared (bool) - when True, several processes may use the file:
+                          saves lock it (fcntl) and merge the records
+                          other processes saved, see refresh()
+        __seen (tuple) - the __signature() of the files when this
+                         process last read or wrote them
+        __depth (int) - how many transaction() blocks are open
+        __deferred (bool) - whether save() was called inside them
+        __undo (dict) - the state of every object the open transaction
+                        changed, by key: (object or None, its state)
 
     Public instance methods:
-        all(self):
+        all(self, cls=None)
+        count(self, cls=None)
         new(self, obj)
+        remember(self, obj)
+        touch(self, obj)
+        get(self, cls, inst_id)
+        find_by(self, cls, attr, value)
+        between(self, cls, attr, low=None, high=None)
+        aggregate(self, cls, attr, func='avg', by=None)
+        within(self, cls, south, west, north, east)
+        near(self, cls, lat, lon, km)
+        nearest(self, cls, lat, lon, k=1)
+        search(self, cls, query, limit=None)
+        page(self, cls=None, limit=None, after=None)
+        delete(self, obj)
         save(self)
+        flush(self)
         reload(self)
+        refresh(self)
+        wait(self)
+        transaction(self) (alias: batch)
     '''
 
-    __file_path = 'file.json'
+    __format = os.getenv('HBNB_STORAGE_FORMAT', 'json')
+    __file_path = 'file.hbnb' if __format == 'binary' else 'file.json'
     __objects = {}
+    __journal = os.getenv('HBNB_STORAGE_MODE') == 'journal'
+    __journal_limit = int(os.getenv('HBNB_JOURNAL_LIMIT', 4 * 1024 * 1024))
+    __changes = {}
+    __classes = {}
+    __attr_indexes = INDEXES
+    __values = {}
+    __entries = {}
+    __valued = set()
+    __columns = {}
+    __grids = {}
+    __texts = {}
+    __saved_texts = {}
+    __sorted = {}
+    __indexed = None
+    __cache = weakref.WeakKeyDictionary()
+    __blobs = weakref.WeakKeyDictionary()
+    __encoding = None
+    __stale = False
+    __cache_lock = threading.Lock()
+    __durability = os.getenv('HBNB_STORAGE_DURABILITY', 'flush')
+    __lazy = os.getenv('HBNB_STORAGE_LAZY', '') not in ('', '0')
+    __raw = {}
+    __compactor = None
+    __lock = threading.Lock()
+    __changes_lock = threading.Lock()
+    __write_behind = float(os.getenv('HBNB_WRITE_BEHIND', 0))
+    __write_behind_max = int(os.getenv('HBNB_WRITE_BEHIND_MAX', 1000))
+    __pending = False
+    __flusher = None
+    __save_lock = threading.RLock()
+    __wakeup = threading.Condition()
+    __shared = os.getenv('HBNB_STORAGE_SHARED', '') not in ('', '0')
+    __seen = None
+    __depth = 0
+    __deferred = False
+    __undo = {}
+
+    def all(self, cls=None):
+        '''
+        Returns the dictionary __objects, or only the objects of class cls
+        (a class or its name) when given
+        '''
 
-    def all(self):
-        '''Returns the dictionary __objects'''
+        if cls is None:
+            self.__load()
+            return FileStorage.__objects
+        cls_name = self.__name(cls)
+        self.__load(cls_name)
+        return dict(self.__index().get(cls_name, {}))
 
-        return FileStorage.__objects
+    def count(self, cls=None):
+        '''Returns the number of objects, or of objects of class cls'''
+
+        raw = FileStorage.__raw
+        if cls is None:
+            return len(FileStorage.__objects) + \
+                sum(len(records) for records in raw.values())
+        cls_name = self.__name(cls)
+        return len(self.__index().get(cls_name, {})) + \
+            len(raw.get(cls_name, {}))
 
     def new(self, obj):
         '''Sets in __objects the obj with key <obj class name>.id'''
 
-        FileStorage.__objects[f'{obj.__class__.__name__}.{obj.id}'] = obj
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        if FileStorage.__depth and key not in FileStorage.__undo:
+            old = FileStorage.__objects.get(key)
+            FileStorage.__undo[key] = \
+                (old, None if old is None else old.__getstate__())
+        self.__store(key, obj)
+        with FileStorage.__changes_lock:
+            FileStorage.__changes[key] = obj
+
+    def __store(self, key, obj):
+        '''Sets obj in __objects at key, and in the indexes'''
+
+        if FileStorage.__raw:
+            FileStorage.__raw.get(key.split('.')[0], {}).pop(key, None)
+        self.__index()
+        if key in FileStorage.__objects:
+            self.__unlink(key)
+        FileStorage.__objects[key] = obj
+        self.__link(key, obj)
+
+    def remember(self, obj):
+        '''
+        Keeps the state obj has before being changed inside a
+        transaction, so it can be rolled back.
+        Called by BaseModel.__setattr__ before every assignment.
+        '''
+
+        if not FileStorage.__depth or getattr(obj, 'id', None) is None:
+            return
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        if key not in FileStorage.__undo and \
+                FileStorage.__objects.get(key) is obj:
+            FileStorage.__undo[key] = (obj, obj.__getstate__())
+
+    def touch(self, obj):
+        '''
+        Records that obj changed, so the next save() writes it.
+        Called by BaseModel.__setattr__ on every attribute assignment;
+        in-place changes (ex: amenity_ids.append()) need an explicit call.
+        '''
+
+        with FileStorage.__cache_lock:
+            FileStorage.__cache.pop(obj, None)
+            FileStorage.__blobs.pop(obj, None)
+            if obj is FileStorage.__encoding:
+                FileStorage.__stale = True
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        if FileStorage.__objects.get(key) is obj:
+            with FileStorage.__changes_lock:
+                FileStorage.__changes[key] = obj
+            cls_name = key.split('.')[0]
+            entry = FileStorage.__entries.get(key)
+            if entry is not None and \
+                    entry != self.__attr_values(obj, cls_name):
+                self.__unlink(key)
+                self.__link(key, obj)
+            elif cls_name in FileStorage.__columns:
+                FileStorage.__columns[cls_name].set(key, obj)
+            if cls_name in FileStorage.__grids:
+                FileStorage.__grids[cls_name].set(key, *coordinates(obj))
+            if cls_name in FileStorage.__texts:
+                FileStorage.__texts[cls_name].set(
+                        key, document(obj, TEXT[cls_name]))
+
+    def get(self, cls, inst_id):
+        '''
+        Returns the object of class cls (a class or its name)
+        with the given id, or None
+        '''
+
+        key = f'{self.__name(cls)}.{inst_id}'
+        self.__load(key=key)
+        return FileStorage.__objects.get(key)
+
+    def find_by(self, cls, attr, value):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose attribute attr equals value, by <class name>.id.
+        Uses the attribute index when attr is indexed, else scans cls.
+        '''
+
+        cls_name = self.__name(cls)
+        self.__load(cls_name)
+        self.__index()
+        if attr in FileStorage.__attr_indexes.get(cls_name, ()):
+            self.__value_index(cls_name)
+            try:
+                values = FileStorage.__values.get((cls_name, attr), {})
+                return dict(values.get(value, {}))
+            except TypeError:
+                pass
+        return {key: obj for key, obj in self.all(cls_name).items()
+                if getattr(obj, attr, None) == value}
+
+    def between(self, cls, attr, low=None, high=None):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose attribute attr is a number from low to high (both included,
+        None: no bound), by <class name>.id.
+        Filters the column of attr when it is in COLUMNS, else scans cls.
+        '''
+
+        cls_name = self.__name(cls)
+        if attr not in COLUMNS.get(cls_name, ()):
+            return super().between(cls_name, attr, low, high)
+        store = self.__column(cls_name)
+        return {key: FileStorage.__objects[key]
+                for key in store.between(attr, low, high)}
+
+    def aggregate(self, cls, attr, func='avg', by=None):
+        '''
+        Returns func ('count', 'sum', 'min', 'max' or 'avg') of the
+        numbers of attribute attr of the objects of class cls, or a dict
+        of them by value of the attribute by (ex: 'city_id').
+        Reads the column of attr when it is in COLUMNS, and groups with
+        the attribute index of by when there is one.
+        '''
+
+        cls_name = self.__name(cls)
+        if attr not in COLUMNS.get(cls_name, ()) or (
+                by is not None and
+                by not in FileStorage.__attr_indexes.get(cls_name, ())):
+            return super().aggregate(cls_name, attr, func, by)
+        store = self.__column(cls_name)
+        if by is None:
+            return store.aggregate(attr, func)
+        self.__value_index(cls_name)
+        return {group: store.aggregate(attr, func, bucket)
+                for group, bucket in
+                FileStorage.__values.get((cls_name, by), {}).items()}
+
+    def within(self, cls, south, west, north, east):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose point (latitude, longitude) is in the box, by <class name>.id.
+        The box crosses the 180th meridian when west > east.
+        '''
+
+        grid = self.__grid(cls)
+        if grid is None:
+            return super().within(cls, south, west, north, east)
+        return {key: FileStorage.__objects[key]
+                for key in grid.within(south, west, north, east)}
+
+    def near(self, cls, lat, lon, km):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        within km of (lat, lon), by <class name>.id, from the nearest
+        '''
+
+        grid = self.__grid(cls)
+        if grid is None:
+            return super().near(cls, lat, lon, km)
+        return {key: FileStorage.__objects[key]
+                for dist, key in grid.near(lat, lon, km)}
+
+    def nearest(self, cls, lat, lon, k=1):
+        '''
+        Returns the dict of the k objects of class cls (a class or its
+        name) nearest (lat, lon), by <class name>.id, from the nearest
+        '''
+
+        grid = self.__grid(cls)
+        if grid is None:
+            return super().nearest(cls, lat, lon, k)
+        return {key: FileStorage.__objects[key]
+                for dist, key in grid.nearest(lat, lon, k)}
+
+    def search(self, cls, query, limit=None):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose TEXT attributes match words of query, by <class name>.id,
+        from the best BM25 score (the first limit ones only)
+        '''
+
+        cls_name = self.__name(cls)
+        if cls_name not in TEXT:
+            return super().search(cls_name, query, limit)
+        index = self.__text(cls_name)
+        return {key: FileStorage.__objects[key]
+                for score, key in index.search(query, limit)}
+
+    def page(self, cls=None, limit=None, after=None):
+        '''
+        Returns the dict of the first limit objects (all when None) of
+        class cls (a class or its name, or every class when None) by
+        <class name>.id, in the order of their ids (of their keys for
+        every class), from the one after the cursor after: an id (a key
+        for every class) such as the last one of the previous page.
+        Bisects the sorted keys, kept until a key is added.
+        '''
+
+        cls_name = None if cls is None else self.__name(cls)
+        self.__load(cls_name)
+        self.__index()
+        keys = FileStorage.__sorted.get(cls_name)
+        if keys is None:
+            keys = sorted(FileStorage.__objects if cls_name is None
+                          else FileStorage.__classes.get(cls_name, {}))
+            FileStorage.__sorted[cls_name] = keys
+        if after is not None and cls_name is not None:
+            after = f'{cls_name}.{after}'
+        start = 0 if after is None else bisect.bisect_right(keys, after)
+
+        objs_dict = {}
+        # Indexed from start: islice() would step over the start keys
+        # before it, on every page
+        for i in range(start, len(keys)):
+            if limit is not None and len(objs_dict) >= limit:
+                break
+            key = keys[i]
+            obj = FileStorage.__objects.get(key)
+            if obj is not None:
+                objs_dict[key] = obj
+        return objs_dict
+
+    def delete(self, obj):
+        '''
+        Removes obj from __objects. obj may also be a <class name>.id key.
+        Returns the removed object, or None when there was none.
+        '''
+
+        if isinstance(obj, str):
+            key = obj
+        else:
+            key = f'{obj.__class__.__name__}.{obj.id}'
+        self.__load(key=key)
+        self.__index()
+        removed = FileStorage.__objects.pop(key, None)
+        if removed is not None:
+            if FileStorage.__depth and key not in FileStorage.__undo:
+                FileStorage.__undo[key] = (removed, removed.__getstate__())
+            self.__unlink(key)
+            with FileStorage.__changes_lock:
+                FileStorage.__changes[key] = None
+        return removed
 
     def save(self):
-        '''Serializes __objects to the JSON file (path: __file_path)'''
+        '''
+        Serializes __objects to the JSON file (path: __file_path).
+        Inside a transaction, only notes that a save is due.
+        In write-behind mode, leaves the writing to the flusher thread.
+        '''
 
-        dict_objs = {}
-        for key, obj in FileStorage.__objects.items():
-            dict_objs[key] = obj.to_dict()
-        with open(FileStorage.__file_path, 'w', encoding='utf-8') as f:
-            json.dump(dict_objs, f)
+        if FileStorage.__depth:
+            FileStorage.__deferred = True
+            return
+
+        if FileStorage.__write_behind > 0:
+            FileStorage.__pending = True
+            self.__start_flusher()
+            if len(FileStorage.__changes) >= FileStorage.__write_behind_max:
+                with FileStorage.__wakeup:
+                    FileStorage.__wakeup.notify()
+            return
+
+        with FileStorage.__save_lock:
+            self.__save_now()
+
+    def flush(self):
+        '''
+        Writes what save() left to the write-behind flusher, and waits
+        for a write in progress: when it returns, the file is up to date
+        '''
+
+        with FileStorage.__save_lock:
+            if FileStorage.__pending:
+                FileStorage.__pending = False
+                self.__save_now()
 
     def reload(self):
-        '''Deserializes the JSON file to __objects'''
+        '''
+        Deserializes the JSON file (and its journal) to __objects.
+        The JSON file is streamed: each record becomes an instance before
+        the next one is read, so the parsed file is never held whole.
+        In lazy mode the records are kept as dicts until asked for, and
+        a snapshot with an index is mapped: reloading it costs the same
+        at any size.
+        '''
+
+        self.flush()
+        self.wait()
+        with self.__locked():
+            mapped = self.__map()
+            FileStorage.__saved_texts = {} if mapped else None
+            models = self.classes()
+            # The bodies read from a snapshot spare the next save()
+            # encoding the objects again
+            binary = self.__storage_format() == 'binary'
+            for key, obj_dict, obj_body in self.__records(mapped):
+                if obj_dict is None:
+                    self.delete(key)
+                else:
+                    self.__build(key, obj_dict, models,
+                                 obj_body if binary else None)
+            with FileStorage.__changes_lock:
+                FileStorage.__changes = {}
+            FileStorage.__seen = self.__signature()
 
+    def refresh(self):
+        '''
+        In shared mode, merges the objects other processes saved since
+        the last reload, save or refresh: only the records that changed
+        are rebuilt, and the local unsaved changes are kept
+        '''
+
+        if FileStorage.__shared:
+            with self.__locked():
+                self.__merge()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''
+        Groups changes: save() calls inside the with block are coalesced
+        into one save when it ends, and if it raises, every object is
+        put back as it was before the block. Nested blocks join the
+        outermost one. In-place changes (ex: amenity_ids.append()) are
+        only rolled back if remember() was called before them.
+
+        Ex: with storage.transaction():
+                ...
+        '''
+
+        outermost = FileStorage.__depth == 0
+        if outermost:
+            FileStorage.__undo = {}
+            FileStorage.__deferred = False
+        FileStorage.__depth += 1
         try:
-            with open(FileStorage.__file_path, encoding='utf-8') as f:
-                dict_objs = json.load(f)
-
-            from models.base_model import BaseModel
-            from models.user import User
-            from models.state import State
-            from models.city import City
-            from models.place import Place
-            from models.amenity import Amenity
-            from models.review import Review
-
-            classes = {
-                    'BaseModel': BaseModel,
-                    'User': User,
-                    'State': State,
-                    'City': City,
-                    'Place': Place,
-                    'Amenity': Amenity,
-                    'Review': Review
-                    }
-
-            for key, obj_dict in dict_objs.items():
-                cls_name, inst_id = key.split('.')
-                cls = classes[cls_name]
-                new_obj = cls(**obj_dict)
-                self.new(new_obj)
+            yield self
+        except BaseException:
+            FileStorage.__depth -= 1
+            if outermost:
+                self.__rollback()
+            raise
+        FileStorage.__depth -= 1
+        if outermost:
+            FileStorage.__undo = {}
+            if FileStorage.__deferred:
+                FileStorage.__deferred = False
+                self.save()
+
+    batch = transaction
+
+    def wait(self):
+        '''Blocks until a running journal compaction is done'''
+
+        compactor = FileStorage.__compactor
+        if compactor is not None:
+            compactor.join()
+
+    def __save_now(self):
+        '''
+        Writes the changes (journal) or the whole JSON file.
+        In shared mode, first merges what other processes saved,
+        all under an exclusive lock.
+        '''
+
+        if not FileStorage.__journal:
+            # Before locking: the compaction thread takes the lock too
+            self.wait()
+        with self.__locked(exclusive=True):
+            if FileStorage.__shared:
+                self.__merge()
+            if FileStorage.__journal:
+                self.__append()
+            else:
+                self.__rewrite()
+            FileStorage.__seen = self.__signature()
+
+    def __rewrite(self):
+        '''Rewrites the whole JSON file (or snapshot)'''
+
+        with FileStorage.__changes_lock:
+            FileStorage.__changes = {}
+        binary = self.__storage_format() == 'binary'
+        # Copies: the flusher thread runs this while objects may change
+        parts = []
+        for key, obj in list(FileStorage.__objects.items()):
+            if binary:
+                parts.append((key, self.__blob(obj)))
+            else:
+                parts.append(f'{codec.dumps(key)}:{self.__encode(obj)}')
+        raw = []
+        for records in list(FileStorage.__raw.values()):
+            if binary and isinstance(records, snapshot.Records):
+                # Copied as they are, not decoded
+                parts.extend(records.bodies())
+            else:
+                raw.extend(list(records.items()))
+        if binary:
+            parts = snapshot.dump(parts + list(snapshot.entries(raw)))
+        else:
+            parts = ['{', ','.join(parts + [
+                f'{codec.dumps(key)}:{codec.dumps(obj_dict)}'
+                for key, obj_dict in raw]), '}']
+        with FileStorage.__lock:
+            # Snapshots are replaced, never rewritten in place: mapped,
+            # they would shrink under their readers
+            self.__write(FileStorage.__file_path, parts, atomic=binary,
+                         binary=binary)
+            self.__write_texts()
+            # The JSON file now holds everything: older logs are obsolete
+            for path in self.__logs():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def __read_texts(self):
+        '''
+        Loads the text indexes saved to <file path>.search, on the
+        first search() after reload()
+        '''
+
+        FileStorage.__saved_texts = {}
+        try:
+            with open(FileStorage.__file_path + '.search', 'r',
+                      encoding='utf-8') as f:
+                saved = codec.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return
+        FileStorage.__saved_texts = {
+                cls_name: TextIndex.from_dict(docs)
+                for cls_name, docs in saved.items() if cls_name in TEXT}
+
+    def __write_texts(self):
+        '''Saves the text indexes to <file path>.search if they changed'''
+
+        texts = dict(FileStorage.__texts)
+        if not any(index.changed for index in texts.values()):
+            return
+        saved = {cls_name: index.to_dict()
+                 for cls_name, index in texts.items()}
+        self.__write(FileStorage.__file_path + '.search',
+                     [codec.dumps(saved)], atomic=True)
+
+    def __start_flusher(self):
+        '''Starts the write-behind flusher thread if it is not running'''
+
+        with FileStorage.__wakeup:
+            if FileStorage.__flusher is not None:
+                return
+            FileStorage.__flusher = threading.Thread(
+                    target=self.__flush_loop, daemon=True)
+            FileStorage.__flusher.start()
+        atexit.register(self.flush)
+
+    def __flush_loop(self):
+        '''
+        The flusher thread: writes the pending saves every
+        __write_behind seconds, or sooner when save() wakes it up
+        '''
+
+        while True:
+            interval = FileStorage.__write_behind
+            with FileStorage.__wakeup:
+                FileStorage.__wakeup.wait(interval if interval > 0 else None)
+            self.flush()
+
+    def __rollback(self):
+        '''Puts back the objects changed by the failed transaction'''
+
+        undo, FileStorage.__undo = FileStorage.__undo, {}
+        FileStorage.__deferred = False
+        for key, (obj, state) in undo.items():
+            current = FileStorage.__objects.get(key)
+            if obj is None:
+                if current is not None:
+                    self.delete(key)
+                continue
+            restore(obj, state)
+            if current is obj:
+                self.touch(obj)
+            else:
+                if current is not None:
+                    self.delete(key)
+                self.new(obj)
+
+    def __build(self, key, obj_dict, models, obj_body=None):
+        '''
+        Stores the record obj_dict under key: as an instance of its class
+        in models (see classes()), or as is in __raw in lazy mode.
+        obj_body is the snapshot body of the record, if it was read from
+        one, kept as the cached body of the instance.
+        '''
+
+        cls_name = key.split('.')[0]
+        if FileStorage.__lazy:
+            self.__index()
+            if key in FileStorage.__objects:
+                self.__unlink(key)
+                del FileStorage.__objects[key]
+            FileStorage.__raw.setdefault(cls_name, {})[key] = obj_dict
+        else:
+            obj = models[cls_name](**obj_dict)
+            self.__adopt(key, obj)
+            if obj_body is not None:
+                with FileStorage.__cache_lock:
+                    FileStorage.__blobs[obj] = obj_body
+
+    def __load(self, cls_name=None, key=None):
+        '''
+        Builds the instances still kept as dicts in __raw: the one at key,
+        or those of class cls_name, or all of them
+        '''
+
+        raw = FileStorage.__raw
+        if not raw:
+            return
+        if key is not None:
+            records = {}
+            obj_dict = raw.get(key.split('.')[0], {}).pop(key, None)
+            if obj_dict is not None:
+                records[key] = obj_dict
+        elif cls_name is not None:
+            records = raw.pop(cls_name, {})
+        else:
+            records = {}
+            for name in list(raw):
+                records.update(raw.pop(name))
+
+        models = self.classes()
+        for key, obj_dict in records.items():
+            self.__adopt(key, models[key.split('.')[0]](**obj_dict))
+
+    def __adopt(self, key, obj):
+        '''
+        Stores obj, built from the saved record at key: that is neither
+        a change to save nor one a failed transaction undoes
+        '''
+
+        self.__store(key, obj)
+        with FileStorage.__changes_lock:
+            FileStorage.__changes.pop(key, None)
+
+    @staticmethod
+    def __name(cls):
+        '''Returns the name of cls, which is a class or already a name'''
+
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def __column(self, cls_name):
+        '''
+        Returns the ColumnStore of class cls_name (in COLUMNS) with every
+        object built, building it on first use
+        '''
+
+        self.__load(cls_name)
+        self.__index()
+        store = FileStorage.__columns.get(cls_name)
+        if store is None:
+            store = ColumnStore(COLUMNS[cls_name])
+            for key, obj in FileStorage.__classes.get(cls_name, {}).items():
+                store.set(key, obj)
+            FileStorage.__columns[cls_name] = store
+        return store
+
+    def __value_index(self, cls_name):
+        '''
+        Builds the attribute indexes of class cls_name with every object
+        built, on first use
+        '''
+
+        self.__load(cls_name)
+        self.__index()
+        if cls_name not in FileStorage.__valued:
+            FileStorage.__valued.add(cls_name)
+            for key, obj in FileStorage.__classes.get(cls_name, {}).items():
+                FileStorage.__link_values(key, obj, cls_name)
 
+    def __grid(self, cls):
+        '''
+        Returns the GridIndex of class cls (a class or its name) with
+        every object built, building it on first use, or None when cls
+        is not in GEO
+        '''
+
+        cls_name = self.__name(cls)
+        if cls_name not in GEO:
+            return None
+        self.__load(cls_name)
+        self.__index()
+        grid = FileStorage.__grids.get(cls_name)
+        if grid is None:
+            grid = GridIndex()
+            for key, obj in FileStorage.__classes.get(cls_name, {}).items():
+                grid.set(key, *coordinates(obj))
+            FileStorage.__grids[cls_name] = grid
+        return grid
+
+    def __text(self, cls_name):
+        '''
+        Returns the TextIndex of class cls_name (in TEXT) with every
+        object built, building it on first use from the saved one
+        '''
+
+        self.__load(cls_name)
+        self.__index()
+        index = FileStorage.__texts.get(cls_name)
+        if index is None:
+            if FileStorage.__saved_texts is None:
+                self.__read_texts()
+            index = FileStorage.__saved_texts.pop(cls_name, None)
+            if index is None:
+                index = TextIndex()
+            objs = FileStorage.__classes.get(cls_name, {})
+            # The saved index may be stale: drop the texts deleted since
+            for key in index.keys():
+                if key not in objs:
+                    index.remove(key)
+            for key, obj in objs.items():
+                index.set(key, document(obj, TEXT[cls_name]))
+            FileStorage.__texts[cls_name] = index
+        return index
+
+    @staticmethod
+    def __index():
+        '''
+        Returns the per-class index, rebuilding all the indexes first
+        if __objects was replaced from outside
+        (ex: FileStorage._FileStorage__objects = {})
+        '''
+
+        if FileStorage.__indexed is not FileStorage.__objects:
+            FileStorage.__classes = {}
+            FileStorage.__values = {}
+            FileStorage.__entries = {}
+            FileStorage.__valued = set()
+            FileStorage.__columns = {}
+            FileStorage.__grids = {}
+            FileStorage.__texts = {}
+            FileStorage.__sorted = {}
+            FileStorage.__indexed = FileStorage.__objects
+            for key, obj in FileStorage.__objects.items():
+                FileStorage.__link(key, obj)
+        return FileStorage.__classes
+
+    @staticmethod
+    def __attr_values(obj, cls_name):
+        '''Returns the values of the indexed attributes of obj'''
+
+        return tuple(getattr(obj, attr, None)
+                     for attr in FileStorage.__attr_indexes.get(cls_name, ()))
+
+    @staticmethod
+    def __link(key, obj):
+        '''Adds obj to the per-class index, and to the attribute, column,
+        grid and text indexes of its class already built'''
+
+        cls_name = key.split('.')[0]
+        objs = FileStorage.__classes.setdefault(cls_name, {})
+        if key not in objs and FileStorage.__sorted:
+            FileStorage.__sorted.pop(cls_name, None)
+            FileStorage.__sorted.pop(None, None)
+        objs[key] = obj
+        if cls_name in FileStorage.__columns:
+            FileStorage.__columns[cls_name].set(key, obj)
+        if cls_name in FileStorage.__grids:
+            FileStorage.__grids[cls_name].set(key, *coordinates(obj))
+        if cls_name in FileStorage.__texts:
+            FileStorage.__texts[cls_name].set(
+                    key, document(obj, TEXT[cls_name]))
+        if cls_name in FileStorage.__valued:
+            FileStorage.__link_values(key, obj, cls_name)
+
+    @staticmethod
+    def __link_values(key, obj, cls_name):
+        '''Adds obj to the attribute indexes of its class'''
+
+        attrs = FileStorage.__attr_indexes.get(cls_name)
+        if not attrs:
+            return
+        entry = FileStorage.__attr_values(obj, cls_name)
+        FileStorage.__entries[key] = entry
+        for attr, value in zip(attrs, entry):
+            values = FileStorage.__values.setdefault((cls_name, attr), {})
+            try:
+                values.setdefault(value, {})[key] = obj
+            except TypeError:
+                # Unhashable values (ex: a list) are left out of the index
+                pass
+
+    @staticmethod
+    def __unlink(key):
+        '''Removes the object stored at key from every index'''
+
+        cls_name = key.split('.')[0]
+        FileStorage.__classes.get(cls_name, {}).pop(key, None)
+        if cls_name in FileStorage.__columns:
+            FileStorage.__columns[cls_name].remove(key)
+        if cls_name in FileStorage.__grids:
+            FileStorage.__grids[cls_name].remove(key)
+        if cls_name in FileStorage.__texts:
+            FileStorage.__texts[cls_name].remove(key)
+
+        entry = FileStorage.__entries.pop(key, None)
+        if entry is None:
+            return
+        for attr, value in zip(FileStorage.__attr_indexes[cls_name], entry):
+            values = FileStorage.__values[(cls_name, attr)]
+            try:
+                bucket = values.get(value, {})
+            except TypeError:
+                continue
+            bucket.pop(key, None)
+            if not bucket:
+                values.pop(value, None)
+
+    @staticmethod
+    def __blob(obj):
+        '''Returns the snapshot body of obj, encoding it only when dirty'''
+
+        return FileStorage.__cached(FileStorage.__blobs, obj, lambda obj:
+                                    snapshot.body(obj.__getstate__()))
+
+    @staticmethod
+    def __encode(obj):
+        '''Returns the JSON text of obj, encoding it only when dirty'''
+
+        return FileStorage.__cached(FileStorage.__cache, obj, lambda obj:
+                                    codec.dumps(codec.record(obj)))
+
+    @staticmethod
+    def __cached(cache, obj, encode):
+        '''
+        Returns the encoding of obj kept in cache, else encode(obj), kept
+        unless obj was touched meanwhile (ex: by the main thread while
+        the flusher saves): the next save then encodes its new state
+        '''
+
+        with FileStorage.__cache_lock:
+            text = cache.get(obj)
+            if text is not None:
+                return text
+            FileStorage.__encoding = obj
+            FileStorage.__stale = False
+        try:
+            text = encode(obj)
+        finally:
+            with FileStorage.__cache_lock:
+                if text is not None and not FileStorage.__stale:
+                    cache[obj] = text
+                FileStorage.__encoding = None
+        return text
+
+    def __records(self, mapped=False):
+        '''
+        Yields the (key, dict, snapshot body or None) of every record
+        saved in the JSON file (or snapshot) and its journal, streaming
+        the file (only the journal when mapped: __map() took the records
+        of the file). Keys deleted by the journal are yielded last, with
+        None.
+        '''
+
+        journal = {}
+        for path in self.__logs():
+            self.__replay(path, journal)
+
+        try:
+            if not mapped:
+                for key, obj_dict, obj_body in snapshot.scan(
+                        FileStorage.__file_path):
+                    if key not in journal:
+                        yield key, obj_dict, obj_body
+        except FileNotFoundError:
+            pass
+        for key, obj_dict in journal.items():
+            yield key, obj_dict, None
+
+    def __map(self):
+        '''
+        In lazy mode, maps the file when it is a snapshot with an index:
+        its records go to __raw as snapshot.Records, without being read.
+        Returns whether it did.
+        '''
+
+        if not FileStorage.__lazy:
+            return False
+        try:
+            classes = snapshot.mapped(FileStorage.__file_path)
+        except (OSError, ValueError):
+            return False
+
+        self.__index()
+        for key in [key for key in FileStorage.__objects
+                    if key in classes.get(key.split('.')[0], ())]:
+            self.__unlink(key)
+            del FileStorage.__objects[key]
+        raw = FileStorage.__raw
+        for cls_name, records in classes.items():
+            old = raw.pop(cls_name, {})
+            for key in old:
+                if key not in records:
+                    records[key] = old[key]
+            raw[cls_name] = records
+        return True
+
+    def __merge(self):
+        '''
+        Applies the records saved by other processes, if the files
+        changed since this process last read or wrote them.
+        Keys changed locally and not saved yet are left alone.
+        '''
+
+        signature = self.__signature()
+        if signature == FileStorage.__seen:
+            return
+
+        with FileStorage.__changes_lock:
+            dirty = dict(FileStorage.__changes)
+        self.__index()
+        cache = FileStorage.__cache
+        models = self.classes()
+        saved = set()
+        for key, obj_dict, obj_body in self.__records():
+            if obj_dict is None or key in dirty:
+                continue
+            saved.add(key)
+            cls_name = key.split('.')[0]
+            local = FileStorage.__objects.get(key)
+            if local is None:
+                if key not in FileStorage.__raw.get(cls_name, {}):
+                    self.__build(key, obj_dict, models)
+                else:
+                    FileStorage.__raw[cls_name][key] = obj_dict
+                continue
+
+            text = codec.dumps(obj_dict)
+            cached = cache.get(local)
+            if cached == text or \
+                    (cached is None and local.to_dict() == obj_dict):
+                continue
+            # Update in place: callers may hold the instance
+            fresh = models[cls_name](**obj_dict)
+            restore(local, fresh.__getstate__())
+            self.__unlink(key)
+            self.__link(key, local)
+            cache[local] = text
+            FileStorage.__blobs.pop(local, None)
+
+        for key in list(FileStorage.__objects):
+            if key not in saved and key not in dirty:
+                del FileStorage.__objects[key]
+                self.__unlink(key)
+        for records in FileStorage.__raw.values():
+            for key in list(records):
+                if key not in saved:
+                    del records[key]
+        FileStorage.__seen = signature
+
+    def __signature(self):
+        '''
+        Returns what identifies the current version of the JSON file and
+        its journal: the inode, modification time and size of each
+        '''
+
+        signature = []
+        for path in [FileStorage.__file_path] + self.__logs():
+            try:
+                st = os.stat(path)
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def __locked(exclusive=False, file_path=None):
+        '''
+        In shared mode, holds an advisory lock (fcntl.flock) on
+        <file path>.lock for the with block: shared to read the files,
+        exclusive to write them
+        '''
+
+        if not FileStorage.__shared or fcntl is None:
+            yield
+            return
+        if file_path is None:
+            file_path = FileStorage.__file_path
+        with open(file_path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def __logs(self):
+        '''
+        Returns the journal paths in replay order: the log being
+        compacted (if any) then the live log
+        '''
+
+        log = FileStorage.__file_path + '.log'
+        return [log + '.1', log]
+
+    @staticmethod
+    def __replay(path, dict_objs):
+        '''
+        Applies the records of the journal at path on dict_objs.
+        Deleted keys are set to None so reload() can drop them.
+        '''
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = codec.loads(line)
+                    except ValueError:
+                        # A torn line: that append never completed
+                        continue
+                    if record['op'] == 'set':
+                        dict_objs[record['key']] = record['obj']
+                    else:
+                        dict_objs[record['key']] = None
+        except FileNotFoundError:
+            pass
+
+    def __append(self):
+        '''Appends the pending changes to the journal'''
+
+        with FileStorage.__changes_lock:
+            changes, FileStorage.__changes = FileStorage.__changes, {}
+        if not changes:
+            return
+
+        lines = []
+        for key, obj in changes.items():
+            if obj is None:
+                line = f'{{"op":"del","key":{codec.dumps(key)}}}'
+            else:
+                line = f'{{"op":"set","key":{codec.dumps(key)},' \
+                       f'"obj":{self.__encode(obj)}}}'
+            lines.append(line + '\n')
+
+        log = self.__logs()[1]
+        durability = self.__durability_level()
+        with FileStorage.__lock:
+            with open(log, 'a', encoding='utf-8') as f:
+                created = f.tell() == 0
+                f.write(''.join(lines))
+                size = f.tell()
+                if durability in ('fsync', 'fsync-dir'):
+                    f.flush()
+                    os.fsync(f.fileno())
+            if created and durability == 'fsync-dir':
+                self.__sync_dir(log)
+
+            compactor = FileStorage.__compactor
+            if size > FileStorage.__journal_limit and \
+                    (compactor is None or not compactor.is_alive()) and \
+                    not os.path.exists(log + '.1'):
+                # Freeze the current log: new appends go to a fresh one
+                os.replace(log, log + '.1')
+                self.__write_texts()
+                FileStorage.__compactor = threading.Thread(
+                        target=self.__compact,
+                        args=(FileStorage.__file_path, log + '.1'))
+                FileStorage.__compactor.start()
+
+    @staticmethod
+    def __compact(file_path, frozen_log):
+        '''
+        Merges the frozen log into the JSON file, then drops the log.
+        Runs in a background thread and only works on files, so it
+        never touches the live __objects. The JSON file is streamed
+        through, record by record.
+        '''
+
+        with FileStorage.__locked(exclusive=True, file_path=file_path):
+            journal = {}
+            FileStorage.__replay(frozen_log, journal)
+
+            records = FileStorage.__merged(file_path, journal)
+            binary = FileStorage.__storage_format() == 'binary'
+            if binary:
+                parts = snapshot.dump(snapshot.entries(records))
+            else:
+                parts = FileStorage.__json_parts(records)
+            FileStorage.__write(file_path, parts, atomic=True, binary=binary)
+            os.remove(frozen_log)
+
+    @staticmethod
+    def __merged(file_path, journal):
+        '''
+        Yields the (key, record dict) of the file at file_path with the
+        journal records applied, one by one
+        '''
+
+        try:
+            for key, obj_dict in snapshot.read(file_path):
+                if key not in journal:
+                    yield key, obj_dict
         except FileNotFoundError:
+            pass
+        for key, obj_dict in journal.items():
+            if obj_dict is not None:
+                yield key, obj_dict
+
+    @staticmethod
+    def __json_parts(records):
+        '''Yields the JSON text of the (key, record dict) records, piece
+        by piece'''
+
+        yield '{'
+        sep = ''
+        for key, obj_dict in records:
+            yield f'{sep}{codec.dumps(key)}:{codec.dumps(obj_dict)}'
+            sep = ','
+        yield '}'
+
+    @staticmethod
+    def __storage_format():
+        '''Returns the configured storage format, checking it first'''
+
+        if FileStorage.__format not in STORAGE_FORMATS:
+            raise ValueError(f'Unknown storage format: '
+                             f'{FileStorage.__format!r} '
+                             f'(expected one of {STORAGE_FORMATS})')
+        return FileStorage.__format
+
+    @staticmethod
+    def __durability_level():
+        '''Returns the configured durability level, checking it first'''
+
+        if FileStorage.__durability not in DURABILITY_LEVELS:
+            raise ValueError(f'Unknown durability level: '
+                             f'{FileStorage.__durability!r} '
+                             f'(expected one of {DURABILITY_LEVELS})')
+        return FileStorage.__durability
+
+    @staticmethod
+    def __write(path, parts, atomic=False, binary=False):
+        '''
+        Writes the strings (bytes when binary) of the iterable parts as
+        the file at path, as safely as the durability level asks for.
+        atomic forces the temporary file even at level 'none' (ex: when
+        parts reads path).
+        '''
+
+        durability = FileStorage.__durability_level()
+        mode, encoding = ('wb', None) if binary else ('w', 'utf-8')
+        if durability == 'none' and not atomic:
+            with open(path, mode, encoding=encoding) as f:
+                f.writelines(parts)
             return
+
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, mode, encoding=encoding) as f:
+                f.writelines(parts)
+                f.flush()
+                if durability in ('fsync', 'fsync-dir'):
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if durability == 'fsync-dir':
+            FileStorage.__sync_dir(path)
+
+    @staticmethod
+    def __sync_dir(path):
+        '''Flushes the directory entry of path (where supported)'''
+
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+'''
+This module implements the GridIndex class, a spatial index of points
+(latitude, longitude in degrees) for the map search of places
+
+The index buckets the points by cell of a fixed grid, so a bounding box
+or a radius query only looks at the points of the cells it overlaps.
+The k nearest points are found by widening a radius query until it holds
+k points.
+'''
+import math
+
+# Mean radius of the Earth, in km
+EARTH_RADIUS = 6371.0088
+# Length of one degree of latitude, in km
+DEGREE = math.pi * EARTH_RADIUS / 180
+# Size of the cells of the grid, in degrees (about 55 km of latitude)
+CELL_SIZE = 0.5
+
+
+def distance(lat1, lon1, lat2, lon2):
+    '''Returns the great-circle distance between two points, in km'''
+
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def point(lat, lon):
+    '''
+    Returns (lat, lon) as floats, or None when they are not the numbers
+    of a point (latitude from -90 to 90, longitude from -180 to 180)
+    '''
+
+    if type(lat) not in (int, float) or type(lon) not in (int, float):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return float(lat), float(lon)
+
+
+def coordinates(obj):
+    '''
+    Returns (latitude, longitude) of obj, or (None, None) when obj sets
+    neither: the class attributes would place it at (0, 0)
+    '''
+
+    state = obj.__getstate__()
+    if 'latitude' not in state and 'longitude' not in state:
+        return None, None
+    return getattr(obj, 'latitude', None), getattr(obj, 'longitude', None)
+
+
+def box(lat, lon, km):
+    '''
+    Returns the bounding box (south, west, north, east) holding every
+    point within km of (lat, lon). It crosses the 180th meridian when
+    west > east.
+    '''
+
+    dlat = km / DEGREE
+    south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    cos = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+    if south == -90 or north == 90 or dlat >= 180 * cos:
+        return south, -180.0, north, 180.0
+    dlon = dlat / cos
+    west, east = lon - dlon, lon + dlon
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def inside(lat, lon, south, west, north, east):
+    '''
+    Returns whether (lat, lon) is in the box, which crosses the 180th
+    meridian when west > east (ex: west 170, east -170)
+    '''
+
+    if not south <= lat <= north:
+        return False
+    if west <= east:
+        return west <= lon <= east
+    return lon >= west or lon <= east
+
+
+class GridIndex():
+    '''
+    A grid of points, each stored under a key
+
+    Private instance attributes:
+        __cell_size (float) - size of the cells, in degrees
+        __cells (dict) - (row, column) of a cell -> {key: (lat, lon)}
+        __points (dict) - key -> (lat, lon)
+
+    Public instance methods:
+        set(self, key, lat, lon)
+        remove(self, key)
+        within(self, south, west, north, east)
+        near(self, lat, lon, km)
+        nearest(self, lat, lon, k=1)
+    '''
+
+    def __init__(self, cell_size=CELL_SIZE):
+        '''Initialize an empty grid of cells of cell_size degrees'''
+
+        self.__cell_size = cell_size
+        self.__cells = {}
+        self.__points = {}
+
+    def __len__(self):
+        '''Returns the number of points'''
+
+        return len(self.__points)
+
+    def set(self, key, lat, lon):
+        '''
+        Stores the point (lat, lon) at key, or moves it there.
+        A point that is not valid (see point()) removes key.
+        '''
+
+        new = point(lat, lon)
+        if self.__points.get(key) == new:
+            return
+        self.remove(key)
+        if new is not None:
+            self.__points[key] = new
+            self.__cells.setdefault(self.__cell(*new), {})[key] = new
+
+    def remove(self, key):
+        '''Removes the point stored at key'''
+
+        old = self.__points.pop(key, None)
+        if old is None:
+            return
+        cell = self.__cell(*old)
+        del self.__cells[cell][key]
+        if not self.__cells[cell]:
+            del self.__cells[cell]
+
+    def within(self, south, west, north, east):
+        '''
+        Returns the {key: (lat, lon)} of the points in the box
+        (crossing the 180th meridian when west > east)
+        '''
+
+        if west > east:
+            found = self.within(south, west, north, 180.0)
+            found.update(self.within(south, -180.0, north, east))
+            return found
+
+        (top, left), (bottom, right) = \
+            self.__cell(south, west), self.__cell(north, east)
+        found = {}
+        if (bottom - top + 1) * (right - left + 1) < len(self.__cells):
+            cells = (self.__cells.get((row, column), {})
+                     for row in range(top, bottom + 1)
+                     for column in range(left, right + 1))
+        else:
+            # A box wider than the occupied cells: visit those instead
+            cells = (points for (row, column), points in self.__cells.items()
+                     if top <= row <= bottom and left <= column <= right)
+        for points in cells:
+            for key, (lat, lon) in points.items():
+                if south <= lat <= north and west <= lon <= east:
+                    found[key] = (lat, lon)
+        return found
+
+    def near(self, lat, lon, km):
+        '''
+        Returns the [(distance, key)] of the points within km of
+        (lat, lon), from the nearest
+        '''
+
+        found = self.within(*box(lat, lon, km))
+        return sorted((dist, key) for dist, key in
+                      ((distance(lat, lon, *xy), key)
+                       for key, xy in found.items()) if dist <= km)
+
+    def nearest(self, lat, lon, k=1):
+        '''Returns the [(distance, key)] of the k points nearest (lat, lon)'''
+
+        if k <= 0 or not self.__points:
+            return []
+        km = self.__cell_size * DEGREE
+        while True:
+            found = self.near(lat, lon, km)
+            # Past half the circumference, the box is the whole planet
+            if len(found) >= min(k, len(self.__points)):
+                return found[:k]
+            km *= 2
+
+    def __cell(self, lat, lon):
+        '''Returns the (row, column) of the cell of (lat, lon)'''
+
+        return (math.floor(lat / self.__cell_size),
+                math.floor(lon / self.__cell_size))
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+'''
+This module implements a streaming reader for the JSON file of FileStorage
+
+The file holds a single JSON object ({"<class name>.id": {...}, ...}).
+iter_items() yields its members one by one while reading the file chunk
+by chunk, so the whole document is never held in memory at once.
+'''
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+
+
+class _Buffer():
+    '''
+    A sliding window over a text file
+
+    Public instance methods:
+        fill(self, size)
+        peek(self)
+        expect(self, chars)
+        decode(self)
+    '''
+
+    def __init__(self, f, chunk_size):
+        '''Initialize a buffer reading f by chunks of chunk_size chars'''
+
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size):
+        '''
+        Drops the consumed text and reads size more chars.
+        Returns False once the end of the file is reached.
+        '''
+
+        if self.eof:
+            return False
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        '''Skips whitespaces and returns the next char ('' at the end)'''
+
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill(self.chunk_size):
+                return ''
+
+    def expect(self, chars):
+        '''Consumes and returns the next char, which must be in chars'''
+
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f'Expecting one of {chars!r}, got {char!r}')
+        self.pos += 1
+        return char
+
+    def decode(self):
+        '''Decodes and consumes the next JSON value'''
+
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.text, self.pos)
+                # A value touching the end of the window may be cut short
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2
+
+
+def iter_items(f, chunk_size=CHUNK_SIZE):
+    '''Yields the (key, value) pairs of the JSON object read from f'''
+
+    buf = _Buffer(f, chunk_size)
+    buf.expect('{')
+    if buf.peek() == '}':
+        return
+
+    while True:
+        if buf.peek() != '"':
+            raise ValueError('Expecting a property name')
+        key = buf.decode()
+        buf.expect(':')
+        value = buf.decode()
+        yield key, value
+        if buf.expect(',}') == '}':
+            return
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+'''
+This module parses and compiles the filter expressions of where queries
+
+A query is a list of comma-separated clauses, either conditions or
+options:
+    <attribute> <operator> <value> - operator: ==, =, !=, <, <=, >, >=
+                                     value: a JSON value (ex: 100, "Paris",
+                                     true) or a bare word (a string)
+    limit=<number> - keep the first number objects only
+    order_by=<attribute> - sort by attribute (-<attribute>: descending)
+    fields=<attributes> - keep those attributes only (comma or space
+                          separated, quoted when commas)
+
+Ex: price_by_night < 100, max_guest >= 4, order_by=-price_by_night, limit=5
+
+The conditions compile into a single predicate. A value the operator
+cannot compare to (ex: a string for <) does not match.
+'''
+import json
+import operator
+import re
+
+OPERATORS = {
+        '==': operator.eq,
+        '!=': operator.ne,
+        '<': operator.lt,
+        '<=': operator.le,
+        '>': operator.gt,
+        '>=': operator.ge
+        }
+# The operators between() can answer (with a strict bound rechecked)
+RANGES = ('==', '<', '<=', '>', '>=')
+OPTIONS = ('limit', 'order_by', 'fields')
+# A clause: up to the next comma outside quotes
+CLAUSE = re.compile(r'(?:"[^"]*"|\'[^\']*\'|[^,])+')
+CONDITION = re.compile(r'^\s*(?P<attr>\w+)\s*(?P<op>==|!=|<=|>=|<|>|=)'
+                       r'\s*(?P<value>.*?)\s*$')
+
+
+def value_of(text):
+    '''Returns the value written in text: JSON, else the unquoted text'''
+
+    try:
+        return json.loads(text)
+    except ValueError:
+        if len(text) > 1 and text[0] == text[-1] and text[0] in '\'"':
+            return text[1:-1]
+        return text
+
+
+def condition(text):
+    '''
+    Returns the (attribute, operator, value) of the condition text
+    (ex: "max_guest >= 4"). Raises ValueError when it is not one.
+    '''
+
+    match = CONDITION.match(text)
+    if match is None or match.group('value')[:1] in ('', '=', '<', '>', '!'):
+        raise ValueError(f'Invalid condition {text.strip()!r}, expecting '
+                         f'<attribute> <operator> <value>')
+    op = '==' if match.group('op') == '=' else match.group('op')
+    return match.group('attr'), op, value_of(match.group('value'))
+
+
+def parse(text):
+    '''
+    Returns the ([(attribute, operator, value)], {option: value}) of the
+    query text. Raises ValueError when a clause is not valid.
+    '''
+
+    conditions, options = [], {}
+    for clause in CLAUSE.findall(text):
+        if not clause.strip():
+            continue
+        attr, op, value = condition(clause)
+        if attr not in OPTIONS or op != '==':
+            conditions.append((attr, op, value))
+        elif attr == 'limit':
+            if type(value) is not int or value < 0:
+                raise ValueError('limit: expecting a number')
+            options['limit'] = value
+        elif attr == 'order_by':
+            options['order_by'] = str(value)
+        else:
+            options['fields'] = re.findall(r'[^,\s]+', str(value))
+    return conditions, options
+
+
+def conditions_of(conditions):
+    '''
+    Returns the [(attribute, operator, value)] of conditions, a list of
+    them or of condition texts. Raises ValueError for an unknown operator.
+    '''
+
+    found = []
+    for clause in conditions:
+        attr, op, value = condition(clause) if isinstance(clause, str) \
+            else clause
+        if op not in OPERATORS:
+            raise ValueError(f'Unknown operator {op!r}, expecting one of '
+                             f'{", ".join(OPERATORS)}')
+        found.append((attr, op, value))
+    return found
+
+
+def predicate(conditions):
+    '''
+    Returns a function telling whether an object meets every condition
+    (attribute, operator, value) of conditions (see conditions_of())
+    '''
+
+    tests = [(operator.attrgetter(attr), OPERATORS[op], value)
+             for attr, op, value in conditions_of(conditions)]
+
+    def match(obj):
+        '''Returns whether obj meets the conditions'''
+
+        try:
+            for get, compare, value in tests:
+                if not compare(get(obj), value):
+                    return False
+        except (AttributeError, TypeError):
+            return False
+        return True
+
+    return match
+
+
+def sort_key(attr):
+    '''
+    Returns the key function sorting objects by attr: numbers first,
+    then strings, then the other values by their str()
+    '''
+
+    def key(obj):
+        '''Returns the sort key of obj'''
+
+        value = getattr(obj, attr, None)
+        if type(value) in (int, float):
+            return 0, value, ''
+        if isinstance(value, str):
+            return 1, 0, value
+        return 2, 0, str(value)
+
+    return key
+
+
+def project(obj, fields):
+    '''Returns the {attribute: value} of obj for the attributes fields'''
+
+    return {attr: getattr(obj, attr, None) for attr in fields}
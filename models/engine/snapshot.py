@@ -0,0 +1,624 @@
+#!/usr/bin/python3
+'''
+This module reads and writes binary snapshots, the compact alternative
+to the JSON file of FileStorage (HBNB_STORAGE_FORMAT=binary)
+
+A snapshot is the header MAGIC + VERSION, then length-prefixed records:
+a tag byte, the length of the body (uint32), then the body:
+    CLASS  - a class name (UTF-8), interned: the first CLASS record is
+             class 0, the next one class 1...
+    OBJECT - the class (uint16) and flags (uint8) of an instance, its id
+             (16 raw bytes when a UUID, else a uint16 length and UTF-8),
+             created_at and updated_at (epoch microseconds, int64, when
+             naive datetimes), then the other attributes, natively
+             encoded (see attributes()), if there are any
+    INDEX  - the footer index, the last record: for each class, the
+             ENTRY (offset, length) of the body of each of its OBJECT
+             records (after the class number), sorted by id, then the
+             directory of the classes: for each one, the offset of its
+             entries, their count and its name
+and the TRAILER: the offset of the directory, the number of classes and
+INDEX_MAGIC. Integers are little-endian. The attributes the flags leave
+out (ex: an id that is not a UUID, a datetime with a timezone) are kept
+with the others. Version 1 snapshots lack the index, and the bodies of
+versions 1 and 2 keep the other attributes as compact JSON (no NATIVE
+flag): version 3 reads them all.
+
+The attributes are a layout, then their values: the layout is a uint16
+length, then the tag (uint8), the struct code of the fixed part of the
+value (a byte, 0 for none) and the name (uint16 length and UTF-8) of
+each attribute, so the bodies of the objects that set the same
+attributes share it, and it is parsed once. The values are their fixed
+parts, packed at once (the smallest integer holding an INT, float64 for
+FLOAT, the smallest unsigned integer holding the length of the others),
+then the bytes of those of variable length: UTF-8 for STR, the uint32
+count and lengths of the items then their UTF-8 for STRS (a list of
+str), compact JSON for JSON (any other value, ex: a dict, an int past
+64 bits, a datetime as text). TRUE, FALSE and NONE have no value.
+
+mapped() maps a snapshot in memory (mmap) and reads its directory only:
+the Records of a class find a record by bisecting the index and decode
+it from a slice of the map, so opening costs the same at any size. The
+map must not shrink under it: snapshots are replaced, not rewritten in
+place (see FileStorage.__rewrite).
+
+convert() turns a JSON file into a snapshot, or a snapshot into a JSON
+file (the console command convert).
+'''
+import collections.abc
+import datetime
+import functools
+import mmap
+import os
+import re
+import struct
+from models.engine import codec
+from models.engine.json_stream import iter_items
+
+MAGIC = b'HBNB'
+VERSION = 3
+HEADER = MAGIC + bytes([VERSION])
+HEADERS = tuple(MAGIC + bytes([version]) for version in (1, 2, 3))
+# The versions that end with an index
+INDEXED = HEADERS[1:]
+CLASS = 1
+OBJECT = 2
+INDEX = 3
+INDEX_MAGIC = b'HBNX'
+
+# Flags of an OBJECT body
+UUID_ID = 1
+CREATED = 2
+UPDATED = 4
+NATIVE = 8
+
+# Tags of the attributes
+STR = 1
+INT = 2
+FLOAT = 3
+TRUE = 4
+FALSE = 5
+NONE = 6
+STRS = 7
+JSON = 8
+CONSTANTS = {TRUE: True, FALSE: False, NONE: None}
+CONSTANT_TAGS = {True: TRUE, False: FALSE, None: NONE}
+
+RECORD = struct.Struct('<BI')
+LENGTH = struct.Struct('<H')
+COUNT = struct.Struct('<I')
+# The RECORD of an OBJECT and its class number, packed at once
+OBJECT_HEAD = struct.Struct('<BIH')
+MICROSECONDS = struct.Struct('<q')
+ENTRY = struct.Struct('<QI')
+DIRECTORY = struct.Struct('<QIH')
+TRAILER = struct.Struct('<QI4s')
+
+# The text of a UUID, as str(uuid.uuid4()) writes it
+UUID_TEXT = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                       r'[0-9a-f]{12}')
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def is_snapshot(path):
+    '''Returns whether the file at path is a snapshot (by its header)'''
+
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def body(state):
+    '''
+    Returns the OBJECT body of the attributes state (without __class__
+    or the class number, which dump() adds)
+    '''
+
+    state = dict(state)
+    flags = 0
+    parts = []
+
+    inst_id = state.pop('id')
+    if isinstance(inst_id, str) and UUID_TEXT.fullmatch(inst_id):
+        flags |= UUID_ID
+        parts.append(bytes.fromhex(inst_id.replace('-', '')))
+    else:
+        data = str(inst_id).encode('utf-8', 'surrogatepass')
+        parts.append(LENGTH.pack(len(data)) + data)
+        if not isinstance(inst_id, str):
+            # Not a text id: the JSON keeps its type
+            state['id'] = inst_id
+
+    for flag, attr in ((CREATED, 'created_at'), (UPDATED, 'updated_at')):
+        value = state.get(attr)
+        if type(value) is datetime.datetime and value.tzinfo is None:
+            del state[attr]
+            flags |= flag
+            parts.append(MICROSECONDS.pack((value - EPOCH) // MICROSECOND))
+
+    if state:
+        flags |= NATIVE
+        parts.append(attributes(state))
+    return bytes([flags]) + b''.join(parts)
+
+
+def width(value):
+    '''
+    Returns the struct code of the smallest integer holding value, or
+    None past 64 bits
+    '''
+
+    if -0x80 <= value < 0x80:
+        return 'b'
+    if -0x8000 <= value < 0x8000:
+        return 'h'
+    if -0x80000000 <= value < 0x80000000:
+        return 'i'
+    if -0x8000000000000000 <= value < 0x8000000000000000:
+        return 'q'
+    return None
+
+
+def size_width(size):
+    '''Returns the struct code of the smallest uint holding size'''
+
+    return 'B' if size < 0x100 else 'H' if size < 0x10000 else 'I'
+
+
+@functools.lru_cache(maxsize=4096)
+def field(tag, code, name):
+    '''Returns the layout of the attribute name of tag and code'''
+
+    name = name.encode('utf-8', 'surrogatepass')
+    return bytes([tag, ord(code)]) + LENGTH.pack(len(name)) + name
+
+
+def attributes(state):
+    '''Returns the layout and the values of the attributes state'''
+
+    layout = []
+    codes = []
+    fixed = []
+    data = []
+    for name, value in state.items():
+        kind = type(value)
+        if kind is str:
+            raw = value.encode('utf-8', 'surrogatepass')
+            tag, code = STR, size_width(len(raw))
+        elif kind is int and width(value):
+            tag, code = INT, width(value)
+        elif kind is float:
+            tag, code = FLOAT, 'd'
+        elif kind is bool or value is None:
+            tag, code = CONSTANT_TAGS[value], '\0'
+        elif kind is list and all(type(item) is str for item in value):
+            items = [item.encode('utf-8', 'surrogatepass') for item in value]
+            raw = struct.pack(f'<I{len(items)}I', len(items),
+                              *map(len, items)) + b''.join(items)
+            tag, code = STRS, size_width(len(raw))
+        else:
+            # Valid UTF-8: the codec escapes what orjson cannot encode
+            raw = codec.dumps(value).encode('utf-8')
+            tag, code = JSON, size_width(len(raw))
+        layout.append(field(tag, code, name))
+        if tag == INT or tag == FLOAT:
+            codes.append(code)
+            fixed.append(value)
+        elif code != '\0':
+            codes.append(code)
+            fixed.append(len(raw))
+            data.append(raw)
+    layout = b''.join(layout)
+    return LENGTH.pack(len(layout)) + layout + \
+        struct.pack('<' + ''.join(codes), *fixed) + b''.join(data)
+
+
+@functools.lru_cache(maxsize=4096)
+def plan(layout):
+    '''
+    Returns the (name, tag, index of the fixed part or None) of each
+    attribute of the layout (bytes), and the struct of the fixed parts
+    '''
+
+    fields = []
+    codes = []
+    pos = 0
+    while pos < len(layout):
+        tag, code = layout[pos:pos + 2]
+        size, = LENGTH.unpack_from(layout, pos + 2)
+        pos += 4 + size
+        name = str(layout[pos - size:pos], 'utf-8', 'surrogatepass')
+        fields.append((name, tag, len(codes) if code else None))
+        if code:
+            codes.append(chr(code))
+    return tuple(fields), struct.Struct('<' + ''.join(codes))
+
+
+def strings(data, pos):
+    '''Returns the list of str encoded (STRS) in data at pos'''
+
+    count, = COUNT.unpack_from(data, pos)
+    pos += 4 + 4 * count
+    items = []
+    for size in struct.unpack_from(f'<{count}I', data, pos - 4 * count):
+        items.append(str(data[pos:pos + size], 'utf-8', 'surrogatepass'))
+        pos += size
+    return items
+
+
+def values(data, pos):
+    '''
+    Returns the dict of the attributes encoded by attributes() in the
+    bytes-like object data at pos
+    '''
+
+    size, = LENGTH.unpack_from(data, pos)
+    pos += 2
+    fields, fixed = plan(bytes(data[pos:pos + size]))
+    pos += size
+    parts = fixed.unpack_from(data, pos)
+    pos += fixed.size
+    obj_dict = {}
+    for name, tag, i in fields:
+        if tag == STR:
+            end = pos + parts[i]
+            obj_dict[name] = str(data[pos:end], 'utf-8', 'surrogatepass')
+            pos = end
+        elif tag == INT or tag == FLOAT:
+            obj_dict[name] = parts[i]
+        elif i is None:
+            obj_dict[name] = CONSTANTS[tag]
+        else:
+            end = pos + parts[i]
+            obj_dict[name] = strings(data, pos) if tag == STRS else \
+                codec.loads(data[pos:end])
+            pos = end
+    return obj_dict
+
+
+def dump(entries):
+    '''
+    Yields the bytes of the snapshot of entries: (key, body()) pairs,
+    in the order of the file, then of its index
+    '''
+
+    yield HEADER
+    pos = len(HEADER)
+    # Class name -> its number and the (id, offset, length) of its bodies
+    classes = {}
+    for key, obj_body in entries:
+        cls_name, dot, inst_id = key.partition('.')
+        if cls_name not in classes:
+            classes[cls_name] = (len(classes), [])
+            name = cls_name.encode('utf-8')
+            yield RECORD.pack(CLASS, len(name)) + name
+            pos += RECORD.size + len(name)
+        number, index = classes[cls_name]
+        yield OBJECT_HEAD.pack(OBJECT, len(obj_body) + 2, number) + obj_body
+        pos += OBJECT_HEAD.size
+        index.append((inst_id, pos, len(obj_body)))
+        pos += len(obj_body)
+
+    parts = []
+    directory = []
+    start = pos + RECORD.size
+    for cls_name, (number, index) in classes.items():
+        index.sort()
+        name = cls_name.encode('utf-8')
+        directory.append(DIRECTORY.pack(start, len(index), len(name)) + name)
+        parts.extend(ENTRY.pack(offset, length)
+                     for inst_id, offset, length in index)
+        start += ENTRY.size * len(index)
+    parts.extend(directory)
+    footer = b''.join(parts)
+    yield RECORD.pack(INDEX, len(footer)) + footer
+    yield TRAILER.pack(start, len(classes), INDEX_MAGIC)
+
+
+def identifier(data):
+    '''
+    Returns the id of the OBJECT body data (a bytes-like object, after
+    the class number) and the position of what follows it
+    '''
+
+    if data[0] & UUID_ID:
+        text = data[1:17].hex()
+        return f'{text[:8]}-{text[8:12]}-{text[12:16]}-' \
+            f'{text[16:20]}-{text[20:]}', 17
+    size, = LENGTH.unpack_from(data, 1)
+    return str(data[3:3 + size], 'utf-8', 'surrogatepass'), 3 + size
+
+
+def decode(cls_name, data):
+    '''
+    Returns the (key, record dict) of the OBJECT body data (a bytes-like
+    object, after the class number) of class cls_name
+    '''
+
+    flags = data[0]
+    inst_id, pos = identifier(data)
+    obj_dict = {'id': inst_id}
+    for flag, attr in ((CREATED, 'created_at'), (UPDATED, 'updated_at')):
+        if flags & flag:
+            micros, = MICROSECONDS.unpack_from(data, pos)
+            obj_dict[attr] = EPOCH + micros * MICROSECOND
+            pos += 8
+    if flags & NATIVE:
+        obj_dict.update(values(data, pos))
+    elif pos < len(data):
+        obj_dict.update(codec.loads(data[pos:]))
+    obj_dict['__class__'] = cls_name
+    return f'{cls_name}.{obj_dict["id"]}', obj_dict
+
+
+def load(f):
+    '''
+    Yields the (key, record dict) of the snapshot read from the binary
+    file f. Raises ValueError when f is not a valid snapshot.
+    '''
+
+    for cls_name, data in objects(f.read()):
+        yield decode(cls_name, data)
+
+
+def objects(view):
+    '''
+    Yields the (class name, OBJECT body) of the snapshot in the bytes-like
+    object view (ex: a mmap), undecoded: each body is a bytes copy.
+    Raises ValueError when view is not a valid snapshot.
+    '''
+
+    if bytes(view[:len(HEADER)]) not in HEADERS:
+        raise ValueError('Not a snapshot (or of another version)')
+    classes = []
+    pos = len(HEADER)
+    end = len(view)
+    while pos < end:
+        if pos + RECORD.size > end:
+            raise ValueError('Truncated snapshot')
+        tag, size = RECORD.unpack_from(view, pos)
+        pos += RECORD.size
+        if tag == INDEX:
+            return
+        if pos + size > end:
+            raise ValueError('Truncated snapshot')
+        if tag == OBJECT:
+            number, = LENGTH.unpack_from(view, pos)
+            yield classes[number], bytes(view[pos + 2:pos + size])
+        elif tag == CLASS:
+            classes.append(str(view[pos:pos + size], 'utf-8'))
+        else:
+            raise ValueError(f'Unknown record tag {tag}')
+        pos += size
+
+
+def mapped(path):
+    '''
+    Returns the Records of each class of the snapshot at path, by class
+    name, mapping the file in memory. Raises ValueError when the file is
+    not a snapshot with an index (or is empty).
+    '''
+
+    with open(path, 'rb') as f:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    if bytes(view[:len(HEADER)]) not in INDEXED or \
+            len(view) < len(HEADER) + TRAILER.size:
+        raise ValueError('Not a snapshot with an index')
+    pos, count, magic = TRAILER.unpack_from(view, len(view) - TRAILER.size)
+    if magic != INDEX_MAGIC:
+        raise ValueError('Not a snapshot with an index')
+    classes = {}
+    try:
+        for _ in range(count):
+            start, length, size = DIRECTORY.unpack_from(view, pos)
+            pos += DIRECTORY.size
+            cls_name = str(view[pos:pos + size], 'utf-8')
+            pos += size
+            classes[cls_name] = Records(view, cls_name, start, length)
+    except struct.error as error:
+        raise ValueError(f'Truncated snapshot index: {error}')
+    return classes
+
+
+class Records(collections.abc.MutableMapping):
+    '''
+    The records of a class in a mapped snapshot: a mapping of their
+    record dicts by <class name>.id, decoded when asked for. Records set
+    or deleted are kept aside, the map is never written.
+
+    Private instance attributes:
+        __view (memoryview) - the mapped snapshot
+        __cls_name (str) - the class of the records
+        __start (int) - the offset of their index entries
+        __count (int) - the number of records in the snapshot
+        __changed (dict) - the records set since, by key
+        __hidden (set) - the keys of the snapshot deleted or set since
+
+    Public instance methods:
+        bodies(self)
+    '''
+
+    def __init__(self, view, cls_name, start, count):
+        '''Initializes the records of cls_name indexed at start in view'''
+
+        self.__view = view
+        self.__cls_name = cls_name
+        self.__start = start
+        self.__count = count
+        self.__changed = {}
+        self.__hidden = set()
+
+    def __entry(self, i):
+        '''Returns the body of the i-th record of the index (no copy)'''
+
+        offset, length = ENTRY.unpack_from(self.__view,
+                                           self.__start + i * ENTRY.size)
+        return self.__view[offset:offset + length]
+
+    def __body(self, key):
+        '''Returns the body of the record at key in the snapshot, or None'''
+
+        cls_name, dot, inst_id = key.partition('.')
+        if cls_name != self.__cls_name or key in self.__hidden:
+            return None
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            data = self.__entry(middle)
+            found = identifier(data)[0]
+            if found == inst_id:
+                return data
+            if found < inst_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __getitem__(self, key):
+        if key in self.__changed:
+            return self.__changed[key]
+        data = self.__body(key)
+        if data is None:
+            raise KeyError(key)
+        return decode(self.__cls_name, data)[1]
+
+    def __setitem__(self, key, obj_dict):
+        if key not in self.__changed and self.__body(key) is not None:
+            self.__hidden.add(key)
+        self.__changed[key] = obj_dict
+
+    def __delitem__(self, key):
+        if key in self.__changed:
+            del self.__changed[key]
+        elif self.__body(key) is not None:
+            self.__hidden.add(key)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__changed or self.__body(key) is not None
+
+    def __len__(self):
+        return self.__count - len(self.__hidden) + len(self.__changed)
+
+    def __iter__(self):
+        for i in range(self.__count):
+            key = f'{self.__cls_name}.{identifier(self.__entry(i))[0]}'
+            if key not in self.__hidden:
+                yield key
+        yield from list(self.__changed)
+
+    def bodies(self):
+        '''
+        Yields the dump() entries of the records: the bodies of the
+        snapshot as they are, those set since encoded
+        '''
+
+        for i in range(self.__count):
+            data = self.__entry(i)
+            key = f'{self.__cls_name}.{identifier(data)[0]}'
+            if key not in self.__hidden:
+                yield key, bytes(data)
+        yield from entries(list(self.__changed.items()))
+
+
+def read(path):
+    '''Yields the (key, record dict) of the file at path, of any format'''
+
+    for key, obj_dict, obj_body in scan(path):
+        yield key, obj_dict
+
+
+def scan(path):
+    '''
+    Yields the (key, record dict, body) of the file at path, of any
+    format: body is the OBJECT body the record was decoded from (None in
+    a JSON file), which body() of the record would give back
+    '''
+
+    if is_snapshot(path):
+        # Mapped, not read: the file is never held whole
+        with open(path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for cls_name, data in objects(view):
+                yield (*decode(cls_name, data), data)
+    else:
+        with open(path, encoding='utf-8') as f:
+            for key, obj_dict in iter_items(f):
+                yield key, obj_dict, None
+
+
+def timestamp(value):
+    '''
+    Returns the datetime of the isoformat() text value, or value itself
+    when the datetime would not give back the same text
+    '''
+
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    return parsed if parsed.isoformat() == value else value
+
+
+def entries(records):
+    '''
+    Returns the dump() entries of the (key, record dict) records (ex:
+    read from a JSON file, with datetimes as text)
+    '''
+
+    for key, obj_dict in records:
+        state = {attr: value for attr, value in obj_dict.items()
+                 if attr != '__class__'}
+        for attr in ('created_at', 'updated_at'):
+            if attr in state:
+                state[attr] = timestamp(state[attr])
+        yield key, body(state)
+
+
+def convert(source, target):
+    '''
+    Writes the records of the file source to the file target, as a
+    snapshot when source is a JSON file, else as a JSON file.
+    The target is written to a temporary file first, so a failed
+    conversion leaves it as it was. Returns the number of records.
+    '''
+
+    if os.path.realpath(source) == os.path.realpath(target) or (
+            os.path.exists(target) and os.path.samefile(source, target)):
+        raise ValueError('the source and the target are the same file')
+    binary = not is_snapshot(source)
+    count = 0
+
+    def counted(records):
+        '''Yields the records, counting them'''
+
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb' if binary else 'w',
+                  encoding=None if binary else 'utf-8') as f:
+            if binary:
+                f.writelines(dump(entries(counted(read(source)))))
+            else:
+                f.write('{')
+                for key, obj_dict in counted(read(source)):
+                    f.write(f'{"," if count > 1 else ""}{codec.dumps(key)}:'
+                            f'{codec.dumps(obj_dict)}')
+                f.write('}')
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return count
@@ -0,0 +1,477 @@
+#!/usr/bin/python3
+'''This module implements the SQLiteStorage class'''
+import contextlib
+import os
+import sqlite3
+import weakref
+from models.engine import codec
+from models.engine.base_storage import BaseStorage, INDEXES, restore
+
+# SQL type of the column of a class attribute, by type of its default
+TYPES = {str: 'TEXT', int: 'INTEGER', float: 'REAL', list: 'TEXT'}
+
+# SQL function of every aggregate() function
+AGGREGATES = {'count': 'COUNT', 'sum': 'TOTAL', 'min': 'MIN', 'max': 'MAX',
+              'avg': 'AVG'}
+
+
+class SQLiteStorage(BaseStorage):
+    '''
+    A storage engine keeping the objects in a SQLite database,
+    one table per model class
+
+    Each table has the columns id (primary key), created_at, updated_at,
+    one column per public class attribute of the model (ex: Place.city_id)
+    and `extra`, a JSON object with the attributes that have no column
+    (or whose value is not of the type of the class attribute).
+    A column is NULL when the instance does not set the attribute.
+    The attributes of INDEXES get a SQL index.
+
+    Private instance attributes:
+        __conn (sqlite3.Connection) - connection to the database
+        __fields (dict) - class name -> {column: default value}
+        __objects (WeakValueDictionary) - identity map: the objects
+                                          already built and still in
+                                          use, by <class name>.id
+        __dirty (dict) - objects changed since they were last written
+        __depth (int) - how many transaction() blocks are open
+        __deferred (bool) - whether save() was called inside them
+        __undo (set) - keys changed inside the open transaction
+
+    Public instance methods:
+        all(self, cls=None)
+        count(self, cls=None)
+        new(self, obj)
+        touch(self, obj)
+        get(self, cls, inst_id)
+        find_by(self, cls, attr, value)
+        between(self, cls, attr, low=None, high=None)
+        aggregate(self, cls, attr, func='avg', by=None)
+        page(self, cls=None, limit=None, after=None)
+        delete(self, obj)
+        save(self)
+        reload(self)
+        transaction(self) (alias: batch)
+        close(self)
+    '''
+
+    def __init__(self, path=None):
+        '''Initialize a new SQLiteStorage.
+
+        Args:
+            path (str): the database file, $HBNB_SQLITE_PATH or hbnb.db
+                        by default.
+        '''
+
+        if path is None:
+            path = os.getenv('HBNB_SQLITE_PATH', 'hbnb.db')
+        self.__conn = sqlite3.connect(path, isolation_level=None,
+                                      check_same_thread=False)
+        self.__fields = {}
+        self.__objects = weakref.WeakValueDictionary()
+        self.__dirty = {}
+        self.__depth = 0
+        self.__deferred = False
+        self.__undo = set()
+
+        for name, cls in self.classes().items():
+            self.__create_table(name, cls)
+
+    def all(self, cls=None):
+        '''
+        Returns the dict of all objects by <class name>.id, or only
+        the objects of class cls (a class or its name) when given
+        '''
+
+        objs_dict = {}
+        for name in self.__names(cls):
+            columns = self.__select_list(name)
+            for row in self.__conn.execute(
+                    f'SELECT {columns} FROM "{name}"'):
+                obj = self.__build(name, row)
+                objs_dict[f'{name}.{obj.id}'] = obj
+        return objs_dict
+
+    def count(self, cls=None):
+        '''Returns the number of objects, or of objects of class cls'''
+
+        total = 0
+        for name in self.__names(cls):
+            total += self.__conn.execute(
+                    f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+        return total
+
+    def new(self, obj):
+        '''Adds obj to the storage (written, but not committed yet)'''
+
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        self.__objects[key] = obj
+        self.__dirty.pop(key, None)
+        if self.__depth:
+            self.__undo.add(key)
+        self.__write(obj)
+
+    def touch(self, obj):
+        '''Records that obj changed, so the next save() writes it'''
+
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        if self.__objects.get(key) is obj:
+            self.__dirty[key] = obj
+            if self.__depth:
+                self.__undo.add(key)
+
+    def get(self, cls, inst_id):
+        '''
+        Returns the object of class cls (a class or its name)
+        with the given id, or None
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        obj = self.__objects.get(f'{name}.{inst_id}')
+        if obj is not None or name not in self.__fields:
+            return obj
+
+        row = self.__conn.execute(
+                f'SELECT {self.__select_list(name)} FROM "{name}" '
+                f'WHERE id = ?', (inst_id,)).fetchone()
+        return None if row is None else self.__build(name, row)
+
+    def find_by(self, cls, attr, value):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose attribute attr equals value, by <class name>.id.
+        Runs a SQL query when attr is a column (indexed for INDEXES).
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        fields = self.__fields.get(name, {})
+        if attr not in fields or type(value) is not type(fields[attr]) \
+                or isinstance(value, list):
+            return super().find_by(name, attr, value)
+
+        self.__flush()
+        objs_dict = {}
+        for row in self.__conn.execute(
+                f'SELECT {self.__select_list(name)} FROM "{name}" '
+                f'WHERE "{attr}" = ?', (value,)):
+            obj = self.__build(name, row)
+            objs_dict[f'{name}.{obj.id}'] = obj
+        return objs_dict
+
+    def between(self, cls, attr, low=None, high=None):
+        '''
+        Returns the dict of the objects of class cls (a class or its name)
+        whose attribute attr is a number from low to high (both included,
+        None: no bound), by <class name>.id.
+        Runs a SQL query when attr is a numeric column.
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        if not self.__numeric(name, attr):
+            return super().between(name, attr, low, high)
+
+        self.__flush()
+        value, params = self.__value(name, attr)
+        where = [f'{value} IS NOT NULL']
+        for bound, op in ((low, '>='), (high, '<=')):
+            if bound is not None:
+                where.append(f'{value} {op} ?')
+                params += self.__value(name, attr)[1] + [bound]
+        objs_dict = {}
+        for row in self.__conn.execute(
+                f'SELECT {self.__select_list(name)} FROM "{name}" '
+                f'WHERE {" AND ".join(where)}', params):
+            obj = self.__build(name, row)
+            objs_dict[f'{name}.{obj.id}'] = obj
+        return objs_dict
+
+    def aggregate(self, cls, attr, func='avg', by=None):
+        '''
+        Returns func ('count', 'sum', 'min', 'max' or 'avg') of the
+        numbers of attribute attr of the objects of class cls, or a dict
+        of them by value of the attribute by (ex: 'city_id').
+        Runs a SQL query when attr is a numeric column and by a column.
+        '''
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        fields = self.__fields.get(name, {})
+        if func not in AGGREGATES or not self.__numeric(name, attr) or \
+                type(fields.get(by, '')) not in TYPES or \
+                isinstance(fields.get(by), list):
+            return super().aggregate(name, attr, func, by)
+
+        self.__flush()
+        value, params = self.__value(name, attr)
+        value = f'{AGGREGATES[func]}({value})'
+        if by is None:
+            row = self.__conn.execute(
+                    f'SELECT {value} FROM "{name}"', params).fetchone()
+            return self.__number(func, row[0])
+        # An unset attribute reads as its class attribute
+        return {group: self.__number(func, result)
+                for group, result in self.__conn.execute(
+                    f'SELECT COALESCE("{by}", ?), {value} FROM "{name}" '
+                    f'GROUP BY 1', [fields[by]] + params)}
+
+    def page(self, cls=None, limit=None, after=None):
+        '''
+        Returns the dict of the first limit objects (all when None) of
+        class cls (a class or its name, or every class when None) by
+        <class name>.id, in the order of their ids, from the one after
+        the cursor after (an id, a key for every class).
+        Runs a SQL query on the primary key when cls is given.
+        '''
+
+        if cls is None:
+            return super().page(cls, limit, after)
+        name = cls if isinstance(cls, str) else cls.__name__
+        if name not in self.__fields:
+            return {}
+
+        self.__flush()
+        sql = f'SELECT {self.__select_list(name)} FROM "{name}"'
+        params = []
+        if after is not None:
+            sql += ' WHERE id > ?'
+            params.append(after)
+        sql += ' ORDER BY id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        objs_dict = {}
+        for row in self.__conn.execute(sql, params):
+            obj = self.__build(name, row)
+            objs_dict[f'{name}.{obj.id}'] = obj
+        return objs_dict
+
+    def delete(self, obj):
+        '''
+        Removes obj (an object or its <class name>.id key).
+        Returns the removed object, or None when there was none.
+        '''
+
+        if isinstance(obj, str):
+            key = obj
+        else:
+            key = f'{obj.__class__.__name__}.{obj.id}'
+        name, inst_id = key.split('.', 1)
+        removed = self.get(name, inst_id)
+        if removed is None:
+            return None
+
+        self.__begin()
+        self.__conn.execute(f'DELETE FROM "{name}" WHERE id = ?', (inst_id,))
+        self.__objects.pop(key, None)
+        self.__dirty.pop(key, None)
+        if self.__depth:
+            self.__undo.add(key)
+        return removed
+
+    def save(self):
+        '''
+        Writes the changed objects and commits.
+        Inside a transaction, only notes that a save is due.
+        '''
+
+        if self.__depth:
+            self.__deferred = True
+            return
+        self.__flush()
+        if self.__conn.in_transaction:
+            self.__conn.execute('COMMIT')
+
+    def reload(self):
+        '''Forgets the objects built so far: they are read again on use'''
+
+        if self.__conn.in_transaction:
+            self.__conn.execute('ROLLBACK')
+        self.__objects = weakref.WeakValueDictionary()
+        self.__dirty = {}
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''
+        Groups changes: save() calls inside the with block are coalesced
+        into one commit when it ends, and if it raises, the database and
+        the objects it changed are put back as they were before the block.
+        Nested blocks join the outermost one.
+        '''
+
+        outermost = self.__depth == 0
+        if outermost:
+            self.__begin()
+            self.__conn.execute('SAVEPOINT hbnb_transaction')
+            self.__undo = set()
+            self.__deferred = False
+        self.__depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__depth -= 1
+            if outermost:
+                self.__rollback()
+            raise
+        self.__depth -= 1
+        if outermost:
+            self.__conn.execute('RELEASE hbnb_transaction')
+            self.__undo = set()
+            if self.__deferred:
+                self.__deferred = False
+                self.save()
+
+    batch = transaction
+
+    def close(self):
+        '''Closes the database connection (uncommitted changes are lost)'''
+
+        self.__conn.close()
+
+    def __rollback(self):
+        '''Puts back the database and the objects of a failed transaction'''
+
+        self.__conn.execute('ROLLBACK TO hbnb_transaction')
+        self.__conn.execute('RELEASE hbnb_transaction')
+        undo, self.__undo = self.__undo, set()
+        self.__deferred = False
+        for key in undo:
+            name, inst_id = key.split('.', 1)
+            obj = self.__objects.pop(key, None)
+            self.__dirty.pop(key, None)
+            fresh = self.get(name, inst_id)
+            if obj is not None and fresh is not None:
+                # Keep handing out the instance callers already hold
+                restore(obj, fresh.__getstate__())
+                self.__objects[key] = obj
+
+    def __begin(self):
+        '''Opens a SQL transaction unless one is open already'''
+
+        if not self.__conn.in_transaction:
+            self.__conn.execute('BEGIN')
+
+    def __names(self, cls):
+        '''Returns the known class names matching cls (None: all)'''
+
+        if cls is None:
+            return list(self.__fields)
+        name = cls if isinstance(cls, str) else cls.__name__
+        return [name] if name in self.__fields else []
+
+    def __create_table(self, name, cls):
+        '''Creates (or completes) the table and indexes of class cls'''
+
+        fields = {}
+        for klass in reversed(cls.__mro__):
+            for attr, default in vars(klass).items():
+                if not attr.startswith('_') and type(default) in TYPES:
+                    fields[attr] = default
+        self.__fields[name] = fields
+
+        self.__conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" ('
+                'id TEXT PRIMARY KEY, created_at TEXT, updated_at TEXT, '
+                'extra TEXT)')
+        existing = {row[1] for row in self.__conn.execute(
+                f'PRAGMA table_info("{name}")')}
+        for attr, default in fields.items():
+            if attr not in existing:
+                self.__conn.execute(
+                        f'ALTER TABLE "{name}" ADD COLUMN '
+                        f'"{attr}" {TYPES[type(default)]}')
+        for attr in INDEXES.get(name, ()):
+            self.__conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{name}_{attr}" '
+                    f'ON "{name}" ("{attr}")')
+
+    def __numeric(self, name, attr):
+        '''Returns whether attr is a numeric column of the class name'''
+
+        default = self.__fields.get(name, {}).get(attr)
+        return type(default) in (int, float)
+
+    def __value(self, name, attr):
+        '''
+        Returns the SQL expression of the value of the numeric column
+        attr of the class name, and its parameters: an unset attribute
+        reads as its class attribute, like it does on the objects, and
+        one set to another type (kept in extra) as NULL
+        '''
+
+        return (f'COALESCE("{attr}", CASE WHEN json_type(extra, ?) '
+                f'IS NULL THEN ? END)',
+                [f'$."{attr}"', self.__fields[name][attr]])
+
+    @staticmethod
+    def __number(func, value):
+        '''Returns the result of aggregate() from the SQL value'''
+
+        if func == 'count' or value is None:
+            return value
+        return float(value)
+
+    def __select_list(self, name):
+        '''Returns the column list read by __build()'''
+
+        columns = ['id', 'created_at', 'updated_at']
+        columns += [f'"{attr}"' for attr in self.__fields[name]]
+        columns.append('extra')
+        return ', '.join(columns)
+
+    def __build(self, name, row):
+        '''
+        Returns the object of the row (read by __select_list()),
+        from the identity map when it was built already
+        '''
+
+        key = f'{name}.{row[0]}'
+        obj = self.__objects.get(key)
+        if obj is not None:
+            return obj
+
+        kwargs = {'id': row[0], 'created_at': row[1], 'updated_at': row[2]}
+        for (attr, default), value in zip(self.__fields[name].items(),
+                                          row[3:-1]):
+            if value is not None:
+                if isinstance(default, list):
+                    value = codec.loads(value)
+                kwargs[attr] = value
+        if row[-1]:
+            kwargs.update(codec.loads(row[-1]))
+
+        obj = self.classes()[name](**kwargs)
+        self.__objects[key] = obj
+        return obj
+
+    def __write(self, obj):
+        '''Inserts or replaces the row of obj'''
+
+        name = obj.__class__.__name__
+        extra = obj.to_dict()
+        del extra['__class__']
+        row = [extra.pop('id'), extra.pop('created_at'),
+               extra.pop('updated_at')]
+        for attr, default in self.__fields[name].items():
+            value = extra.get(attr)
+            if isinstance(default, list) and attr in extra:
+                row.append(codec.dumps(extra.pop(attr)))
+            elif type(value) is type(default):
+                row.append(extra.pop(attr))
+            elif type(default) is float and type(value) is int:
+                # Queried as a float, kept in extra too to stay an int
+                row.append(value)
+            else:
+                row.append(None)
+        row.append(codec.dumps(extra) if extra else None)
+
+        self.__begin()
+        self.__conn.execute(
+                f'INSERT OR REPLACE INTO "{name}" '
+                f'({self.__select_list(name)}) '
+                f'VALUES ({", ".join("?" * len(row))})', row)
+
+    def __flush(self):
+        '''Writes the rows of the changed objects (without committing)'''
+
+        dirty, self.__dirty = self.__dirty, {}
+        for obj in dirty.values():
+            self.__write(obj)
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+'''
+This module implements the TextIndex class, an inverted index of the free
+text of objects (ex: Review.text) ranking the matches with BM25
+
+Each object is a document: the index keeps the term frequencies of every
+document and, for every term, the documents holding it, so a query only
+reads the postings of its own terms. A document also keeps a fingerprint
+of its text: setting the same text again costs no tokenizing, which lets
+an index saved to a file be reused after a reload.
+'''
+import collections
+import math
+import re
+import zlib
+
+TOKEN = re.compile(r'\w+')
+# The BM25 parameters: term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    '''Returns the list of the terms (lowercase words) of text'''
+
+    return TOKEN.findall(text.lower())
+
+
+def fingerprint(text):
+    '''Returns a checksum of text'''
+
+    return zlib.crc32(text.encode('utf-8', 'surrogatepass'))
+
+
+class TextIndex():
+    '''
+    An inverted index of documents, each stored under a key
+
+    Public instance attributes:
+        changed (bool) - whether documents changed since to_dict()
+
+    Private instance attributes:
+        __docs (dict) - key -> (fingerprint, {term: frequency}, length)
+        __postings (dict) - term -> {key: frequency}
+        __total (int) - sum of the lengths (in terms) of the documents
+
+    Public instance methods:
+        set(self, key, text)
+        remove(self, key)
+        keys(self)
+        search(self, query, limit=None)
+        to_dict(self)
+
+    Public class methods:
+        from_dict(cls, docs)
+    '''
+
+    def __init__(self):
+        '''Initialize an empty index'''
+
+        self.changed = False
+        self.__docs = {}
+        self.__postings = {}
+        self.__total = 0
+
+    def __len__(self):
+        '''Returns the number of documents'''
+
+        return len(self.__docs)
+
+    def set(self, key, text):
+        '''Indexes text as the document at key, replacing the previous'''
+
+        checksum = fingerprint(text)
+        doc = self.__docs.get(key)
+        if doc is not None and doc[0] == checksum:
+            return
+        self.remove(key)
+        self.__add(key, checksum, collections.Counter(tokenize(text)))
+
+    def remove(self, key):
+        '''Removes the document at key'''
+
+        doc = self.__docs.pop(key, None)
+        if doc is None:
+            return
+        self.changed = True
+        self.__total -= doc[2]
+        for term in doc[1]:
+            postings = self.__postings[term]
+            del postings[key]
+            if not postings:
+                del self.__postings[term]
+
+    def keys(self):
+        '''Returns the list of the keys of the documents'''
+
+        return list(self.__docs)
+
+    def search(self, query, limit=None):
+        '''
+        Returns the [(score, key)] of the documents holding terms of
+        query, from the best BM25 score (the first limit ones only)
+        '''
+
+        count = len(self.__docs)
+        if not count:
+            return []
+        average = self.__total / count
+        scores = collections.defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.__postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) /
+                           (len(postings) + 0.5))
+            for key, freq in postings.items():
+                norm = K1 * (1 - B + B * self.__docs[key][2] / average)
+                scores[key] += idf * freq * (K1 + 1) / (freq + norm)
+        ranked = sorted(((-score, key) for key, score in scores.items()))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(-score, key) for score, key in ranked]
+
+    def to_dict(self):
+        '''
+        Returns the documents as {key: [fingerprint, {term: frequency}]}
+        (for JSON) and clears changed
+        '''
+
+        self.changed = False
+        # dict() copies at once, even while another thread sets documents
+        return {key: [checksum, freqs] for key, (checksum, freqs, length)
+                in dict(self.__docs).items()}
+
+    @classmethod
+    def from_dict(cls, docs):
+        '''Returns the index of the documents returned by to_dict()'''
+
+        index = cls()
+        for key, (checksum, freqs) in docs.items():
+            index.__add(key, checksum, freqs)
+        index.changed = False
+        return index
+
+    def __add(self, key, checksum, freqs):
+        '''Adds the document at key (which holds none)'''
+
+        length = sum(freqs.values())
+        self.__docs[key] = (checksum, dict(freqs), length)
+        self.__total += length
+        self.changed = True
+        for term, freq in freqs.items():
+            self.__postings.setdefault(term, {})[key] = freq
@@ -7,13 +7,24 @@ Test Classes:
     TestCreateCommand
     TestShowCommand
     TestDestroyCommand
+    TestAllCommand
+    TestCountCommand
+    TestNearCommand
+    TestSearchCommand
+    TestWhereCommand
+    TestImportExportCommands
+    TestPrecmd
+    TestBatchMode
 """
 
+import json
 import unittest
+import os
 import sys
 from io import StringIO
 from unittest.mock import patch
-from console import HBNBCommand
+from console import HBNBCommand, main
+from models import storage
 from models.engine.file_storage import FileStorage
 from models.base_model import BaseModel
 from models.user import User
@@ -292,3 +303,371 @@ class TestDestroyCommand(unittest.TestCase):
             objs_dict = self.storage.all()
 
             self.assertNotIn(f'User.{user_m.id}', objs_dict.keys())
+
+
+class TestAllCommand(unittest.TestCase):
+    """
+    Unittests the `all` command
+    """
+
+    def test_errors(self):
+        '''Test Errors mangement of `all` command'''
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('all Country')
+            output = f.getvalue().strip()
+
+            self.assertEqual(output, '** class doesn\'t exist **')
+
+    def test_all_of_a_class(self):
+        '''Test listing the instances of a class, ex : Amenity'''
+
+        amenity, state = Amenity(), State()
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('all Amenity')
+            output = f.getvalue().strip()
+
+            self.assertIn(str(amenity), output)
+            self.assertNotIn(state.id, output)
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('all')
+            output = f.getvalue().strip()
+
+            self.assertIn(str(amenity), output)
+            self.assertIn(str(state), output)
+
+    def test_option_errors(self):
+        '''Test Errors mangement of the options of `all` command'''
+
+        errors = {'all Place --limit': '** invalid option --limit **',
+                  'all --sort': '** invalid option --sort **',
+                  'all Place --limit ten': '** limit must be a number **'}
+        for line, error in errors.items():
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), error)
+
+    def test_pages(self):
+        '''Test listing the instances page by page, by id'''
+
+        cities = [City(), City(), City()]
+        after = min(city.id for city in cities)
+        rest = sorted(obj.id for obj in storage.all(City).values()
+                      if obj.id > after)
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(f'all City --after {after} --limit 1')
+            output = f.getvalue().strip()
+        self.assertIn(f'[City] ({rest[0]})', output)
+        self.assertEqual(output.count('[City]'), 1)
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(f'all City --stream --after {after}')
+            output = f.getvalue().splitlines()
+        self.assertEqual(output,
+                         [str(storage.get(City, inst_id)) for inst_id in rest])
+
+
+class TestCountCommand(unittest.TestCase):
+    """
+    Unittests the `count` command
+    """
+
+    def test_errors(self):
+        '''Test Errors mangement of `count` command'''
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('count')
+            output = f.getvalue().strip()
+
+            self.assertEqual(output, '** class name missing **')
+
+    def test_count(self):
+        '''Test counting the instances of a class, ex : Review'''
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(HBNBCommand().precmd('Review.count()'))
+            before = int(f.getvalue().strip())
+
+        Review()
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(HBNBCommand().precmd('Review.count()'))
+            self.assertEqual(int(f.getvalue().strip()), before + 1)
+
+
+class TestNearCommand(unittest.TestCase):
+    """
+    Unittests the `near` command
+    """
+
+    def test_errors(self):
+        '''Test Errors mangement of `near` command'''
+
+        errors = {'near': '** class name missing **',
+                  'near Country 1 2 3': '** class doesn\'t exist **',
+                  'near Place 1 2': '** latitude, longitude or distance '
+                                    'missing **',
+                  'near Place 1 two 3': '** latitude, longitude and distance '
+                                        'must be numbers **'}
+        for line, error in errors.items():
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), error)
+
+    def test_near(self):
+        '''Test listing the places near a point, nearest first'''
+
+        paris, versailles, lyon = Place(), Place(), Place()
+        paris.latitude, paris.longitude = 48.8566, 2.3522
+        versailles.latitude, versailles.longitude = 48.8049, 2.1204
+        lyon.latitude, lyon.longitude = 45.7640, 4.8357
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(
+                    HBNBCommand().precmd('Place.near(48.80, 2.12, 30)'))
+            output = f.getvalue()
+        self.assertLess(output.index(versailles.id), output.index(paris.id))
+        self.assertNotIn(lyon.id, output)
+
+
+class TestSearchCommand(unittest.TestCase):
+    """
+    Unittests the `search` command
+    """
+
+    def test_errors(self):
+        '''Test Errors mangement of `search` command'''
+
+        errors = {'search': '** class name missing **',
+                  'search Country "pool"': '** class doesn\'t exist **',
+                  'search Review': '** query missing **'}
+        for line, error in errors.items():
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), error)
+
+    def test_search(self):
+        '''Test listing the matching instances, best match first'''
+
+        quiet, noisy = Review(), Review()
+        quiet.text = "A quiet and clean flat, quiet at night"
+        noisy.text = "Clean but noisy"
+
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('search Review "QUIET clean"')
+            output = f.getvalue()
+        self.assertLess(output.index(quiet.id), output.index(noisy.id))
+
+
+class TestWhereCommand(unittest.TestCase):
+    """
+    Unittests the `where` command
+    """
+
+    def test_errors(self):
+        '''Test Errors mangement of `where` command'''
+
+        errors = {'where': '** class name missing **',
+                  'where Country max_guest > 1': '** class doesn\'t exist **',
+                  'where Place limit=many': '** limit: expecting a number **'}
+        for line, error in errors.items():
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd(line)
+                self.assertEqual(f.getvalue().strip(), error)
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('where Place max_guest >> 1')
+            self.assertIn('Invalid condition', f.getvalue())
+
+    def test_where(self):
+        '''Test filtering, sorting, limiting and projecting'''
+
+        cheap, dear = Place(), Place()
+        cheap.name, cheap.price_by_night = "Cheap", 40
+        dear.name, dear.price_by_night = "Dear", 400
+
+        line = 'where Place price_by_night >= 40, limit=2, ' \
+            'order_by=-price_by_night'
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(line)
+            output = f.getvalue()
+        self.assertLess(output.index(dear.id), output.index(cheap.id))
+
+        line = f'Place.where(name="Cheap", id == "{cheap.id}", fields=name)'
+        with patch('sys.stdout', new=StringIO()) as f:
+            console = HBNBCommand()
+            console.onecmd(console.precmd(line))
+            self.assertEqual(f.getvalue().strip(), "[{'name': 'Cheap'}]")
+
+
+class TestImportExportCommands(unittest.TestCase):
+    """
+    Unittests the `import`, `export` and `convert` commands
+    """
+
+    def tearDown(self):
+        for path in ("console.ndjson", "console.csv", "console.json",
+                     "console.hbnb"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_errors(self):
+        '''Test Errors mangement of `import` and `export` commands'''
+
+        errors = {'': '** class name missing **',
+                  ' Country x.csv': '** class doesn\'t exist **',
+                  ' Place': '** file missing **'}
+        for command in ('import', 'export'):
+            for args, error in errors.items():
+                with patch('sys.stdout', new=StringIO()) as f:
+                    HBNBCommand().onecmd(command + args)
+                    self.assertEqual(f.getvalue().strip(), error)
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('import Place console.ndjson')
+            self.assertIn('console.ndjson **', f.getvalue())
+
+    def test_export_then_import(self):
+        '''Test writing the instances of a class and reading them back'''
+
+        count = storage.count(Amenity)
+        amenity = Amenity()
+        amenity.name = "Wifi"
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('export Amenity console.csv')
+            self.assertEqual(f.getvalue().strip(), str(count + 1))
+        storage.delete(amenity)
+
+        with open('console.csv', 'a') as f:
+            f.write(',,,,{oops\n')
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('import Amenity console.csv')
+            output = f.getvalue().splitlines()
+        self.assertEqual(output[0], str(count + 1))
+        self.assertTrue(output[1].startswith(f'** line {count + 3}: '))
+        self.assertEqual(storage.get(Amenity, amenity.id).name, "Wifi")
+
+    def test_convert(self):
+        '''Test the conversions between JSON files and snapshots'''
+
+        errors = {'convert': '** source file missing **',
+                  'convert console.json': '** target file missing **',
+                  'convert console.json console.json':
+                  '** the source and the target are the same file **',
+                  'convert nowhere.json console.hbnb':
+                  '** No such file or directory: nowhere.json **'}
+        for command, error in errors.items():
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd(command)
+                self.assertEqual(f.getvalue().strip(), error)
+
+        amenity = Amenity()
+        with open('console.json', 'w') as f:
+            json.dump({'Amenity.' + amenity.id: amenity.to_dict()}, f)
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd('convert console.json console.hbnb')
+            HBNBCommand().onecmd('convert console.hbnb console.json')
+            self.assertEqual(f.getvalue().split(), ['1', '1'])
+        with open('console.json') as f:
+            self.assertEqual(json.load(f), {'Amenity.' + amenity.id:
+                                            amenity.to_dict()})
+
+
+class TestPrecmd(unittest.TestCase):
+    """
+    Unittests the translation of <class>.<command>(<arguments>) lines
+    """
+
+    def test_translations(self):
+        '''Test the lines precmd rewrites, or leaves as they are'''
+
+        lines = {
+            'User.all()': 'all User',
+            'User.all(1)': 'User.all(1)',
+            'User.count()': 'count User',
+            'User.show("1234")': 'show User "1234"',
+            'User.destroy("12-34")': 'destroy User "12-34"',
+            'User.update("1234", "name", "Robert Jr")':
+                'update User "1234" "name" "Robert Jr"',
+            'User.update("1234", {"age": 89})':
+                'update User "1234" {"age": 89}',
+            'User.update("1", "a", "b", "c")': 'update User "1" "a" "b"',
+            'Place.near(1, 2, 3)': 'near Place 1  2  3',
+            'Place.where(max_guest > 1, limit=2)':
+                'where Place max_guest > 1, limit=2',
+            'User.foo()': 'User.foo()',
+            'show User 1234': 'show User 1234',
+            'update User 1 name "x(y)"': 'update User 1 name "x(y)"'}
+        with patch('sys.stdout', new=StringIO()):
+            for line, expected in lines.items():
+                self.assertEqual(HBNBCommand().precmd(line), expected)
+
+
+class TestBatchMode(unittest.TestCase):
+    """
+    Unittests running a script of commands with run_batch()
+    """
+
+    def test_output_and_errors(self):
+        '''Test the buffered output and the error summary'''
+
+        script = StringIO('create User\n'
+                          'create Country\n'
+                          'foo bar\n'
+                          'update User 1234 name undefined\n'
+                          'quit\n'
+                          'create User\n')
+        with patch('sys.stdout', new=StringIO()) as f:
+            errors = HBNBCommand().run_batch(script)
+            output = f.getvalue().splitlines()
+
+        self.assertEqual(len(output), 4)
+        self.assertIsNotNone(storage.get(User, output[0]))
+        self.assertEqual([(number, line) for number, line, error in errors],
+                         [(2, 'create Country'), (3, 'foo bar'),
+                          (4, 'update User 1234 name undefined')])
+        self.assertEqual(errors[0][2], "** class doesn't exist **")
+
+    def test_exceptions_do_not_stop_the_batch(self):
+        '''Test a command raising an error'''
+
+        user = User()
+        script = [f'update User {user.id} age undefined_name',
+                  f'update User {user.id} age 89']
+        with patch('sys.stdout', new=StringIO()):
+            errors = HBNBCommand().run_batch(script)
+        self.assertEqual(len(errors), 1)
+        self.assertIn('NameError', errors[0][2])
+        self.assertEqual(user.age, 89)
+
+    def test_saves_once_per_block(self):
+        '''Test that the saves of a block of commands are coalesced'''
+
+        save_now = FileStorage._FileStorage__save_now
+        with patch.object(FileStorage, '_FileStorage__save_now',
+                          autospec=True, side_effect=save_now) as mock:
+            with patch('sys.stdout', new=StringIO()):
+                HBNBCommand().run_batch(['create Place'] * 5, save_every=2)
+        self.assertEqual(mock.call_count, 3)
+
+    def test_save_every_must_be_positive(self):
+        '''Test that --save-every rejects 0 and negative numbers'''
+
+        for value in ('0', '-3', 'x'):
+            argv = ['console.py', '--batch', '-', '--save-every', value]
+            with patch('sys.argv', argv), \
+                    patch('sys.stderr', new=StringIO()) as f, \
+                    patch.object(HBNBCommand, 'run_batch') as run_batch:
+                with self.assertRaises(SystemExit) as context:
+                    main()
+            self.assertEqual(context.exception.code, 2)
+            self.assertIn('expecting a positive integer', f.getvalue())
+            run_batch.assert_not_called()
+
+
+def tearDownModule():
+    '''Removes the text index the tests saved next to file.json'''
+
+    if os.path.exists('file.json.search'):
+        os.remove('file.json.search')
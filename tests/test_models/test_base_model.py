@@ -5,13 +5,14 @@
 Test Classes:
     TestCreateFromDict
     TestModel_instantiation
+    TestParseDatetime
     TestSave
     TestToDict
 """
 
 import models
 import os
-from models.base_model import BaseModel
+from models.base_model import BaseModel, parse_datetime
 import datetime
 import unittest
 import time
@@ -255,5 +256,36 @@ class TestCreateFromDict(unittest.TestCase):
         self.assertNotEqual(b2.updated_at, b1.updated_at)
 
 
+class TestParseDatetime(unittest.TestCase):
+    """
+    Testing the parse_datetime helper used by BaseModel(**kwargs).
+    """
+
+    def test_isoformat(self):
+        date = datetime.datetime(2017, 9, 28, 21, 5, 54, 119427)
+        self.assertEqual(parse_datetime(date.isoformat()), date)
+
+    def test_no_microseconds(self):
+        date = datetime.datetime(2017, 9, 28, 21, 5, 54)
+        self.assertEqual(parse_datetime(date.isoformat()), date)
+        base_model = BaseModel(id="1", created_at=date.isoformat(),
+                               updated_at=date.isoformat())
+        self.assertEqual(base_model.created_at, date)
+
+    def test_legacy_format(self):
+        self.assertEqual(parse_datetime("2017-09-28 21:05:54.119427"),
+                         datetime.datetime(2017, 9, 28, 21, 5, 54, 119427))
+
+    def test_repeated_strings_share_one_datetime(self):
+        isodate = "2017-09-28T21:05:54.119427"
+        self.assertIs(parse_datetime(isodate), parse_datetime(isodate))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_datetime("28/09/2017")
+        with self.assertRaises(TypeError):
+            parse_datetime(None)
+
+
 if __name__ == "__main__":
     unittest.main()
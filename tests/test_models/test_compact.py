@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+"""Defines unittests for models/compact.py.
+
+Unittest classes:
+    TestCompact
+    TestCompactStorage
+"""
+import models
+import tracemalloc
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from console import HBNBCommand
+from models.compact import compact
+from models.engine import base_storage, bulk
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.user import User
+
+
+class TestCompact(unittest.TestCase):
+    """testing the compact model classes"""
+
+    def test_compact_class(self):
+        CompactPlace = compact(Place)
+        self.assertIs(compact(Place), CompactPlace)
+        self.assertIs(compact(CompactPlace), CompactPlace)
+        self.assertEqual(CompactPlace.__name__, "Place")
+        self.assertFalse(issubclass(CompactPlace, Place))
+        self.assertIn("max_guest", CompactPlace.fields)
+        self.assertEqual(bulk.fields(CompactPlace), bulk.fields(Place))
+
+    def test_no_instance_dict(self):
+        place = compact(Place)(id="1", created_at="2017-09-28T21:03:54",
+                               updated_at="2017-09-28T21:03:54",
+                               name="Cozy Cabin")
+        self.assertFalse(hasattr(place, "__dict__"))
+        self.assertEqual(place.name, "Cozy Cabin")
+
+    def test_smaller_than_regular(self):
+        place = Place()
+        place.name = "Cozy Cabin"
+        place.city_id = place.user_id = "1"
+        place.max_guest = 4
+        kwargs = place.to_dict()
+        sizes = []
+        tracemalloc.start()
+        try:
+            for cls in (Place, compact(Place)):
+                start = tracemalloc.get_traced_memory()[0]
+                places = [cls(**dict(kwargs, id=str(i)))
+                          for i in range(1000)]
+                sizes.append(tracemalloc.get_traced_memory()[0] - start)
+                del places
+        finally:
+            tracemalloc.stop()
+        self.assertLess(sizes[1], sizes[0])
+
+    def test_defaults(self):
+        place = compact(Place)()
+        self.assertEqual(place.max_guest, 0)
+        self.assertEqual(place.amenity_ids, [])
+        place.max_guest = 4
+        self.assertEqual(place.max_guest, 4)
+        self.assertNotIn("max_guest", compact(Place)().to_dict())
+        with self.assertRaises(AttributeError):
+            place.nope
+
+    def test_same_output_as_regular(self):
+        regular = Place()
+        regular.name = "Cozy Cabin"
+        regular.pets = False
+        kwargs = regular.to_dict()
+        place = compact(Place)(**kwargs)
+        self.assertEqual(place.to_dict(), kwargs)
+        self.assertEqual(str(place), str(regular))
+
+    def test_dynamic_attributes(self):
+        user = compact(User)()
+        user.nickname = "Betty"
+        self.assertEqual(user.nickname, "Betty")
+        self.assertEqual(user.to_dict()["nickname"], "Betty")
+        del user.nickname
+        self.assertNotIn("nickname", user.to_dict())
+        with self.assertRaises(AttributeError):
+            user.nickname
+
+
+class TestCompactStorage(unittest.TestCase):
+    """testing the storage of compact objects"""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_classes(self):
+        with patch.object(base_storage, "COMPACT", True):
+            classes = models.storage.classes()
+        self.assertIs(classes["Place"], compact(Place))
+        self.assertIs(models.storage.classes()["Place"], Place)
+
+    def test_save_and_reload(self):
+        place = compact(Place)()
+        place.max_guest = 3
+        place.view = "sea"
+        place.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(base_storage, "COMPACT", True):
+            models.storage.reload()
+        loaded = models.storage.get(Place, place.id)
+        self.assertIsInstance(loaded, compact(Place))
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+
+    def test_rollback(self):
+        place = compact(Place)()
+        place.save()
+        with self.assertRaises(KeyError):
+            with models.storage.transaction():
+                place.max_guest = 9
+                place.view = "sea"
+                raise KeyError("abort")
+        self.assertEqual(place.max_guest, 0)
+        self.assertNotIn("view", place.to_dict())
+
+    def test_console_update(self):
+        place = compact(Place)()
+        with patch("sys.stdout", new=StringIO()):
+            HBNBCommand().onecmd(f'update Place {place.id} max_guest 5')
+            HBNBCommand().onecmd(f'update Place {place.id} view "sea"')
+        self.assertEqual(place.max_guest, 5)
+        self.assertEqual(place.view, "sea")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/bulk.py.
+
+Unittest classes:
+    TestBulk
+"""
+import io
+import unittest
+from models.engine.bulk import coerce, fields, format_of, read, writer
+from models.place import Place
+from models.user import User
+
+
+class TestBulk(unittest.TestCase):
+    """testing the records of bulk imports and exports"""
+
+    def test_format_of(self):
+        self.assertEqual(format_of("places.CSV"), "csv")
+        self.assertEqual(format_of("places.ndjson"), "ndjson")
+        self.assertEqual(format_of("places.txt", "csv"), "csv")
+        with self.assertRaises(ValueError):
+            format_of("places.xml", "xml")
+
+    def test_fields(self):
+        defaults = fields(Place)
+        self.assertEqual(defaults["max_guest"], 0)
+        self.assertEqual(defaults["amenity_ids"], [])
+        self.assertNotIn("save", defaults)
+        self.assertEqual(fields(User)["email"], "")
+
+    def test_coerce(self):
+        kwargs = coerce({"__class__": "Place", "max_guest": "4",
+                         "latitude": 3, "amenity_ids": '["a"]',
+                         "name": "Flat", "pool": "yes"}, fields(Place),
+                        {"rooms": "2"})
+        self.assertEqual(kwargs["max_guest"], 4)
+        self.assertEqual(kwargs["latitude"], 3.0)
+        self.assertEqual(kwargs["amenity_ids"], ["a"])
+        self.assertEqual(kwargs["pool"], "yes")
+        self.assertEqual(kwargs["rooms"], "2")
+        self.assertNotIn("__class__", kwargs)
+        self.assertTrue(kwargs["id"] and kwargs["created_at"])
+
+        for record in ({"max_guest": "four"}, {"max_guest": 4.5},
+                       {"amenity_ids": '{"a": 1}'}):
+            with self.assertRaises(ValueError):
+                coerce(record, fields(Place))
+
+    def test_read_ndjson(self):
+        f = io.StringIO('{"name": "a"}\n\n[1]\nnot json\n{"name": "b"}\n')
+        records = list(read(f, "ndjson"))
+        self.assertEqual([line for line, record, extra in records],
+                         [1, 3, 4, 5])
+        self.assertEqual(records[0][1], {"name": "a"})
+        self.assertIsInstance(records[1][1], ValueError)
+        self.assertIsInstance(records[2][1], ValueError)
+
+    def test_csv_round_trip(self):
+        place = Place()
+        place.name = "Flat, with a view"
+        place.max_guest = 4
+        place.price_by_night = "cheap"
+        place.amenity_ids = ["a", "b"]
+        place.pool = True
+        f = io.StringIO()
+        writer(f, "csv", Place)(place)
+        f.seek(0)
+
+        [(line, record, extra)] = list(read(f, "csv"))
+        self.assertEqual(line, 2)
+        self.assertEqual(record["max_guest"], "4")
+        self.assertNotIn("number_rooms", record)
+        self.assertEqual(extra, {"price_by_night": "cheap", "pool": True})
+        kwargs = coerce(record, fields(Place), extra)
+        self.assertEqual(Place(**kwargs).to_dict(), place.to_dict())
+
+    def test_bad_extra(self):
+        f = io.StringIO("id,extra\n1,[1]\n2,{oops\n")
+        records = list(read(f, "csv"))
+        self.assertEqual(len(records), 2)
+        self.assertTrue(all(isinstance(record, ValueError)
+                            for line, record, extra in records))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/codec.py.
+
+Unittest classes:
+    TestCodec
+"""
+import datetime
+import json
+import math
+import unittest
+from models.engine import codec
+from models.place import Place
+
+
+class TestCodec(unittest.TestCase):
+    """testing the JSON codec of the storage engines"""
+
+    def setUp(self):
+        self.codecs = [(codec.json_dumps, codec.json_loads)]
+        if codec.orjson is not None:
+            self.codecs.append((codec.orjson_dumps, codec.orjson_loads))
+
+    def test_compact_with_datetimes(self):
+        value = {"a": [1, 2.5, None], "b": datetime.datetime(2024, 1, 2),
+                 "c": datetime.datetime(2024, 1, 2, 3, 4, 5, 6), 7: "é"}
+        for dumps, loads in self.codecs:
+            text = dumps(value)
+            self.assertNotIn(", ", text)
+            self.assertNotIn(": ", text)
+            self.assertEqual(loads(text), {
+                    "a": [1, 2.5, None], "b": "2024-01-02T00:00:00",
+                    "c": "2024-01-02T03:04:05.000006", "7": "é"})
+
+    def test_same_values_as_the_json_module(self):
+        for value in (2 ** 70, "\ud800", {"k": " "}):
+            for dumps, loads in self.codecs:
+                self.assertEqual(loads(dumps(value)), value)
+                self.assertEqual(loads(json.dumps(value)), value)
+
+    def test_non_finite_floats(self):
+        value = {"a": float("nan"), "b": [float("inf"), -float("inf")]}
+        for dumps, loads in self.codecs:
+            text = dumps(value)
+            self.assertEqual(text, json.dumps(value, separators=(",", ":")))
+            result = loads(text)
+            self.assertTrue(math.isnan(result["a"]))
+            self.assertEqual(result["b"], [float("inf"), -float("inf")])
+
+    def test_errors(self):
+        for dumps, loads in self.codecs:
+            with self.assertRaises(TypeError):
+                dumps({"a": {1, 2}})
+            with self.assertRaises(ValueError):
+                loads('{"a": ')
+
+    def test_record(self):
+        place = Place()
+        place.name = "Flat"
+        obj_dict = codec.loads(codec.dumps(codec.record(place)))
+        self.assertEqual(obj_dict, place.to_dict())
+        self.assertEqual(list(obj_dict), list(place.to_dict()))
+        self.assertIsInstance(place.created_at, datetime.datetime)
+
+
+if __name__ == "__main__":
+    unittest.main()
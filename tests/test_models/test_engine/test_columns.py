@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/columns.py.
+
+Unittest classes:
+    TestColumnStore
+"""
+import math
+import unittest
+from models.engine.columns import ColumnStore, aggregate, number
+
+
+class Row:
+    """an object with the attributes of a row"""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TestColumnStore(unittest.TestCase):
+    """testing the typed arrays of the numeric attributes"""
+
+    def setUp(self):
+        self.store = ColumnStore(("price", "guests"))
+        self.store.set("a", Row(price=10, guests=2))
+        self.store.set("b", Row(price=20.5, guests=4))
+        self.store.set("c", Row(price="free", guests=6))
+
+    def test_number(self):
+        self.assertEqual(number(3), 3.0)
+        self.assertTrue(math.isnan(number("3")))
+        self.assertTrue(math.isnan(number(True)))
+
+    def test_between(self):
+        self.assertEqual(self.store.between("price"), ["a", "b"])
+        self.assertEqual(self.store.between("price", 15), ["b"])
+        self.assertEqual(self.store.between("guests", 3, 4), ["b"])
+        self.assertEqual(self.store.between("guests", high=2), ["a"])
+
+    def test_set_and_remove(self):
+        self.store.set("a", Row(price=30))
+        self.store.remove("a")
+        self.store.remove("nope")
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.between("guests"), ["c", "b"])
+        self.store.remove("b")
+        self.store.remove("c")
+        self.assertEqual(self.store.between("guests"), [])
+
+    def test_aggregate(self):
+        self.assertEqual(self.store.aggregate("price", "sum"), 30.5)
+        self.assertEqual(self.store.aggregate("price", "count"), 2)
+        self.assertEqual(self.store.aggregate("guests", "avg", ["b", "c"]),
+                         5.0)
+        self.assertIsNone(self.store.aggregate("price", "min", ["c"]))
+        self.assertEqual(aggregate([], "sum"), 0)
+        with self.assertRaises(ValueError):
+            aggregate([1.0], "median")
+
+
+if __name__ == "__main__":
+    unittest.main()
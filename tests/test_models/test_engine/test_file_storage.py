@@ -4,12 +4,37 @@
 Unittest classes:
     TestClass_instantiation
     TestFileStorage_methods
+    TestJournal
+    TestDirtyTracking
+    TestFindBy
+    TestColumns
+    TestGeo
+    TestSearch
+    TestWhere
+    TestPages
+    TestBulk
+    TestLazyReload
+    TestDurability
+    TestBinaryFormat
+    TestMappedSnapshot
+    TestTransaction
+    TestWriteBehind
+    TestSharedStorage
 """
+import glob
+import json
 import models
 import unittest
+import unittest.mock
 import os
 import shutil
+import subprocess
+import sys
+import threading
+import time
+from models.engine import codec, snapshot
 from models.engine.file_storage import FileStorage
+from models.engine.text_index import TextIndex
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -63,8 +88,34 @@ class TestMethods(unittest.TestCase):
         self.assertEqual(dict, type(models.storage.all()))
 
     def test_all_method_with_args(self):
+        self.assertIs(models.storage.all(None), models.storage.all())
         with self.assertRaises(TypeError):
-            models.storage.all(None)
+            models.storage.all(None, None)
+
+    def test_all_method_with_class(self):
+        base_m, user = BaseModel(), User()
+        users = models.storage.all(User)
+        self.assertIn("User." + user.id, users)
+        self.assertNotIn("BaseModel." + base_m.id, users)
+        self.assertEqual(users, models.storage.all("User"))
+        self.assertEqual({}, models.storage.all("Country"))
+
+    def test_count_method(self):
+        total = models.storage.count()
+        states = models.storage.count(State)
+        state = State()
+        self.assertEqual(models.storage.count(), total + 1)
+        self.assertEqual(models.storage.count("State"), states + 1)
+        models.storage.delete(state)
+        self.assertEqual(models.storage.count(State), states)
+        self.assertEqual(models.storage.count("Country"), 0)
+
+    def test_index_follows_objects_reset(self):
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(models.storage.count(Amenity), 0)
+        amenity = Amenity()
+        self.assertEqual(list(models.storage.all(Amenity).values()),
+                         [amenity])
 
     def test_new_method(self):
         base_m = BaseModel()
@@ -102,6 +153,25 @@ class TestMethods(unittest.TestCase):
         with self.assertRaises(TypeError):
             models.storage.reload(None)
 
+    def test_get_method(self):
+        base_m = BaseModel()
+        self.assertIs(models.storage.get(BaseModel, base_m.id), base_m)
+        self.assertIs(models.storage.get("BaseModel", base_m.id), base_m)
+        self.assertIsNone(models.storage.get("User", base_m.id))
+        self.assertIsNone(models.storage.get("BaseModel", "nope"))
+
+    def test_delete_method(self):
+        base_m = BaseModel()
+        self.assertIs(models.storage.delete(base_m), base_m)
+        self.assertNotIn("BaseModel." + base_m.id, models.storage.all())
+        self.assertIsNone(models.storage.delete(base_m))
+
+    def test_delete_method_with_key(self):
+        base_m = BaseModel()
+        key = "BaseModel." + base_m.id
+        self.assertIs(models.storage.delete(key), base_m)
+        self.assertNotIn(key, models.storage.all())
+
 
 class TestWithUser(unittest.TestCase):
     """testing that FileStorage class correctly handles User class"""
@@ -419,5 +489,1097 @@ class TestWithReview(unittest.TestCase):
         self.assertEqual(storage_objs[key].text, 'Excellent')
 
 
+class TestJournal(unittest.TestCase):
+    """testing the append-only journal mode of FileStorage"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "journal.json"
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__changes = {}
+
+    def tearDown(self):
+        models.storage.wait()
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__journal_limit = 4 * 1024 * 1024
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for path in ("journal.json", "journal.json.log",
+                     "journal.json.log.1"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_save_appends_changes_only(self):
+        first, second = User(), User()
+        models.storage.save()
+        second.first_name = "Betty"
+        models.storage.touch(second)
+        models.storage.save()
+        with open("journal.json.log", "r") as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn(second.id, lines[2])
+        self.assertIn("Betty", lines[2])
+        self.assertFalse(os.path.exists("journal.json"))
+
+    def test_reload_replays_journal(self):
+        kept, gone = City(), City()
+        kept.name = "Tokyo"
+        models.storage.save()
+        models.storage.delete(gone)
+        models.storage.save()
+
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(objs["City." + kept.id].name, "Tokyo")
+        self.assertNotIn("City." + gone.id, objs)
+
+    def test_compaction(self):
+        FileStorage._FileStorage__journal_limit = 1
+        state = State()
+        state.name = "California"
+        models.storage.save()
+        models.storage.wait()
+
+        self.assertFalse(os.path.exists("journal.json.log.1"))
+        with open("journal.json", "r") as f:
+            self.assertIn("State." + state.id, f.read())
+
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(
+                models.storage.all()["State." + state.id].name, "California")
+
+    def test_touch_unknown_object(self):
+        review = Review(id="1", created_at="2017-09-28T21:05:54.119427",
+                        updated_at="2017-09-28T21:05:54.119427")
+        models.storage.touch(review)
+        self.assertNotIn("Review.1", FileStorage._FileStorage__changes)
+
+
+class TestDirtyTracking(unittest.TestCase):
+    """testing that save() only re-encodes the changed objects"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "dirty.json"
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("dirty.json")
+        except IOError:
+            pass
+
+    def test_clean_objects_are_cached(self):
+        cache = FileStorage._FileStorage__cache
+        place = Place()
+        models.storage.save()
+        self.assertIn(place, cache)
+
+        place.name = "Cozy Cabin"
+        self.assertNotIn(place, cache)
+        models.storage.save()
+        self.assertIn("Cozy Cabin", cache[place])
+
+    def test_saved_file_is_valid_json(self):
+        user = User()
+        user.first_name = "Betty"
+        models.storage.save()
+        user.first_name = "Holberton"
+        models.storage.save()
+        with open("dirty.json", "r") as f:
+            content = json.load(f)
+        self.assertEqual(content["User." + user.id]["first_name"],
+                         "Holberton")
+
+
+class TestFindBy(unittest.TestCase):
+    """testing the attribute indexes behind FileStorage.find_by()"""
+
+    def setUp(self):
+        self.city, self.other_city = City(), City()
+        self.place = Place()
+        self.place.city_id = self.city.id
+
+    def test_find_by_indexed_attribute(self):
+        places = models.storage.find_by(Place, "city_id", self.city.id)
+        self.assertEqual(places, {"Place." + self.place.id: self.place})
+
+    def test_index_follows_updates(self):
+        self.place.city_id = self.other_city.id
+        self.assertEqual(
+                models.storage.find_by("Place", "city_id", self.city.id), {})
+        self.assertIn(
+                "Place." + self.place.id,
+                models.storage.find_by("Place", "city_id",
+                                       self.other_city.id))
+
+    def test_index_follows_delete(self):
+        review = Review()
+        review.place_id = self.place.id
+        self.assertEqual(
+                len(models.storage.find_by(Review, "place_id",
+                                           self.place.id)), 1)
+        models.storage.delete(review)
+        self.assertEqual(
+                models.storage.find_by(Review, "place_id", self.place.id), {})
+
+    def test_built_on_first_use(self):
+        FileStorage._FileStorage__objects = dict(
+                FileStorage._FileStorage__objects)
+        self.assertNotIn("Place", FileStorage._FileStorage__valued)
+        self.assertEqual(
+                len(models.storage.find_by(Place, "city_id", self.city.id)),
+                1)
+        self.assertIn("Place", FileStorage._FileStorage__valued)
+        place = Place()
+        place.city_id = self.city.id
+        self.assertEqual(
+                len(models.storage.find_by(Place, "city_id", self.city.id)),
+                2)
+        models.storage.delete(place)
+
+    def test_find_by_plain_attribute(self):
+        self.city.name = "Tokyo"
+        self.assertEqual(models.storage.find_by(City, "name", "Tokyo"),
+                         {"City." + self.city.id: self.city})
+
+    def test_unhashable_value(self):
+        self.place.user_id = ["not", "an", "id"]
+        self.assertIn("Place." + self.place.id,
+                      models.storage.find_by(Place, "user_id",
+                                             ["not", "an", "id"]))
+
+
+class TestColumns(unittest.TestCase):
+    """testing the Place columns behind between() and aggregate()"""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.city, self.other_city = City(), City()
+        self.places = []
+        for price, city in ((80, self.city), (120, self.city),
+                            (200, self.other_city)):
+            place = Place()
+            place.price_by_night = price
+            place.city_id = city.id
+            self.places.append(place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def keys(self, places):
+        return {"Place." + place.id for place in places}
+
+    def test_between(self):
+        storage = models.storage
+        self.assertEqual(set(storage.between(Place, "price_by_night",
+                                             100, 200)),
+                         self.keys(self.places[1:]))
+        self.assertEqual(set(storage.between("Place", "price_by_night",
+                                             high=100)),
+                         self.keys(self.places[:1]))
+        self.assertEqual(len(storage.between(Place, "max_guest")), 3)
+
+    def test_columns_follow_changes(self):
+        self.assertEqual(len(models.storage.between(Place, "max_guest")), 3)
+        self.places[0].price_by_night = 150
+        self.places[1].price_by_night = "cheap"
+        models.storage.delete(self.places[2])
+        self.assertEqual(set(models.storage.between(Place, "price_by_night",
+                                                    100)),
+                         self.keys(self.places[:1]))
+
+    def test_aggregate(self):
+        storage = models.storage
+        self.assertEqual(storage.aggregate(Place, "price_by_night"),
+                         400 / 3)
+        self.assertEqual(storage.aggregate(Place, "price_by_night", "max"),
+                         200.0)
+        self.assertEqual(storage.aggregate(Place, "price_by_night", "count"),
+                         3)
+        self.assertEqual(storage.aggregate(Place, "price_by_night",
+                                           by="city_id"),
+                         {self.city.id: 100.0, self.other_city.id: 200.0})
+        with self.assertRaises(ValueError):
+            storage.aggregate(Place, "price_by_night", "median")
+
+    def test_same_as_scan(self):
+        self.places[0].number_rooms = 3
+        self.places[1].number_rooms = 3.5
+        self.places[2].number_rooms = None
+        for func in ("count", "sum", "min", "max", "avg"):
+            self.assertEqual(
+                    models.storage.aggregate(Place, "number_rooms", func),
+                    super(FileStorage, models.storage).aggregate(
+                        Place, "number_rooms", func))
+        self.assertEqual(
+                models.storage.between(Place, "number_rooms", 3),
+                super(FileStorage, models.storage).between(
+                    Place, "number_rooms", 3))
+
+
+class TestGeo(unittest.TestCase):
+    """testing the grid index behind within(), near() and nearest()"""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.paris, self.lyon, self.tokyo = Place(), Place(), Place()
+        for place, (lat, lon) in ((self.paris, (48.8566, 2.3522)),
+                                  (self.lyon, (45.7640, 4.8357)),
+                                  (self.tokyo, (35.6762, 139.6503))):
+            place.latitude, place.longitude = lat, lon
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_within(self):
+        self.assertEqual(list(models.storage.within(Place, 40, -5, 50, 10)),
+                         ["Place." + self.paris.id, "Place." + self.lyon.id])
+
+    def test_near_follows_changes(self):
+        self.assertEqual(list(models.storage.near(Place, 46, 4, 500)),
+                         ["Place." + self.lyon.id, "Place." + self.paris.id])
+        self.lyon.latitude = 35.7
+        self.lyon.longitude = 139.7
+        models.storage.delete(self.paris)
+        self.assertEqual(models.storage.near("Place", 46, 4, 500), {})
+
+    def test_nearest(self):
+        storage = models.storage
+        self.assertEqual(list(storage.nearest(Place, 36, 140, 2)),
+                         ["Place." + self.tokyo.id, "Place." + self.paris.id])
+        self.assertEqual(
+                storage.nearest(Place, 36, 140, 3),
+                super(FileStorage, storage).nearest(Place, 36, 140, 3))
+        self.assertEqual(storage.near(Place, 46, 4, 500),
+                         super(FileStorage, storage).near(Place, 46, 4, 500))
+
+    def test_places_without_a_point(self):
+        unset, equator = Place(), Place()
+        equator.latitude = 0.0
+        storage = models.storage
+        for near in (storage.near,
+                     super(FileStorage, storage).near):
+            self.assertEqual(list(near(Place, 0, 0, 10)),
+                             ["Place." + equator.id])
+        self.assertNotIn("Place." + unset.id,
+                         storage.nearest(Place, 0, 0, 4))
+        self.assertNotIn("Place." + unset.id,
+                         super(FileStorage, storage).nearest(Place, 0, 0, 4))
+        unset.longitude = 0
+        self.assertIn("Place." + unset.id, storage.near(Place, 0, 0, 10))
+
+
+class TestSearch(unittest.TestCase):
+    """testing the text index behind FileStorage.search()"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "search.json"
+        FileStorage._FileStorage__objects = {}
+        self.reviews = []
+        for text in ("Quiet and clean room", "Noisy street, clean sheets",
+                     "The host was great"):
+            review = Review()
+            review.text = text
+            self.reviews.append(review)
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for path in ("search.json", "search.json.search"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_ranked_search(self):
+        found = models.storage.search(Review, "clean QUIET")
+        self.assertEqual(list(found), ["Review." + self.reviews[0].id,
+                                       "Review." + self.reviews[1].id])
+        self.assertEqual(len(models.storage.search("Review", "clean",
+                                                   limit=1)), 1)
+        self.assertEqual(models.storage.search(Review, "pool"), {})
+        self.assertEqual(models.storage.search(User, "clean"), {})
+
+    def test_index_follows_changes(self):
+        self.assertEqual(len(models.storage.search(Review, "quiet")), 1)
+        self.reviews[2].text = "Very quiet"
+        models.storage.delete(self.reviews[0])
+        self.assertEqual(list(models.storage.search(Review, "quiet")),
+                         ["Review." + self.reviews[2].id])
+
+    def test_built_on_first_search(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(FileStorage._FileStorage__texts, {})
+        self.assertEqual(len(models.storage.search(Review, "clean")), 2)
+        self.assertIn("Review", FileStorage._FileStorage__texts)
+
+    def test_index_saved_next_to_the_file(self):
+        # Only built indexes are saved
+        self.assertFalse(os.path.exists("search.json.search"))
+        models.storage.search(Review, "clean")
+        models.storage.save()
+        with open("search.json.search", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(len(saved["Review"]), 3)
+
+        # A stale index: the reload must fix it, not trust it
+        saved["Review"].pop("Review." + self.reviews[0].id)
+        saved["Review"]["Review.gone"] = [0, {"clean": 1}]
+        saved["Review"]["Review." + self.reviews[2].id][0] = 0
+        with open("search.json.search", "w") as f:
+            json.dump(saved, f)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(set(models.storage.search(Review, "clean")),
+                         {"Review." + self.reviews[0].id,
+                          "Review." + self.reviews[1].id})
+        self.assertEqual(len(models.storage.search(Review, "host")), 1)
+
+    def test_saved_index_read_on_first_search(self):
+        models.storage.search(Review, "clean")
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        with unittest.mock.patch.object(
+                TextIndex, "from_dict",
+                wraps=TextIndex.from_dict) as from_dict:
+            models.storage.reload()
+            from_dict.assert_not_called()
+            self.assertEqual(len(models.storage.search(Review, "clean")),
+                             2)
+            from_dict.assert_called_once()
+
+    def test_same_as_scan(self):
+        self.assertEqual(
+                models.storage.search(Review, "clean room"),
+                super(FileStorage, models.storage).search(Review,
+                                                          "clean room"))
+
+
+class TestWhere(unittest.TestCase):
+    """testing FileStorage.where() and Place.where()"""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for i in range(6):
+            place = Place()
+            place.city_id = "c{}".format(i % 2)
+            place.price_by_night = 50 * i
+            place.max_guest = i
+            self.places.append(place)
+        self.places[5].price_by_night = "ask"
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def keys(self, *indexes):
+        return ["Place." + self.places[i].id for i in indexes]
+
+    def test_where(self):
+        found = models.storage.where(Place, ["price_by_night < 150",
+                                             ("max_guest", ">=", 1)])
+        self.assertEqual(sorted(found), sorted(self.keys(1, 2)))
+        self.assertEqual(list(models.storage.where(
+                "Place", ["city_id == c1"], order_by="-max_guest",
+                limit=2)), self.keys(5, 3))
+        self.assertEqual(list(Place.where("max_guest != 0",
+                                          order_by="price_by_night")),
+                         self.keys(1, 2, 3, 4, 5))
+        self.assertEqual(len(Place.where(limit=3)), 3)
+        self.assertEqual(models.storage.where(User, ["name == x"]), {})
+
+    def test_uses_the_indexes(self):
+        conditions = ["city_id == c0", "price_by_night >= 100",
+                      "max_guest < 5"]
+        with unittest.mock.patch.object(
+                FileStorage, "all", side_effect=AssertionError) as mock:
+            found = models.storage.where(Place, conditions)
+        self.assertFalse(mock.called)
+        self.assertEqual(sorted(found), sorted(self.keys(2, 4)))
+        self.assertEqual(found, super(FileStorage, models.storage).where(
+                Place, conditions))
+
+
+class TestPages(unittest.TestCase):
+    """testing FileStorage.page() and stream()"""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.ids = sorted(Amenity().id for i in range(5))
+        self.user = User()
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def ids_of(self, objs):
+        return [obj.id for obj in objs]
+
+    def test_page(self):
+        self.assertEqual(self.ids_of(models.storage.page(
+                Amenity, 2).values()), self.ids[:2])
+        self.assertEqual(self.ids_of(models.storage.page(
+                "Amenity", 2, self.ids[1]).values()), self.ids[2:4])
+        self.assertEqual(self.ids_of(models.storage.page(
+                Amenity, after=self.ids[3]).values()), self.ids[4:])
+        self.assertEqual(models.storage.page(Amenity, after=self.ids[4]), {})
+        self.assertEqual(list(models.storage.page(
+                after="Amenity." + self.ids[4])), ["User." + self.user.id])
+        self.assertEqual(models.storage.page(City), {})
+
+    def test_page_follows_changes(self):
+        self.assertEqual(len(models.storage.page(Amenity)), 5)
+        models.storage.delete(models.storage.get(Amenity, self.ids[1]))
+        amenity = Amenity()
+        ids = sorted(self.ids[:1] + self.ids[2:] + [amenity.id])
+        self.assertEqual(self.ids_of(models.storage.page(
+                Amenity, 3).values()), ids[:3])
+        self.assertEqual(models.storage.page(Amenity, 3, ids[2]),
+                         super(FileStorage, models.storage).page(
+                                 Amenity, 3, ids[2]))
+
+    def test_stream(self):
+        self.assertEqual(self.ids_of(models.storage.stream(
+                Amenity, page_size=2)), self.ids)
+        self.assertEqual(self.ids_of(models.storage.stream(
+                Amenity, 3, self.ids[0], page_size=2)), self.ids[1:4])
+        self.assertEqual(len(list(models.storage.stream(page_size=4))), 6)
+
+
+class TestBulk(unittest.TestCase):
+    """testing FileStorage.import_file() and export_file()"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "bulk.json"
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for path in glob.glob("bulk.*"):
+            os.remove(path)
+
+    def test_import_ndjson(self):
+        with open("bulk.ndjson", "w") as f:
+            f.write('{"id": "1", "name": "Flat", "max_guest": "4"}\n'
+                    '{"id": "2", "max_guest": "four"}\n'
+                    '{"id": "3", "created_at": "yesterday"}\n'
+                    '{"__class__": "Place", "price_by_night": 80}\n')
+        count, errors = models.storage.import_file(Place, "bulk.ndjson")
+        self.assertEqual(count, 2)
+        self.assertEqual([line for line, message in errors], [2, 3])
+        self.assertIn("max_guest", errors[0][1])
+        place = models.storage.get(Place, "1")
+        self.assertEqual((place.name, place.max_guest), ("Flat", 4))
+        self.assertEqual(models.storage.aggregate(Place, "price_by_night",
+                                                  "sum"), 80)
+
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(models.storage.count(Place), 2)
+
+    def test_saves_once_per_chunk(self):
+        with open("bulk.ndjson", "w") as f:
+            f.writelines('{"name": "%d"}\n' % i for i in range(5))
+        save_now = FileStorage._FileStorage__save_now
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__save_now", autospec=True,
+                side_effect=save_now) as mock:
+            models.storage.import_file("User", "bulk.ndjson", chunk_size=2)
+        self.assertEqual(mock.call_count, 3)
+        self.assertEqual(models.storage.count(User), 5)
+
+    def test_export_and_import_back(self):
+        for fmt in ("ndjson", "csv"):
+            FileStorage._FileStorage__objects = {}
+            places = [Place(), Place()]
+            places[0].name = "Flat, with a view"
+            places[0].amenity_ids = ["a"]
+            places[1].latitude = 48.5
+            places[1].pool = True
+            path = "bulk." + fmt
+            self.assertEqual(models.storage.export_file(Place, path), 2)
+            self.assertEqual(models.storage.export_file(User, "bulk.txt",
+                                                        fmt), 0)
+
+            FileStorage._FileStorage__objects = {}
+            self.assertEqual(models.storage.import_file(Place, path),
+                             (2, []))
+            for place in places:
+                self.assertEqual(
+                        models.storage.get(Place, place.id).to_dict(),
+                        place.to_dict())
+            self.assertEqual(len(models.storage.within(Place, 48, 0, 49,
+                                                       1)), 1)
+
+
+class TestLazyReload(unittest.TestCase):
+    """testing that lazy mode only builds the instances asked for"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "lazy.json"
+        FileStorage._FileStorage__objects = {}
+        self.user, self.place = User(), Place()
+        self.user.first_name = "Betty"
+        self.place.city_id = "1234"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("lazy.json")
+        except IOError:
+            pass
+
+    def test_rollback_keeps_the_instances_built(self):
+        with self.assertRaises(KeyError):
+            with models.storage.transaction():
+                models.storage.get(Place, self.place.id)
+                models.storage.all(User)
+                raise KeyError("abort")
+        self.assertIsNotNone(models.storage.get(Place, self.place.id))
+        self.assertEqual(models.storage.count(User), 1)
+        models.storage.save()
+        with open("lazy.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_nothing_built_on_reload(self):
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(models.storage.count(), 2)
+        self.assertEqual(models.storage.count(User), 1)
+
+    def test_get_builds_one_instance(self):
+        user = models.storage.get(User, self.user.id)
+        self.assertEqual(user.first_name, "Betty")
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         ["User." + self.user.id])
+        self.assertIs(models.storage.get(User, self.user.id), user)
+
+    def test_all_builds_everything(self):
+        objs = models.storage.all()
+        self.assertIn("User." + self.user.id, objs)
+        self.assertIn("Place." + self.place.id, objs)
+        self.assertEqual(FileStorage._FileStorage__raw, {})
+
+    def test_find_by_and_delete(self):
+        places = models.storage.find_by(Place, "city_id", "1234")
+        self.assertIn("Place." + self.place.id, places)
+        self.assertIsNotNone(models.storage.delete("User." + self.user.id))
+        self.assertEqual(models.storage.count(), 1)
+
+    def test_save_keeps_unbuilt_records(self):
+        models.storage.get(Place, self.place.id).name = "Cozy Cabin"
+        models.storage.save()
+        with open("lazy.json", "r") as f:
+            content = json.load(f)
+        self.assertEqual(content["User." + self.user.id]["first_name"],
+                         "Betty")
+        self.assertEqual(content["Place." + self.place.id]["name"],
+                         "Cozy Cabin")
+
+
+class TestDurability(unittest.TestCase):
+    """testing the atomic writes of FileStorage at each durability level"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "durable.json"
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__durability = "flush"
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for path in ("durable.json", "durable.json.log"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_levels(self):
+        for level in ("none", "flush", "fsync", "fsync-dir"):
+            FileStorage._FileStorage__durability = level
+            user = User()
+            models.storage.save()
+            with open("durable.json", "r") as f:
+                self.assertIn("User." + user.id, json.load(f))
+            self.assertEqual([name for name in os.listdir(".")
+                              if name.startswith("durable.json.")], [])
+
+    def test_journal_levels(self):
+        FileStorage._FileStorage__journal = True
+        try:
+            for level in ("none", "flush", "fsync", "fsync-dir"):
+                FileStorage._FileStorage__durability = level
+                state = State()
+                models.storage.save()
+                with open("durable.json.log", "r") as f:
+                    self.assertIn("State." + state.id, f.read())
+        finally:
+            FileStorage._FileStorage__journal = False
+
+    def test_unknown_level(self):
+        FileStorage._FileStorage__durability = "paranoid"
+        with self.assertRaises(ValueError):
+            models.storage.save()
+
+    def test_failed_write_keeps_old_file(self):
+        city = City()
+        models.storage.save()
+
+        def broken():
+            yield "{"
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            FileStorage._FileStorage__write("durable.json", broken())
+        with open("durable.json", "r") as f:
+            self.assertIn("City." + city.id, json.load(f))
+        self.assertEqual([name for name in os.listdir(".")
+                          if name.startswith("durable.json.")], [])
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """testing FileStorage with binary snapshots instead of a JSON file"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "binary.hbnb"
+        FileStorage._FileStorage__format = "binary"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__changes = {}
+
+    def tearDown(self):
+        models.storage.wait()
+        FileStorage._FileStorage__format = "json"
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__journal_limit = 4 * 1024 * 1024
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for path in ("binary.hbnb", "binary.hbnb.log", "binary.json"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_save_and_reload(self):
+        place = Place()
+        place.name = "Flat"
+        place.amenity_ids = ["a", "b"]
+        models.storage.save()
+        self.assertTrue(snapshot.is_snapshot("binary.hbnb"))
+
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        loaded = models.storage.get(Place, place.id)
+        self.assertIsNot(loaded, place)
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+
+    def test_save_after_reload_reuses_the_bodies(self):
+        places = [Place(), Place()]
+        models.storage.save()
+        with open("binary.hbnb", "rb") as f:
+            saved = f.read()
+
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        with unittest.mock.patch.object(snapshot, "body",
+                                        wraps=snapshot.body) as mock:
+            models.storage.save()
+            self.assertEqual(mock.call_count, 0)
+            with open("binary.hbnb", "rb") as f:
+                self.assertEqual(f.read(), saved)
+            models.storage.get(Place, places[0].id).name = "Flat"
+            models.storage.save()
+            self.assertEqual(mock.call_count, 1)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(models.storage.get(Place, places[0].id).name,
+                         "Flat")
+
+    def test_lazy_reload(self):
+        user = User()
+        user.email = "betty@holberton.com"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        models.storage.save()
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__raw = {}
+        models.storage.reload()
+        self.assertEqual(models.storage.get(User, user.id).to_dict(),
+                         user.to_dict())
+
+    def test_compaction(self):
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__journal_limit = 1
+        state = State()
+        state.name = "California"
+        models.storage.save()
+        models.storage.wait()
+        self.assertTrue(snapshot.is_snapshot("binary.hbnb"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(models.storage.get(State, state.id).name,
+                         "California")
+
+    def test_reads_json_files(self):
+        city = City()
+        with open("binary.hbnb", "w") as f:
+            json.dump({"City." + city.id: city.to_dict()}, f)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(models.storage.get(City, city.id).to_dict(),
+                         city.to_dict())
+        models.storage.save()
+        self.assertTrue(snapshot.is_snapshot("binary.hbnb"))
+        snapshot.convert("binary.hbnb", "binary.json")
+        with open("binary.json") as f:
+            self.assertEqual(json.load(f), {"City." + city.id:
+                                            city.to_dict()})
+
+    def test_unknown_format(self):
+        FileStorage._FileStorage__format = "xml"
+        with self.assertRaises(ValueError):
+            models.storage.save()
+
+
+class TestMappedSnapshot(unittest.TestCase):
+    """testing lazy mode on a snapshot, mapped instead of read"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "mapped.hbnb"
+        FileStorage._FileStorage__format = "binary"
+        FileStorage._FileStorage__objects = {}
+        self.users = [User() for i in range(20)]
+        self.users[0].first_name = "Betty"
+        self.place = Place()
+        self.place.name = "Cozy Cabin"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__format = "json"
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for path in ("mapped.hbnb", "mapped.hbnb.log"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_nothing_read_on_reload(self):
+        raw = FileStorage._FileStorage__raw
+        self.assertIsInstance(raw["User"], snapshot.Records)
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(models.storage.count(User), 20)
+        self.assertEqual(models.storage.count(), 21)
+
+    def test_get_decodes_one_record(self):
+        user = models.storage.get(User, self.users[0].id)
+        self.assertEqual(user.to_dict(), self.users[0].to_dict())
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         ["User." + user.id])
+        self.assertIsNone(models.storage.get(User, "missing"))
+        self.assertEqual(models.storage.count(User), 20)
+
+    def test_search(self):
+        self.assertEqual(list(models.storage.search(Place, "cabin")),
+                         ["Place." + self.place.id])
+
+    def test_save_copies_unbuilt_records(self):
+        inode = os.stat("mapped.hbnb").st_ino
+        FileStorage._FileStorage__durability = "none"
+        try:
+            models.storage.delete("Place." + self.place.id)
+            models.storage.get(User, self.users[1].id).first_name = "Holb"
+            models.storage.save()
+        finally:
+            FileStorage._FileStorage__durability = "flush"
+        # Replaced, not truncated under the map
+        self.assertNotEqual(os.stat("mapped.hbnb").st_ino, inode)
+
+        models.storage.reload()
+        self.assertEqual(models.storage.count(), 20)
+        self.assertEqual(models.storage.get(User, self.users[0].id)
+                         .first_name, "Betty")
+        self.assertEqual(models.storage.get(User, self.users[1].id)
+                         .first_name, "Holb")
+
+    def test_journal_over_the_snapshot(self):
+        FileStorage._FileStorage__journal = True
+        models.storage.get(User, self.users[0].id).first_name = "Ada"
+        models.storage.delete("User." + self.users[1].id)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+        models.storage.reload()
+        self.assertEqual(models.storage.count(User), 19)
+        self.assertEqual(models.storage.get(User, self.users[0].id)
+                         .first_name, "Ada")
+        self.assertIsNone(models.storage.get(User, self.users[1].id))
+
+
+class TestTransaction(unittest.TestCase):
+    """testing FileStorage.transaction() / batch()"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "batch.json"
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("batch.json")
+        except IOError:
+            pass
+
+    def test_saves_are_coalesced(self):
+        with models.storage.batch():
+            users = [User() for i in range(3)]
+            for user in users:
+                user.save()
+                self.assertFalse(os.path.exists("batch.json"))
+        with open("batch.json", "r") as f:
+            content = json.load(f)
+        for user in users:
+            self.assertIn("User." + user.id, content)
+
+    def test_no_save_requested(self):
+        with models.storage.transaction():
+            User()
+        self.assertFalse(os.path.exists("batch.json"))
+
+    def test_rollback(self):
+        kept, gone = Place(), Place()
+        kept.name = "Cozy Cabin"
+        kept.city_id = "1"
+        models.storage.save()
+
+        with self.assertRaises(KeyError):
+            with models.storage.transaction():
+                kept.name = "Ruin"
+                kept.city_id = "2"
+                kept.number_rooms = 4
+                models.storage.delete(gone)
+                created = Place()
+                kept.save()
+                raise KeyError("abort")
+
+        objs = models.storage.all()
+        self.assertEqual(kept.name, "Cozy Cabin")
+        self.assertNotIn("number_rooms", kept.__dict__)
+        self.assertIs(objs["Place." + gone.id], gone)
+        self.assertNotIn("Place." + created.id, objs)
+        self.assertIn("Place." + kept.id,
+                      models.storage.find_by(Place, "city_id", "1"))
+        self.assertEqual(models.storage.find_by(Place, "city_id", "2"), {})
+        with open("batch.json", "r") as f:
+            self.assertNotIn("Ruin", f.read())
+
+    def test_nested(self):
+        with self.assertRaises(ValueError):
+            with models.storage.transaction():
+                state = State()
+                with models.storage.transaction():
+                    state.name = "California"
+                raise ValueError
+        self.assertNotIn("State." + state.id, models.storage.all())
+
+
+class TestWriteBehind(unittest.TestCase):
+    """testing the write-behind mode of FileStorage"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "behind.json"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__write_behind = 60
+
+    def tearDown(self):
+        models.storage.flush()
+        FileStorage._FileStorage__write_behind = 0
+        FileStorage._FileStorage__write_behind_max = 1000
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("behind.json")
+        except IOError:
+            pass
+
+    def test_save_returns_before_writing(self):
+        user = User()
+        user.save()
+        self.assertFalse(os.path.exists("behind.json"))
+        models.storage.flush()
+        with open("behind.json", "r") as f:
+            self.assertIn("User." + user.id, json.load(f))
+
+    def test_flush_without_pending_save(self):
+        models.storage.flush()
+        self.assertFalse(os.path.exists("behind.json"))
+
+    def test_threshold_wakes_the_flusher(self):
+        FileStorage._FileStorage__write_behind_max = 2
+        first, second = City(), City()
+        models.storage.save()
+        for i in range(50):
+            if os.path.exists("behind.json"):
+                break
+            time.sleep(0.02)
+        with open("behind.json", "r") as f:
+            self.assertIn("City." + second.id, json.load(f))
+
+    def test_quit_flushes(self):
+        from console import HBNBCommand
+
+        state = State()
+        state.save()
+        self.assertTrue(HBNBCommand().onecmd("quit"))
+        with open("behind.json", "r") as f:
+            self.assertIn("State." + state.id, json.load(f))
+
+    def test_change_while_encoding_is_saved(self):
+        user = User()
+        user.first_name = "v1"
+        models.storage.save()
+        models.storage.flush()
+        encoding, resume = threading.Event(), threading.Event()
+        record = codec.record
+
+        def slow_record(obj):
+            """encodes obj, then lets the test change it"""
+
+            obj_dict = record(obj)
+            if obj is user and not encoding.is_set():
+                encoding.set()
+                resume.wait(5)
+            return obj_dict
+
+        user.first_name = "v2"
+        user.save()
+        with unittest.mock.patch.object(codec, "record", slow_record):
+            flusher = threading.Thread(target=models.storage.flush)
+            flusher.start()
+            self.assertTrue(encoding.wait(5))
+            user.first_name = "v3"
+            resume.set()
+            flusher.join()
+        models.storage.save()
+        models.storage.flush()
+        with open("behind.json", "r") as f:
+            self.assertEqual(json.load(f)["User." + user.id]["first_name"],
+                             "v3")
+
+
+class TestSharedStorage(unittest.TestCase):
+    """testing FileStorage used by several processes at once"""
+
+    other_process = """
+import sys
+import models
+from models.engine.file_storage import FileStorage
+from models.engine.text_index import TextIndex
+from models.city import City
+FileStorage._FileStorage__file_path = "shared.json"
+FileStorage._FileStorage__shared = True
+FileStorage._FileStorage__objects = {}
+models.storage.reload()
+exec(sys.argv[1])
+"""
+
+    def setUp(self):
+        FileStorage._FileStorage__file_path = "shared.json"
+        FileStorage._FileStorage__shared = True
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__shared = False
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        for path in ("shared.json", "shared.json.lock"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def run_other_process(self, code):
+        return subprocess.Popen([sys.executable, "-c",
+                                 self.other_process, code])
+
+    def test_refresh_merges_other_processes(self):
+        user, gone, mine = User(), User(), User()
+        user.first_name = "Betty"
+        models.storage.save()
+        mine.first_name = "unsaved"
+
+        code = ("objs = models.storage.all()\n"
+                f"objs['User.{user.id}'].first_name = 'Holberton'\n"
+                f"models.storage.delete('User.{gone.id}')\n"
+                f"objs['User.{mine.id}'].first_name = 'theirs'\n"
+                "print(City().id)\n"
+                "models.storage.save()\n")
+        self.assertEqual(self.run_other_process(code).wait(), 0)
+
+        models.storage.refresh()
+        objs = models.storage.all()
+        self.assertIs(objs["User." + user.id], user)
+        self.assertEqual(user.first_name, "Holberton")
+        self.assertNotIn("User." + gone.id, objs)
+        self.assertEqual(mine.first_name, "unsaved")
+        self.assertEqual(models.storage.count(City), 1)
+
+    def test_save_keeps_other_processes_changes(self):
+        user = User()
+        models.storage.save()
+        self.assertEqual(self.run_other_process(
+            "City().save()").wait(), 0)
+
+        user.first_name = "Betty"
+        models.storage.save()
+        with open("shared.json", "r") as f:
+            content = json.load(f)
+        self.assertEqual(len(content), 2)
+        self.assertEqual(content["User." + user.id]["first_name"], "Betty")
+
+    def test_concurrent_writers(self):
+        models.storage.save()
+        code = ("for i in range(20):\n"
+                "    City().save()\n")
+        workers = [self.run_other_process(code) for i in range(3)]
+        self.assertEqual([worker.wait() for worker in workers], [0, 0, 0])
+
+        models.storage.refresh()
+        self.assertEqual(models.storage.count(City), 60)
+
+
+def tearDownModule():
+    """Removes the text indexes saved next to the JSON files of the tests"""
+
+    for path in glob.glob("*.search"):
+        if path != "file.json.search":
+            os.remove(path)
+
+
 if __name__ == "__main__":
     unittest.main()
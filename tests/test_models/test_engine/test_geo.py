@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/geo.py.
+
+Unittest classes:
+    TestGeo
+    TestGridIndex
+"""
+import models
+import random
+import unittest
+from models.engine.geo import GridIndex, box, coordinates, distance, \
+    inside, point
+from models.place import Place
+
+
+class TestGeo(unittest.TestCase):
+    """testing the helpers of the spatial index"""
+
+    def test_distance(self):
+        # Paris - London
+        self.assertAlmostEqual(distance(48.8566, 2.3522, 51.5074, -0.1278),
+                               343.5, delta=1)
+        self.assertEqual(distance(10, 20, 10, 20), 0)
+
+    def test_point(self):
+        self.assertEqual(point(1, 2.5), (1.0, 2.5))
+        self.assertIsNone(point("1", 2))
+        self.assertIsNone(point(91, 0))
+        self.assertIsNone(point(0, 181))
+
+    def test_coordinates(self):
+        place = Place()
+        self.assertEqual(coordinates(place), (None, None))
+        place.longitude = 2.5
+        self.assertEqual(coordinates(place), (0.0, 2.5))
+        models.storage.delete(place)
+
+    def test_box_across_the_180th_meridian(self):
+        south, west, north, east = box(0, 179.9, 50)
+        self.assertGreater(west, east)
+        self.assertTrue(inside(0, -179.9, south, west, north, east))
+        self.assertFalse(inside(0, 0, south, west, north, east))
+        self.assertEqual(box(89.9, 0, 50)[1:4:2], (-180.0, 180.0))
+
+
+class TestGridIndex(unittest.TestCase):
+    """testing the grid of points"""
+
+    def setUp(self):
+        rand = random.Random(1)
+        self.points = {str(i): (rand.uniform(-90, 90),
+                                rand.uniform(-180, 180))
+                       for i in range(2000)}
+        self.grid = GridIndex(cell_size=2)
+        for key, (lat, lon) in self.points.items():
+            self.grid.set(key, lat, lon)
+
+    def scan(self, lat, lon):
+        return sorted((distance(lat, lon, *xy), key)
+                      for key, xy in self.points.items())
+
+    def test_within(self):
+        expected = {key for key, (lat, lon) in self.points.items()
+                    if -10 <= lat <= 30 and (lon >= 150 or lon <= -170)}
+        self.assertEqual(set(self.grid.within(-10, 150, 30, -170)),
+                         expected)
+
+    def test_near_and_nearest(self):
+        for lat, lon in ((0, 0), (60, 179), (-89, 20)):
+            scan = self.scan(lat, lon)
+            self.assertEqual(self.grid.near(lat, lon, 1500),
+                             [item for item in scan if item[0] <= 1500])
+            self.assertEqual(self.grid.nearest(lat, lon, 5), scan[:5])
+
+    def test_updates(self):
+        self.grid.set("0", 10, 10)
+        self.grid.set("1", "nowhere", 10)
+        self.grid.remove("2")
+        self.grid.remove("nope")
+        self.assertEqual(len(self.grid), 1998)
+        self.assertEqual(self.grid.nearest(10, 10)[0], (0, "0"))
+        self.assertNotIn("1", self.grid.within(-90, -180, 90, 180))
+        self.assertEqual(GridIndex().nearest(0, 0, 3), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
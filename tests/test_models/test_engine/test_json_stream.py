@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/json_stream.py.
+
+Unittest classes:
+    TestIterItems
+"""
+import io
+import json
+import unittest
+from models.engine.json_stream import iter_items
+
+
+class TestIterItems(unittest.TestCase):
+    """testing the streaming JSON object reader"""
+
+    def test_empty_object(self):
+        self.assertEqual(list(iter_items(io.StringIO(' { } '))), [])
+
+    def test_items_in_order(self):
+        doc = {"User.1": {"id": "1", "name": "Betty"},
+               "City.2": {"id": "2", "tags": [1, 2.5, None, True]},
+               "Place.3": {"id": "3", "text": "a \"quoted\" {brace},"}}
+        items = list(iter_items(io.StringIO(json.dumps(doc))))
+        self.assertEqual(items, list(doc.items()))
+
+    def test_records_larger_than_chunks(self):
+        doc = {f"Review.{i}": {"id": str(i), "text": "x" * 1000}
+               for i in range(20)}
+        text = json.dumps(doc, indent=4)
+        self.assertEqual(dict(iter_items(io.StringIO(text), chunk_size=7)),
+                         doc)
+
+    def test_reads_lazily(self):
+        f = io.StringIO(json.dumps({"a": 1, "b": {"c": "d" * 100000}}))
+        items = iter_items(f, chunk_size=16)
+        self.assertEqual(next(items), ("a", 1))
+        self.assertLess(f.tell(), 1000)
+
+    def test_invalid_documents(self):
+        for text in ('', '[]', '{"a" 1}', '{"a": 1', '{"a": {"b": 1}',
+                     '{1: 2}'):
+            with self.assertRaises(ValueError):
+                list(iter_items(io.StringIO(text)))
+
+
+if __name__ == "__main__":
+    unittest.main()
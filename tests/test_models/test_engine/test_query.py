@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/query.py.
+
+Unittest classes:
+    TestQuery
+"""
+import unittest
+from models.engine.query import (condition, parse, predicate, project,
+                                 sort_key)
+
+
+class Row:
+    """an object with the attributes of a row"""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TestQuery(unittest.TestCase):
+    """testing the parsing and compiling of where queries"""
+
+    def test_condition(self):
+        self.assertEqual(condition("max_guest>=4"), ("max_guest", ">=", 4))
+        self.assertEqual(condition(" name = 'Le Flat' "),
+                         ("name", "==", "Le Flat"))
+        self.assertEqual(condition('city_id != "1"'), ("city_id", "!=", "1"))
+        self.assertEqual(condition("name == Paris"), ("name", "==", "Paris"))
+        for text in ("max_guest", "max_guest >= ", "max_guest >> 4",
+                     "max guest < 4", "max_guest ~ 4"):
+            with self.assertRaises(ValueError):
+                condition(text)
+
+    def test_parse(self):
+        conditions, options = parse(
+                'price_by_night < 100, name != "a, b", limit=5, '
+                'order_by=-price_by_night, fields="name, max_guest"')
+        self.assertEqual(conditions, [("price_by_night", "<", 100),
+                                      ("name", "!=", "a, b")])
+        self.assertEqual(options, {"limit": 5,
+                                   "order_by": "-price_by_night",
+                                   "fields": ["name", "max_guest"]})
+        self.assertEqual(parse(""), ([], {}))
+        self.assertEqual(parse("limit > 3")[0], [("limit", ">", 3)])
+        with self.assertRaises(ValueError):
+            parse("limit=-1")
+
+    def test_predicate(self):
+        match = predicate([("price", "<", 100), "guests >= 4"])
+        self.assertTrue(match(Row(price=99, guests=4)))
+        self.assertFalse(match(Row(price=100, guests=4)))
+        self.assertFalse(match(Row(price="cheap", guests=4)))
+        self.assertFalse(match(Row(guests=4)))
+        self.assertTrue(predicate([])(Row()))
+        with self.assertRaises(ValueError):
+            predicate([("price", "~", 1)])
+
+    def test_sort_key_and_project(self):
+        rows = [Row(price="b"), Row(price=2.5), Row(), Row(price=1)]
+        self.assertEqual([getattr(row, "price", None) for row in
+                          sorted(rows, key=sort_key("price"))],
+                         [1, 2.5, "b", None])
+        self.assertEqual(project(Row(a=1, b=2), ["b", "c"]),
+                         {"b": 2, "c": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/snapshot.py.
+
+Unittest classes:
+    TestSnapshot
+    TestMapped
+"""
+import datetime
+import io
+import json
+import os
+import unittest
+from models.engine import snapshot
+from models.place import Place
+
+
+def to_bytes(records):
+    """returns the snapshot of the (key, record dict) records"""
+
+    return b"".join(snapshot.dump(snapshot.entries(records)))
+
+
+class TestSnapshot(unittest.TestCase):
+    """testing the binary snapshots of the file storage"""
+
+    def setUp(self):
+        self.place = Place()
+        self.place.name = "Flat"
+        self.place.amenity_ids = ["a", "b"]
+        self.key = "Place." + self.place.id
+
+    def tearDown(self):
+        for path in ("snap.json", "snap.hbnb", "back.json"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_round_trip(self):
+        data = to_bytes([(self.key, self.place.to_dict())])
+        self.assertTrue(data.startswith(snapshot.HEADER))
+        (key, obj_dict), = snapshot.load(io.BytesIO(data))
+        self.assertEqual(key, self.key)
+        self.assertEqual(obj_dict["created_at"], self.place.created_at)
+        self.assertEqual(Place(**obj_dict).to_dict(), self.place.to_dict())
+
+    def test_compact_fields(self):
+        obj_dict = self.place.to_dict()
+        obj_dict["created_at"] = self.place.created_at
+        obj_dict["updated_at"] = self.place.updated_at
+        del obj_dict["__class__"]
+        body = snapshot.body(obj_dict)
+        self.assertEqual(body[0], snapshot.UUID_ID | snapshot.CREATED |
+                         snapshot.UPDATED | snapshot.NATIVE)
+        self.assertEqual(body[1:17], bytes.fromhex(
+                self.place.id.replace("-", "")))
+        self.assertEqual(snapshot.values(body, 33),
+                         {"name": "Flat", "amenity_ids": ["a", "b"]})
+
+    def test_native_attributes(self):
+        state = {"id": "1", "name": "Flat \ud800é", "rooms": -3,
+                 "big": 2 ** 70, "price": 2.5, "pets": True, "wifi": False,
+                 "city_id": None, "amenity_ids": ["é", "", "b"],
+                 "empty": [], "mixed": [1, "a"], "rules": {"a": [1]},
+                 "opened": datetime.date(2024, 1, 2)}
+        body = snapshot.body(state)
+        self.assertTrue(body[0] & snapshot.NATIVE)
+        key, obj_dict = snapshot.decode("Place", body)
+        expected = dict(state, opened="2024-01-02", __class__="Place")
+        self.assertEqual(obj_dict, expected)
+        for attr in ("rooms", "price", "pets"):
+            self.assertIs(type(obj_dict[attr]), type(state[attr]))
+        self.assertEqual(snapshot.decode("Place", memoryview(body)),
+                         (key, obj_dict))
+
+    def test_layout_shared(self):
+        first = snapshot.attributes({"name": "a", "max_guest": 1})
+        second = snapshot.attributes({"name": "bc", "max_guest": 2})
+        size = 2 + snapshot.LENGTH.unpack_from(first)[0]
+        self.assertEqual(first[:size], second[:size])
+        self.assertNotIn(b"name", first[size:])
+
+    def test_json_bodies_of_version_2(self):
+        body = bytes([0]) + snapshot.LENGTH.pack(1) + b"7" + \
+            json.dumps({"name": "Flat", "max_guest": 4}).encode()
+        self.assertEqual(snapshot.decode("Place", body),
+                         ("Place.7", {"id": "7", "name": "Flat",
+                                      "max_guest": 4, "__class__": "Place"}))
+        data = snapshot.HEADERS[1] + snapshot.RECORD.pack(
+                snapshot.CLASS, 5) + b"Place" + snapshot.OBJECT_HEAD.pack(
+                snapshot.OBJECT, len(body) + 2, 0) + body
+        self.assertEqual(dict(snapshot.load(io.BytesIO(data)))["Place.7"],
+                         {"id": "7", "name": "Flat", "max_guest": 4,
+                          "__class__": "Place"})
+
+    def test_classes_are_interned(self):
+        records = [(f"Place.{i}", {"id": str(i), "__class__": "Place"})
+                   for i in range(3)]
+        data = to_bytes(records)
+        # Once in the records, once in the directory of the index
+        self.assertEqual(data.count(b"Place"), 2)
+        self.assertEqual([key for key, obj_dict in
+                          snapshot.load(io.BytesIO(data))],
+                         ["Place.0", "Place.1", "Place.2"])
+
+    def test_other_values_kept_in_json(self):
+        aware = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+        records = [("Place.é1", {"id": "é1", "created_at": aware,
+                                 "updated_at": "2024-01-02"}),
+                   ("Place.7", {"id": 7})]
+        loaded = dict(snapshot.load(io.BytesIO(to_bytes(records))))
+        self.assertEqual(loaded["Place.é1"]["id"], "é1")
+        self.assertEqual(loaded["Place.é1"]["created_at"],
+                         aware.isoformat())
+        self.assertEqual(loaded["Place.é1"]["updated_at"], "2024-01-02")
+        self.assertEqual(loaded["Place.7"]["id"], 7)
+
+    def test_invalid_snapshots(self):
+        data = to_bytes([(self.key, self.place.to_dict())])
+        header = len(snapshot.HEADER)
+        for bad in (b"{}", data[:header + 30], data[:header + 2],
+                    data[:header] + bytes([9, 0, 0, 0, 0])):
+            with self.assertRaises(ValueError):
+                list(snapshot.load(io.BytesIO(bad)))
+
+    def test_convert(self):
+        with open("snap.json", "w") as f:
+            json.dump({self.key: self.place.to_dict()}, f)
+        self.assertEqual(snapshot.convert("snap.json", "snap.hbnb"), 1)
+        self.assertTrue(snapshot.is_snapshot("snap.hbnb"))
+        self.assertFalse(snapshot.is_snapshot("snap.json"))
+        self.assertLess(os.path.getsize("snap.hbnb"),
+                        os.path.getsize("snap.json"))
+        self.assertEqual(snapshot.convert("snap.hbnb", "back.json"), 1)
+        with open("back.json") as f:
+            self.assertEqual(json.load(f), {self.key: self.place.to_dict()})
+        for same in ("snap.json", "./snap.json",
+                     os.path.abspath("snap.json")):
+            with self.assertRaises(ValueError):
+                snapshot.convert("snap.json", same)
+        with open("snap.json") as f:
+            self.assertEqual(json.load(f), {self.key: self.place.to_dict()})
+
+    def test_failed_convert_keeps_the_target(self):
+        with open("snap.json", "w") as f:
+            f.write('{"Place.1": {"id": "1"}, "Place.2": ')
+        with open("snap.hbnb", "wb") as f:
+            f.write(b"old")
+        with self.assertRaises(ValueError):
+            snapshot.convert("snap.json", "snap.hbnb")
+        with open("snap.hbnb", "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertEqual([path for path in os.listdir(".")
+                          if path.startswith("snap.hbnb.")], [])
+
+
+class TestMapped(unittest.TestCase):
+    """testing the index of snapshots and their mapped records"""
+
+    def setUp(self):
+        self.places = [Place() for i in range(50)]
+        records = [("Place." + place.id, place.to_dict())
+                   for place in self.places]
+        records.append(("City.é", {"id": "é", "__class__": "City"}))
+        with open("snap.hbnb", "wb") as f:
+            f.writelines(snapshot.dump(snapshot.entries(records)))
+        self.classes = snapshot.mapped("snap.hbnb")
+
+    def tearDown(self):
+        self.classes = None
+        for path in ("snap.hbnb", "copy.hbnb"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_lookups(self):
+        places = self.classes["Place"]
+        self.assertEqual(len(places), 50)
+        self.assertEqual(sorted(places),
+                         sorted("Place." + place.id for place in self.places))
+        for place in self.places:
+            self.assertEqual(Place(**places["Place." + place.id]).to_dict(),
+                             place.to_dict())
+        self.assertEqual(self.classes["City"]["City.é"]["id"], "é")
+        self.assertNotIn("City.é", places)
+        self.assertNotIn("Place.missing", places)
+        with self.assertRaises(KeyError):
+            places["Place.missing"]
+
+    def test_changes_are_kept_aside(self):
+        places = self.classes["Place"]
+        first, second = ("Place." + place.id for place in self.places[:2])
+        places[first] = {"id": "changed"}
+        del places[second]
+        places["Place.new"] = {"id": "new"}
+        self.assertEqual(places[first], {"id": "changed"})
+        self.assertNotIn(second, places)
+        self.assertEqual(len(places), 50)
+        self.assertEqual(len(list(places)), 50)
+        self.assertEqual(places.pop("Place.new"), {"id": "new"})
+        self.assertEqual(len(places), 49)
+        self.assertEqual(len(list(places.bodies())), 49)
+        self.assertEqual(len(snapshot.mapped("snap.hbnb")["Place"]), 50)
+
+    def test_bodies_copied_as_they_are(self):
+        with open("copy.hbnb", "wb") as f:
+            f.writelines(snapshot.dump(self.classes["Place"].bodies()))
+        places = dict(snapshot.read("snap.hbnb"))
+        del places["City.é"]
+        self.assertEqual(dict(snapshot.read("copy.hbnb")), places)
+
+    def test_without_index(self):
+        with open("copy.hbnb", "wb") as f:
+            f.write(snapshot.HEADERS[0])
+        self.assertEqual(list(snapshot.read("copy.hbnb")), [])
+        broken = snapshot.HEADER + snapshot.TRAILER.pack(
+                1000, 1, snapshot.INDEX_MAGIC)
+        for data in (snapshot.HEADERS[0], b"", b"{}", broken):
+            with open("copy.hbnb", "wb") as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                snapshot.mapped("copy.hbnb")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/sqlite_storage.py.
+
+Unittest classes:
+    TestSQLiteStorage
+    TestSQLiteTransaction
+"""
+import models
+import os
+import unittest
+from unittest.mock import patch
+from models.engine.base_storage import BaseStorage
+from models.engine.file_storage import FileStorage
+from models.engine.sqlite_storage import SQLiteStorage
+from models.user import User
+from models.city import City
+from models.place import Place
+from models.review import Review
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """testing the SQLite storage engine"""
+
+    def setUp(self):
+        self.file_storage = models.storage
+        self.storage = models.storage = SQLiteStorage("test.db")
+
+    def tearDown(self):
+        self.storage.close()
+        models.storage = self.file_storage
+        os.remove("test.db")
+
+    def test_is_a_storage_engine(self):
+        self.assertIsInstance(self.storage, BaseStorage)
+
+    def test_new_get_and_count(self):
+        user = User()
+        self.assertIs(self.storage.get(User, user.id), user)
+        self.assertIs(self.storage.get("User", user.id), user)
+        self.assertIsNone(self.storage.get("User", "nope"))
+        self.assertIsNone(self.storage.get("Country", user.id))
+        self.assertEqual(self.storage.count(User), 1)
+        self.assertEqual(self.storage.count(), 1)
+        self.assertEqual(self.storage.count("Country"), 0)
+
+    def test_save_and_reload(self):
+        place = Place()
+        place.name = "Cozy Cabin"
+        place.max_guest = 5
+        place.latitude = 77.8
+        place.amenity_ids = ["a", "b"]
+        place.max_guest_note = "no pets"
+        place.price_by_night = "cheap"
+        place.save()
+
+        self.storage.close()
+        self.storage = models.storage = SQLiteStorage("test.db")
+        loaded = self.storage.get(Place, place.id)
+        self.assertIsNot(loaded, place)
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+        self.assertEqual(loaded.__dict__, place.__dict__)
+
+    def test_unsaved_changes_are_lost(self):
+        user = User()
+        user.save()
+        user.first_name = "Betty"
+        self.storage.reload()
+        self.assertNotIn("first_name",
+                         self.storage.get(User, user.id).to_dict())
+
+    def test_all(self):
+        user, city = User(), City()
+        self.assertEqual(self.storage.all(),
+                         {"User." + user.id: user, "City." + city.id: city})
+        self.assertEqual(self.storage.all(City), {"City." + city.id: city})
+
+    def test_find_by(self):
+        place, other = Place(), Place()
+        place.city_id = "1"
+        other.city_id = "2"
+        review = Review()
+        review.place_id = place.id
+        self.assertEqual(self.storage.find_by(Place, "city_id", "1"),
+                         {"Place." + place.id: place})
+        self.assertEqual(self.storage.find_by(Review, "place_id", place.id),
+                         {"Review." + review.id: review})
+        self.assertEqual(self.storage.find_by(Place, "city_id", 1), {})
+
+    def test_between_and_aggregate(self):
+        cheap, dear, odd = Place(), Place(), Place()
+        cheap.price_by_night, cheap.city_id = 80, "1"
+        dear.price_by_night, dear.city_id = 200, "1"
+        odd.price_by_night = "free"
+        self.assertEqual(self.storage.between(Place, "price_by_night", 100),
+                         {"Place." + dear.id: dear})
+        self.assertEqual(len(self.storage.between(Place, "price_by_night")),
+                         2)
+        self.assertEqual(self.storage.aggregate(Place, "price_by_night"),
+                         140.0)
+        self.assertEqual(self.storage.aggregate(Place, "price_by_night",
+                                                "count", by="city_id"),
+                         {"1": 2, "": 0})
+        self.assertEqual(self.storage.aggregate(Place, "price_by_night",
+                                                "max", by="city_id"),
+                         {"1": 200.0, "": None})
+
+    def test_same_answers_as_file_storage(self):
+        unset, cheap, odd, near = Place(), Place(), Place(), Place()
+        cheap.price_by_night = 50
+        odd.price_by_night = "ask"
+        near.latitude, near.longitude = 5, 6
+        self.storage.save()
+        file_storage, saved = FileStorage(), FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        try:
+            for place in (unset, cheap, odd, near):
+                file_storage.new(place)
+            for storage in (self.storage, file_storage):
+                self.assertEqual(
+                        set(storage.between(Place, "price_by_night", 0,
+                                            100)),
+                        {"Place." + place.id
+                         for place in (unset, cheap, near)})
+                self.assertEqual(
+                        storage.aggregate(Place, "price_by_night"), 50 / 3)
+                self.assertEqual(
+                        len(storage.where(Place, ["price_by_night < 100"])),
+                        3)
+                self.assertEqual(
+                        list(storage.between(Place, "latitude", 4, 6)),
+                        ["Place." + near.id])
+        finally:
+            FileStorage._FileStorage__objects = saved
+
+        self.storage.close()
+        self.storage = models.storage = SQLiteStorage("test.db")
+        self.assertEqual(self.storage.get(Place, near.id).latitude, 5)
+        self.assertIs(type(self.storage.get(Place, near.id).latitude), int)
+
+    def test_near(self):
+        paris, lyon = Place(), Place()
+        paris.latitude, paris.longitude = 48.8566, 2.3522
+        lyon.latitude, lyon.longitude = 45.7640, 4.8357
+        self.assertEqual(list(self.storage.near(Place, 46, 4, 500)),
+                         ["Place." + lyon.id, "Place." + paris.id])
+        self.assertEqual(self.storage.nearest(Place, 49, 2),
+                         {"Place." + paris.id: paris})
+
+    def test_where(self):
+        places = [Place(), Place(), Place()]
+        for i, place in enumerate(places):
+            place.city_id = "1" if i else "2"
+            place.price_by_night = 100 * i
+        self.assertEqual(list(self.storage.where(
+                Place, ['city_id == "1"', "price_by_night > 50"],
+                order_by="-price_by_night")),
+                         ["Place." + places[2].id, "Place." + places[1].id])
+
+    def test_page_and_stream(self):
+        ids = sorted(User().id for i in range(3))
+        self.assertEqual([user.id for user in self.storage.page(
+                User, 1, ids[0]).values()], ids[1:2])
+        self.assertEqual([user.id for user in self.storage.stream(
+                User, page_size=2)], ids)
+        self.assertEqual(len(self.storage.page(after="City.")), 3)
+
+    def test_identity_map_keeps_objects_in_use(self):
+        user = User()
+        user.email = "a@b.c"
+        inst_id = user.id
+        self.storage.save()
+        del user
+        self.assertEqual(self.storage.get(User, inst_id).email, "a@b.c")
+        user = self.storage.get(User, inst_id)
+        self.assertIs(self.storage.get(User, inst_id), user)
+
+    def test_import_and_export(self):
+        place = Place()
+        place.max_guest = 3
+        place.pool = True
+        # The rows are streamed, not all loaded at once
+        with patch.object(self.storage, "all", side_effect=AssertionError):
+            self.assertEqual(self.storage.export_file(Place, "test.csv"), 1)
+        self.storage.delete(place)
+        self.assertEqual(self.storage.import_file(Place, "test.csv"),
+                         (1, []))
+        os.remove("test.csv")
+        self.storage.reload()
+        self.assertEqual(self.storage.get(Place, place.id).to_dict(),
+                         place.to_dict())
+
+    def test_delete(self):
+        user = User()
+        user.save()
+        self.assertIs(self.storage.delete("User." + user.id), user)
+        self.assertIsNone(self.storage.get(User, user.id))
+        self.assertIsNone(self.storage.delete(user))
+        self.assertEqual(self.storage.count(User), 0)
+
+
+class TestSQLiteTransaction(unittest.TestCase):
+    """testing SQLiteStorage.transaction()"""
+
+    def setUp(self):
+        self.file_storage = models.storage
+        self.storage = models.storage = SQLiteStorage("test.db")
+
+    def tearDown(self):
+        self.storage.close()
+        models.storage = self.file_storage
+        os.remove("test.db")
+
+    def test_rollback(self):
+        kept, gone = Place(), Place()
+        kept.name = "Cozy Cabin"
+        kept.save()
+        gone.save()
+
+        with self.assertRaises(KeyError):
+            with self.storage.transaction():
+                kept.name = "Ruin"
+                kept.save()
+                self.storage.delete(gone)
+                created = Place()
+                raise KeyError("abort")
+
+        self.assertEqual(kept.name, "Cozy Cabin")
+        self.assertIs(self.storage.get(Place, kept.id), kept)
+        self.assertIsNotNone(self.storage.get(Place, gone.id))
+        self.assertIsNone(self.storage.get(Place, created.id))
+
+    def test_commit_once(self):
+        with self.storage.batch():
+            users = [User() for i in range(3)]
+            for user in users:
+                user.save()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
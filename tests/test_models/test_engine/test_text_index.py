@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/text_index.py.
+
+Unittest classes:
+    TestTextIndex
+"""
+import json
+import unittest
+from models.engine.text_index import TextIndex, tokenize
+
+
+class TestTextIndex(unittest.TestCase):
+    """testing the inverted index and its BM25 ranking"""
+
+    def setUp(self):
+        self.index = TextIndex()
+        self.index.set("a", "A cozy cabin by the lake")
+        self.index.set("b", "Lake view, lake access, lake everything")
+        self.index.set("c", "Downtown loft")
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Cozy, CABIN-by the_lake!"),
+                         ["cozy", "cabin", "by", "the_lake"])
+
+    def test_search(self):
+        self.assertEqual([key for score, key in self.index.search("lake")],
+                         ["b", "a"])
+        self.assertEqual([key for score, key in
+                          self.index.search("cozy lake", limit=1)], ["a"])
+        self.assertEqual(self.index.search("pool"), [])
+        self.assertEqual(TextIndex().search("lake"), [])
+
+    def test_rare_terms_weigh_more(self):
+        self.index.set("d", "cabin")
+        scores = dict((key, score) for score, key in
+                      self.index.search("cabin lake"))
+        self.assertGreater(scores["d"], scores["b"])
+
+    def test_set_and_remove(self):
+        self.index.set("c", "Lakeside loft")
+        self.index.remove("a")
+        self.index.remove("nope")
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual([key for score, key in self.index.search("lake")],
+                         ["b"])
+        self.assertEqual(sorted(self.index.keys()), ["b", "c"])
+
+    def test_to_dict_and_from_dict(self):
+        self.assertTrue(self.index.changed)
+        docs = json.loads(json.dumps(self.index.to_dict()))
+        self.assertFalse(self.index.changed)
+        index = TextIndex.from_dict(docs)
+        self.assertFalse(index.changed)
+        self.assertEqual(index.search("lake cabin"),
+                         self.index.search("lake cabin"))
+        index.set("a", "A cozy cabin by the lake")
+        self.assertFalse(index.changed)
+
+
+if __name__ == "__main__":
+    unittest.main()